@@ -1,17 +1,31 @@
+import asyncio
+import functools
+import hashlib
 import logging
 import os
+import shutil
 import uuid
 from pathlib import Path
-from typing import List
-from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+from contextlib import asynccontextmanager, contextmanager
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from pydantic import BaseModel
+import anyio.to_thread
+import orjson
+from fastapi import BackgroundTasks, FastAPI, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel, ConfigDict
+from starlette.types import Receive, Scope, Send
 
 from src.services.rag_service import RAGService
 from src.models.config import RAGConfig
 from src.models.llm_factory import get_llm
+from src.utils.cache import LRUTTLCache
+from src.utils.compression import GZipRequestMiddleware
+from src.utils.embeddings import get_embeddings, QueryBatchingEmbeddings
 from src.utils.logging_config import setup_logging
 
 # Load environment variables
@@ -33,33 +47,197 @@ async def lifespan(app: FastAPI):
         user_id="api_user" if log_to_file else None,
         session_id="api_session" if log_to_file else None,
     )
+
+    # Loading, splitting, embedding and LLM calls run in the thread pool;
+    # raise anyio's default limit of 40 threads so they don't queue behind each other
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = int(os.getenv("API_THREAD_LIMIT", "100"))
+
+    if os.getenv("PRELOAD_EMBEDDINGS", "true").strip().lower() == "true":
+        preload_embeddings()
     yield
 
 # Initialize FastAPI app
 app = FastAPI(title="AI API", version="1.0.0", lifespan=lifespan)
+# Accept gzip-encoded request bodies (uploads of text-heavy HTML) and gzip larger
+# responses; event streams are excluded by GZipMiddleware, so answers still stream.
+# Decompressed bodies are capped at MAX_REQUEST_BODY_SIZE bytes (default 100 MiB).
+app.add_middleware(
+    GZipRequestMiddleware,
+    max_body_size=int(os.getenv("MAX_REQUEST_BODY_SIZE", str(100 * 1024 * 1024)))
+)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Configuration
 UPLOAD_DIR = Path("data/upload")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+ALLOWED_EXTENSIONS = frozenset({".pdf", ".html"})
 
 # Initialize RAG service (lazy - will be created on first use)
-_sessions: dict[str, RAGService] = {}
+# Per-process cache of session services. With CHROMA_HOST set, the session's
+# documents live on the shared Chroma server, so a worker that has not seen a
+# session yet recreates its service and attaches to the existing collection.
+# Bounded by count (SESSION_CACHE_SIZE) and idle time (SESSION_TTL_SECONDS);
+# evicted sessions are closed, which drops their in-process documents. A session
+# evicted while requests or indexing tasks still use it is closed once they finish.
+_sessions: LRUTTLCache = LRUTTLCache(
+    maxsize=int(os.getenv("SESSION_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("SESSION_TTL_SECONDS", "3600")),
+    on_evict=lambda session_id, service: close_session(session_id, service)
+)
+
+# Number of requests/tasks using each session service, and services evicted from
+# _sessions while in use, by session id. Only touched from the event loop.
+_services_in_use: Dict[RAGService, int] = {}
+_evicted_in_use: Dict[str, RAGService] = {}
+
+# Status of background indexing tasks started by /upload, by task id.
+# Finished tasks are forgotten after UPLOAD_TASK_TTL_SECONDS without being polled.
+_upload_tasks: LRUTTLCache = LRUTTLCache(
+    maxsize=int(os.getenv("UPLOAD_TASK_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("UPLOAD_TASK_TTL_SECONDS", "3600"))
+)
+
+# LLM instances by (provider, model, temperature, API key hash), see get_cached_llm()
+_llms: LRUTTLCache = LRUTTLCache(maxsize=64, ttl=0)
+
+# Embedding model loaded at startup and shared by every session
+_embeddings: Embeddings | None = None
+
+
+def preload_embeddings() -> None:
+    """
+    Load the embedding model once and run a warmup query.
+    
+    Moves the model download/load and CUDA initialization from the first
+    /upload or /question request to application startup.
+    """
+    global _embeddings
+    config = RAGConfig()
+    logger.info(f"Preloading embedding model: {config.embedding_model}")
+    # Shared by all sessions, so questions from different sessions are batched together
+    _embeddings = QueryBatchingEmbeddings(get_embeddings(
+        model_name=config.embedding_model,
+        model_kwargs=config.model_kwargs,
+        encode_kwargs=config.encode_kwargs
+    ))
+    _embeddings.embed_documents(["warmup"])
+    logger.info("Embedding model preloaded")
+
+
+def close_session(session_id: str, service: RAGService) -> None:
+    """Close an evicted session's service, or defer it while the service is in use."""
+    if _services_in_use.get(service):
+        _evicted_in_use[session_id] = service
+        logger.info(f"Session {session_id} evicted while in use; closing it when done")
+        return
+    service.close()
 
 
 def get_rag_service(session_id: str) -> RAGService:
     """Get or create a RAG service instance for the given session."""
-    if session_id not in _sessions:
+    service = _sessions.get(session_id)
+    if service is None and session_id in _evicted_in_use:
+        # Evicted but still in use: bring it back rather than open a second service
+        service = _evicted_in_use.pop(session_id)
+        _sessions[session_id] = service
+    if service is None:
         config = RAGConfig()
-        service = RAGService(config, session_id=session_id)
+        service = RAGService(config, session_id=session_id, embeddings=_embeddings)
         service.initialize_vectorstore()
         _sessions[session_id] = service
         logger.info(f"RAG service initialized for session: {session_id}")
-    return _sessions[session_id]
+    return service
+
+
+def acquire_rag_service(session_id: str) -> RAGService:
+    """
+    Get the session's RAG service and mark it in use.
+    
+    A service in use is not closed when its session is evicted; pair every call
+    with release_rag_service().
+    """
+    service = get_rag_service(session_id)
+    _services_in_use[service] = _services_in_use.get(service, 0) + 1
+    return service
+
+
+def release_rag_service(session_id: str, service: RAGService) -> None:
+    """Release a service from acquire_rag_service(), closing it if it was evicted meanwhile."""
+    remaining = _services_in_use.pop(service) - 1
+    if remaining:
+        _services_in_use[service] = remaining
+    elif _evicted_in_use.get(session_id) is service:
+        del _evicted_in_use[session_id]
+        service.close()
+
+
+@contextmanager
+def rag_service_in_use(session_id: str) -> Iterator[RAGService]:
+    """Context manager form of acquire_rag_service()/release_rag_service()."""
+    service = acquire_rag_service(session_id)
+    try:
+        yield service
+    finally:
+        release_rag_service(session_id, service)
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls on_close once the response is over, however it ends.
+    
+    Cleanup in the finally of the body's generator does not run when the client
+    disconnects before the first chunk is pulled, since the generator never starts.
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+def get_cached_llm(provider: str, model: str, api_key: str, temperature: float):
+    """
+    Get or create an LLM instance for the given settings.
+    
+    Reusing the same instance across questions lets each session reuse the RAG
+    chain it already built for that LLM instead of rebuilding it per request.
+    Instances are cached under a hash of the API key, not the key itself.
+    """
+    key = (provider, model, temperature, hashlib.blake2b(api_key.encode("utf-8")).hexdigest())
+    llm = _llms.get(key)
+    if llm is None:
+        llm = get_llm(
+            provider=provider,
+            model=model,
+            api_key=api_key,
+            temperature=temperature
+        )
+        _llms[key] = llm
+    return llm
+
+
+def save_upload(file: UploadFile, file_path: Path) -> None:
+    """Copy an uploaded file to disk in fixed-size chunks, without loading it into memory."""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(file.file, f, UPLOAD_CHUNK_SIZE)
 
 
 # ============== API Models ==============
 
+# Every endpoint declares its response model, so FastAPI serializes responses to JSON
+# bytes directly with pydantic-core instead of going through jsonable_encoder + json.dumps.
+# Models are frozen: they are built once per request and never mutated.
+
 class QuestionRequest(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
     session_id: str
     question: str
     provider: str = "groq"
@@ -69,51 +247,118 @@ class QuestionRequest(BaseModel):
 
 
 class QuestionResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     answer: str
     references: List[str]
 
 
 class UploadResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    task_id: str
+    status: str
+
+
+class UploadStatusResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    task_id: str
+    status: str  # queued, processing, completed or failed
+    message: Optional[str] = None
+    documents_indexed: Optional[int] = None
+    total_chunks: Optional[int] = None
+
+
+class HealthResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    status: str
+
+
+class MessageResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     message: str
-    documents_indexed: int
-    total_chunks: int
+
+
+async def index_documents(task_id: str, session_id: str, file_paths: List[str]) -> None:
+    """
+    Load, split and index saved files into the session's vector store.
+    
+    Runs as a background task after /upload has responded; progress and the
+    outcome are recorded in _upload_tasks for /upload/{task_id}.
+    """
+    _upload_tasks[task_id] = UploadStatusResponse(task_id=task_id, status="processing")
+    try:
+        with rag_service_in_use(session_id) as service:
+            # Load and split documents (blocking work runs in the thread pool)
+            documents = await run_in_threadpool(service.document_service.load_documents, file_paths)
+            splits = await run_in_threadpool(
+                service.document_service.split_documents,
+                documents,
+                chunk_size=service.config.chunk_size,
+                chunk_overlap=service.config.chunk_overlap
+            )
+            
+            # Add to vector store
+            await run_in_threadpool(service.vectorstore_service.add_documents, splits)
+            service.clear_caches()
+            
+            logger.info(f"Indexed {len(documents)} documents with {len(splits)} chunks")
+        
+        _upload_tasks[task_id] = UploadStatusResponse(
+            task_id=task_id,
+            status="completed",
+            message="Documents processed successfully",
+            documents_indexed=len(documents),
+            total_chunks=len(splits)
+        )
+    except Exception as e:
+        logger.error(f"Failed to process documents: {e}", exc_info=True)
+        _upload_tasks[task_id] = UploadStatusResponse(
+            task_id=task_id,
+            status="failed",
+            message=f"Failed to process documents: {str(e)}"
+        )
 
 
 # ============== API Endpoints ==============
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return HealthResponse(status="healthy")
 
 
-@app.delete("/session/{session_id}")
+@app.delete("/session/{session_id}", response_model=MessageResponse)
 async def delete_session(session_id: str):
-    """Clean up a session's resources."""
+    """Clean up a session's resources (the session's service is closed)."""
     if session_id in _sessions:
         del _sessions[session_id]
         logger.info(f"Session {session_id} cleaned up")
-        return {"message": f"Session {session_id} deleted"}
+        return MessageResponse(message=f"Session {session_id} deleted")
     raise HTTPException(status_code=404, detail="Session not found")
 
 
-@app.post("/upload", response_model=UploadResponse)
-async def upload_files(session_id: str, files: list[UploadFile] = File(...)):
+@app.post("/upload", response_model=UploadResponse, status_code=202)
+async def upload_files(session_id: str, background_tasks: BackgroundTasks, files: list[UploadFile] = File(...)):
     """
-    Upload and process PDF/HTML files.
+    Upload PDF/HTML files and queue them for indexing.
     
     - Content-Type: multipart/form-data
     - Body: One or more PDF/HTML files under the field name 'files'
     
     Files are saved to: data/upload/{uuid}/filename.ext
-    Then processed and indexed into the vector store.
+    The response is sent as soon as the files are saved; they are then processed
+    and indexed into the vector store in the background. Poll
+    /upload/{task_id} for the outcome.
     """
     # Generate unique folder for this upload batch
     upload_id = str(uuid.uuid4())
     upload_folder = UPLOAD_DIR / upload_id
-    upload_folder.mkdir(parents=True, exist_ok=True)
     
-    saved_files = []
+    files_to_save = []
     
     for file in files:
         filename = file.filename
@@ -124,54 +369,49 @@ async def upload_files(session_id: str, files: list[UploadFile] = File(...)):
             continue
         
         # Validate file type
-        if not filename.endswith(('.pdf', '.html')):
+        if Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
             logger.warning(f"Skipping unsupported file: {filename}")
             continue
         
-        # Save file
-        file_path = upload_folder / filename
+        files_to_save.append((file, upload_folder / Path(filename).name))
+    
+    if not files_to_save:
+        raise HTTPException(status_code=400, detail="No valid PDF or HTML files provided")
+    
+    # Only create the batch folder once there is something to store in it
+    upload_folder.mkdir()
+    
+    async def save_one(file: UploadFile, file_path: Path) -> str:
+        # Disk writes run in the thread pool so the event loop keeps serving requests
         try:
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
-            saved_files.append(str(file_path))
+            await run_in_threadpool(save_upload, file, file_path)
             logger.info(f"Saved file: {file_path}")
+            return str(file_path)
 
         except Exception as e:
-            logger.error(f"Failed to save {filename}: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to save {filename}")
+            logger.error(f"Failed to save {file.filename}: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to save {file.filename}")
     
-    if not saved_files:
-        raise HTTPException(status_code=400, detail="No valid PDF or HTML files provided")
+    # Save all files concurrently
+    saved_files = await asyncio.gather(*(save_one(file, path) for file, path in files_to_save))
     
-    # Process documents and add to vector store
-    try:
-        service = get_rag_service(session_id)
-        
-        # Load and split documents
-        documents = service.document_service.load_documents(saved_files)
-        splits = service.document_service.split_documents(
-            documents,
-            chunk_size=service.config.chunk_size,
-            chunk_overlap=service.config.chunk_overlap
-        )
-        
-        # Add to vector store
-        service.vectorstore_service.add_documents(splits)
-        
-        logger.info(f"Indexed {len(documents)} documents with {len(splits)} chunks")
-        
-        return UploadResponse(
-            message="Documents processed successfully",
-            documents_indexed=len(documents),
-            total_chunks=len(splits)
-        )
-    except Exception as e:
-        logger.error(f"Failed to process documents: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to process documents: {str(e)}")
+    # The upload id doubles as the task id
+    _upload_tasks[upload_id] = UploadStatusResponse(task_id=upload_id, status="queued")
+    background_tasks.add_task(index_documents, upload_id, session_id, saved_files)
+    
+    return UploadResponse(task_id=upload_id, status="queued")
+
 
+@app.get("/upload/{task_id}", response_model=UploadStatusResponse)
+async def get_upload_status(task_id: str):
+    """Get the status of a background indexing task started by /upload."""
+    task = _upload_tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Upload task not found")
+    return task
 
-@app.get("/models")
+
+@app.get("/models", response_model=dict[str, list[tuple[str, str]]])
 async def get_available_models():
     """Get available models for each provider."""    
     config = RAGConfig()
@@ -195,16 +435,16 @@ async def ask_question(request: QuestionRequest):
     Returns the answer and references from source documents.
     """
     try:
-        service = get_rag_service(request.session_id)
-        llm = get_llm(
+        llm = get_cached_llm(
             provider=request.provider,
             model=request.model,
             api_key=request.api_key,
             temperature=request.temperature
-        )       
+        )
         
-        # Generate answer
-        answer, references = service.query_with_sources(request.question, llm)
+        # Generate answer (retrieval and the LLM call block, so run them in the thread pool)
+        with rag_service_in_use(request.session_id) as service:
+            answer, references = await run_in_threadpool(service.query_with_sources, request.question, llm)
         
         return QuestionResponse(
             answer=answer,
@@ -220,8 +460,72 @@ async def ask_question(request: QuestionRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/question/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """
+    Ask a question and stream the answer as Server-Sent Events.
+    
+    - Content-Type: application/json
+    - Body: same as /question
+    
+    Answer tokens are sent as they are generated, as `data:` events holding a
+    JSON-encoded string. Once the answer is complete, a final `references` event
+    holds the JSON list of source document contents. Errors raised after the
+    stream has started are reported as an `error` event.
+    """
+    service = None
+    try:
+        llm = get_cached_llm(
+            provider=request.provider,
+            model=request.model,
+            api_key=request.api_key,
+            temperature=request.temperature
+        )
+        
+        # Retrieval blocks, so run it in the thread pool; generation is streamed below.
+        # The service stays in use until the stream ends.
+        service = acquire_rag_service(request.session_id)
+        references, chunks = await run_in_threadpool(service.stream_with_sources, request.question, llm)
+
+    except ValueError as e:
+        logger.error(f"Configuration error: {e}")
+        if service is not None:
+            release_rag_service(request.session_id, service)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        logger.error(f"Query failed: {e}", exc_info=True)
+        if service is not None:
+            release_rag_service(request.session_id, service)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in chunks:
+                yield b"data: " + orjson.dumps(chunk) + b"\n\n"
+            yield b"event: references\ndata: " + orjson.dumps(references) + b"\n\n"
+        except Exception as e:
+            logger.error(f"Streaming failed: {e}", exc_info=True)
+            yield b"event: error\ndata: " + orjson.dumps(str(e)) + b"\n\n"
+
+    return ReleasingStreamingResponse(
+        event_stream(),
+        on_close=functools.partial(release_rag_service, request.session_id, service),
+        media_type="text/event-stream"
+    )
+
+
 # ============== Main (for testing) ==============
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Without a shared Chroma server (CHROMA_HOST) sessions live in-process, so keep
+    # a single worker unless requests are routed to workers with session affinity.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+        loop="uvloop",
+        http="httptools",
+    )
\ No newline at end of file
@@ -5,7 +5,8 @@ This module provides functionality to create RAG chains that combine document re
 with answer generation using language models.
 """
 import logging
-from typing import Optional
+from typing import Iterable, Optional, Sequence
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough, Runnable
 from langchain_core.output_parsers import StrOutputParser
@@ -14,9 +15,35 @@ from langchain_core.retrievers import BaseRetriever
 
 logger = logging.getLogger(__name__)
 
+
+"""Separator placed between documents in the prompt context."""
+CONTEXT_SEPARATOR = "\n\n"
+
+
+def format_docs(docs: Iterable[Document]) -> str:
+    """Format retrieved documents into a single context string."""
+    # str.join materializes generators first; a list comprehension skips that step
+    return CONTEXT_SEPARATOR.join([doc.page_content for doc in docs])
+
+
+def format_context(contents: Sequence[str], stable_order: bool = False) -> str:
+    """
+    Join retrieved document contents into the prompt context.
+    
+    Args:
+        contents: Page contents of the retrieved documents, in rank order.
+        stable_order: If True, sort the contents so the same set of documents always
+                      produces the same context (and prompt prefix), whatever their rank.
+    
+    Returns:
+        str: The context string.
+    """
+    return CONTEXT_SEPARATOR.join(sorted(contents) if stable_order else contents)
+
+
 def create_rag_chain(
     llm: BaseChatModel,
-    retriever: BaseRetriever,
+    retriever: Optional[BaseRetriever] = None,
     system_prompt: Optional[str] = None
 ) -> Runnable:
     """
@@ -29,20 +56,32 @@ def create_rag_chain(
     4. Generates answer using the language model
     5. Parses and returns the answer as a string
     
+    The system prompt is sent as a separate system message, followed by a human message
+    with the context and then the question, which keeps the prefix cacheable by providers.
+    
+    When no retriever is given, steps 1-2 are skipped and the chain expects the
+    caller to provide the already formatted context. This lets callers that also
+    need the retrieved documents (e.g. to return references) retrieve only once.
+    
     Args:
         llm: Language model instance for answer generation.
-        retriever: Document retriever for finding relevant documents.
+        retriever: Optional document retriever for finding relevant documents.
+                   If None, the chain takes {"context": str, "question": str}.
         system_prompt: Optional custom system prompt. If None, uses default
                       Portuguese legal assistant prompt.
     
     Returns:
-        Runnable: A LangChain runnable chain that takes a question (str) and returns an answer (str).
+        Runnable: A LangChain runnable chain that takes a question (str), or a
+                  {"context", "question"} dict when retriever is None, and returns an answer (str).
     
     Example:
         >>> from langchain_community.chat_models import ChatMaritalk
         >>> llm = ChatMaritalk(api_key="...", model="sabia-3")
         >>> chain = create_rag_chain(llm, retriever)
         >>> answer = chain.invoke("O que é alienação fiduciária?")
+        >>> # Or with pre-retrieved documents:
+        >>> chain = create_rag_chain(llm)
+        >>> answer = chain.invoke({"context": format_context(contents), "question": "O que é alienação fiduciária?"})
     """
     logger.info("Creating RAG chain")
     
@@ -54,27 +93,17 @@ def create_rag_chain(
     else:
         logger.debug("Using custom system prompt")
     
-    template = f"""{system_prompt}
-
-                    Contexto:
-                    {{context}}
-
-                    Pergunta: {{question}}
-
-                    Resposta:"""
-    
-    prompt = ChatPromptTemplate.from_template(template)
-    
-    def format_docs(docs):
-        """Format retrieved documents into a single context string."""
-        return "\n\n".join(doc.page_content for doc in docs)
+    # Static instructions go in their own system message ahead of the retrieved context and
+    # the question, so the prompt prefix shared across questions is as long as possible and
+    # can be served from the provider's prompt cache
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("human", "Contexto:\n{context}\n\nPergunta: {question}\n\nResposta:"),
+    ])
     
-    chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | prompt
-        | llm
-        | StrOutputParser()
-    )
+    chain = prompt | llm | StrOutputParser()
+    if retriever is not None:
+        chain = {"context": retriever | format_docs, "question": RunnablePassthrough()} | chain
     
     logger.info("RAG chain created successfully")
     return chain
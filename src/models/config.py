@@ -4,9 +4,10 @@ Configuration module for RAG system settings.
 This module defines the RAGConfig dataclass that holds all configuration parameters
 for the RAG system, including paths, model settings, and retrieval parameters.
 """
+import os
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import torch
 
 
@@ -24,14 +25,53 @@ class RAGConfig:
                          Default: intfloat/multilingual-e5-large, because it is a multilingual model and it is fast.
         model_kwargs: Dictionary of arguments for the embedding model.
                      Default: Auto-detects CUDA/CPU device.
+        embedding_half_precision: Run the embedding model in BF16 (or FP16 on GPUs without
+                                  BF16 support) when it is on CUDA. Default: True.
         encode_kwargs: Dictionary of arguments for encoding embeddings.
-                      Default: Normalizes embeddings (essential for cosine similarity).
+                      Default: Normalizes embeddings (essential for cosine similarity)
+                      and encodes in batches of embed_batch_size texts.
+        embed_batch_size: Number of chunks sent through the embedding model per forward pass.
+                          Default: 32 on CUDA, 8 on CPU.
+        embedding_cache_dir: Directory of the persistent cache of chunk embeddings, keyed by
+                             content hash and shared by all sessions. Default:
+                             EMBEDDING_CACHE_DIR env var, or None (disabled).
+        quantize_embedding_cache: Store cached chunk embeddings int8-quantized (about 4x
+                                  smaller than float32). Default: False.
+        ingest_batch_size: Number of chunks embedded and written to the vector store per call.
+                           Default: INGEST_BATCH_SIZE env var, or 128.
+        ingest_index_path: SQLite database recording the chunks indexed per collection on
+                           the shared Chroma server, as hints confirmed against it.
+                           Default: INGEST_INDEX_PATH env var, or None (disabled).
+        metadata_fields: Metadata keys stored with each chunk. Default: ("source", "page").
         chunk_size: Maximum size of document chunks in characters. Default: 700.
         chunk_overlap: Number of characters to overlap between consecutive chunks.
                       Default: 100.
         retrieval_k: Number of documents to retrieve for each query. Default: 4.
         retrieval_strategy: Retrieval strategy to use. Options: "similarity" or "mmr".
                            Default: "similarity".
+        rerank: Rerank retrieved candidates with a cross-encoder. Default: RERANK env var, or False.
+        rerank_model: Cross-encoder used for reranking.
+                      Default: cross-encoder/mmarco-mMiniLMv2-L12-H384-v1 (multilingual).
+        distance_metric: HNSW distance of the session collections. Default: "ip" (inner
+                         product), equal to cosine similarity for normalized embeddings.
+        stable_context_order: Order retrieved chunks by content instead of by rank in the
+                              prompt, so questions retrieving the same chunks send an identical
+                              prompt prefix and hit provider-side prompt caches. Ignored
+                              when rerank is enabled. Default: False.
+        answer_cache_size: Maximum number of answers cached per session. 0 disables the cache.
+                           Default: 512.
+        answer_cache_similarity: Minimum cosine similarity for a question to reuse a cached
+                                 answer of a near-duplicate question. Default: 0.97.
+        retrieval_cache_size: Maximum number of queries whose retrieved documents are cached
+                              per session. 0 disables the cache. Default: 256.
+        retrieval_cache_similarity: Minimum cosine similarity for a query to reuse the documents
+                                    retrieved for a near-duplicate query. Default: 0.97.
+        retrieval_cache_ttl: Seconds retrieved documents stay cached. 0 disables expiry.
+                             Default: 3600.
+        chroma_host: Host of a shared Chroma server. When set, session collections live on
+                     the server and are visible to every API worker. Default: CHROMA_HOST
+                     env var, or None for an in-process store.
+        chroma_port: Port of the shared Chroma server. Default: CHROMA_PORT env var, or 8000.
     
 
     """
@@ -85,15 +125,82 @@ class RAGConfig:
         default_factory=lambda: {"device": torch.device("cuda" if torch.cuda.is_available() else "cpu")}
     )
 
+    """
+    Run the embedding model in half precision when it is on CUDA.
+    
+    Halves memory and bandwidth of the encoder forward pass; the loss of precision is
+    negligible for cosine search. BF16 is used on GPUs that support it (Ampere and newer),
+    since it keeps FP32's exponent range; older GPUs use FP16. Ignored on CPU.
+    """
+    embedding_half_precision: bool = True
+
+    """
+    Number of chunks sent through the embedding model per forward pass.
+    
+    Default (None): 32 on CUDA, where encoder throughput saturates memory bandwidth
+    around that size, and 8 on CPU, where larger batches only add padding work.
+    """
+    embed_batch_size: Optional[int] = None
+
     """
     Arguments for encoding embeddings.
     
     Default: Normalizes embeddings (essential for cosine similarity search).
+    The batch size is filled in from embed_batch_size in __post_init__.
     """
     encode_kwargs: Dict = field(
         default_factory=lambda: {"normalize_embeddings": True}
     )    
     
+    """
+    Directory of the persistent cache of chunk embeddings.
+    
+    Chunks are keyed by a hash of the encoder (model, backend, dtype and normalization)
+    and their content, so a document that was already indexed (by any session, or before
+    a restart) is not embedded again. None or "" disables the cache.
+    """
+    embedding_cache_dir: Optional[str] = field(
+        default_factory=lambda: os.getenv("EMBEDDING_CACHE_DIR") or None
+    )
+
+    """
+    Store cached chunk embeddings int8-quantized.
+    
+    Each vector takes 1 byte per dimension plus a scale on disk. Vectors read back from
+    the cache are approximations with a cosine error in the order of 1e-3, well below the
+    differences that decide retrieval ranking. Newly embedded chunks get the same
+    approximation, so a chunk's stored vector does not depend on whether it was cached.
+    """
+    quantize_embedding_cache: bool = False
+
+    """
+    Number of chunks embedded and written to the vector store per call.
+    
+    Bounds the memory of large uploads; Chroma recommends batches of 50-250.
+    """
+    ingest_batch_size: int = field(default_factory=lambda: int(os.getenv("INGEST_BATCH_SIZE", "128")))
+
+    """
+    SQLite database recording the chunks indexed per collection.
+    
+    Shared by the worker processes writing to the Chroma server (chroma_host); ignored
+    for in-process collections. Recorded chunks are only hints, confirmed against the
+    collection, and stale rows are removed. None or "" disables the index.
+    """
+    ingest_index_path: Optional[str] = field(
+        default_factory=lambda: os.getenv("INGEST_INDEX_PATH") or None
+    )
+
+    """
+    Metadata keys stored with each chunk in the vector store.
+    
+    PDF loaders copy the document metadata (producer, creator, dates, page count, page
+    label...) into every chunk. Only the source file and page identify where a chunk
+    comes from, so the rest is dropped instead of being written with every row.
+    None stores all metadata.
+    """
+    metadata_fields: Optional[tuple] = ("source", "page")
+
     """Maximum size of document chunks in characters."""
     chunk_size: int = 700
     
@@ -110,4 +217,90 @@ class RAGConfig:
         - "similarity": Cosine similarity search (faster, may return similar documents)
         - "mmr": Maximum Marginal Relevance (slower, returns more diverse documents)
     """
-    retrieval_strategy: str = "similarity"
\ No newline at end of file
+    retrieval_strategy: str = "similarity"
+
+    """
+    Rerank retrieved chunks with a cross-encoder.
+    
+    retrieval_k * 5 candidates are retrieved with the bi-encoder, scored against the question
+    by the cross-encoder (tens of ms on CPU for a MiniLM model) and the retrieval_k best kept.
+    Improves the ordering and precision of the context at the cost of that extra pass.
+    """
+    rerank: bool = field(default_factory=lambda: os.getenv("RERANK", "false").strip().lower() == "true")
+
+    """HuggingFace cross-encoder used for reranking. Multilingual, since the manuals are in Portuguese."""
+    rerank_model: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+    """
+    Distance used by the vector index ("ip", "cosine" or "l2").
+    
+    encode_kwargs normalizes embeddings, so inner product equals cosine similarity and
+    avoids re-normalizing vectors on every comparison. Use "cosine" with a model whose
+    embeddings are not normalized.
+    """
+    distance_metric: str = "ip"
+
+    """
+    Order retrieved chunks deterministically (by content) in the prompt context.
+    
+    Providers cache the longest previously seen prompt prefix (Groq and Gemini implicit
+    caching, Ollama's KV cache of the loaded model). Questions in a session often retrieve
+    the same chunks in a different rank order; a stable order keeps the context identical,
+    so only the question itself is prefilled again. References are still returned by rank.
+    Off by default, since models weigh the first chunks of the context most, and ignored
+    when rerank is enabled, whose order is the point of reranking.
+    """
+    stable_context_order: bool = False
+
+    """Maximum number of answers cached per session. 0 disables the cache."""
+    answer_cache_size: int = 512
+
+    """Minimum cosine similarity for a question to reuse the answer of a near-duplicate question."""
+    answer_cache_similarity: float = 0.97
+
+    """
+    Maximum number of queries whose retrieved documents are cached per session. 0 disables the cache.
+    
+    Unlike the answer cache, it is shared by every LLM, so a question already asked with
+    another model skips the vector search (and reranking) and only runs generation.
+    """
+    retrieval_cache_size: int = 256
+
+    """Minimum cosine similarity for a query to reuse the documents retrieved for a near-duplicate query."""
+    retrieval_cache_similarity: float = 0.97
+
+    """
+    Seconds the documents retrieved for a query stay cached. 0 disables expiry.
+    
+    The cache is cleared whenever documents are indexed; the expiry additionally bounds
+    how long a long-lived session keeps results of questions nobody asks anymore.
+    """
+    retrieval_cache_ttl: float = 3600.0
+
+    """
+    Shared Chroma server.
+    
+    When chroma_host is set, session collections are stored on the server so any API
+    worker can serve any session. Otherwise each process keeps its own in-memory store.
+    """
+    chroma_host: Optional[str] = field(default_factory=lambda: os.getenv("CHROMA_HOST") or None)
+    chroma_port: int = field(default_factory=lambda: int(os.getenv("CHROMA_PORT", "8000")))
+
+    def __post_init__(self):
+        on_cuda = str(self.model_kwargs.get("device", "")).startswith("cuda")
+        if self.embed_batch_size is None:
+            self.embed_batch_size = 32 if on_cuda else 8
+        # Copied before filling in defaults, so dicts passed in by the caller are not mutated
+        self.encode_kwargs = {**self.encode_kwargs}
+        self.encode_kwargs.setdefault("batch_size", self.embed_batch_size)
+        # Passed through HuggingFaceEmbeddings to SentenceTransformer(model_kwargs=...)
+        if self.embedding_half_precision and on_cuda:
+            self.model_kwargs = {**self.model_kwargs, "model_kwargs": {**self.model_kwargs.get("model_kwargs", {})}}
+            self.model_kwargs["model_kwargs"].setdefault("torch_dtype", _half_precision_dtype())
+
+
+def _half_precision_dtype() -> torch.dtype:
+    """Return BF16 if the CUDA device supports it, otherwise FP16."""
+    if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+        return torch.bfloat16
+    return torch.float16
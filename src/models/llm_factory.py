@@ -13,6 +13,12 @@ from langchain_ollama import ChatOllama
 
 logger = logging.getLogger(__name__)
 
+# Retries of rate-limited (429) and transient 5xx provider responses. The provider SDKs
+# back off exponentially between attempts and honor Retry-After headers.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Seconds before a provider request is abandoned and retried; 0 means no limit
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60")) or None
+
 
 def get_llm(
     provider: str,
@@ -46,6 +52,8 @@ def get_llm(
             model=model,
             temperature=temperature,
             api_key=key,  # type: ignore[arg-type]
+            max_retries=LLM_MAX_RETRIES,
+            request_timeout=LLM_TIMEOUT,
         )
     
     elif provider == "gemini":
@@ -57,6 +65,8 @@ def get_llm(
             model=model,
             temperature=temperature,
             google_api_key=key,
+            max_retries=LLM_MAX_RETRIES,
+            timeout=LLM_TIMEOUT,
         )
     
     elif provider == "ollama":
@@ -1,12 +1,27 @@
 """Document Service module for loading and processing documents."""
+import functools
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader, BSHTMLLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 logger = logging.getLogger(__name__)
 
+
+@functools.lru_cache(maxsize=8)
+def get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Get a text splitter for the given chunk settings, reused across calls."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+    )
+
+
 class DocumentService:
     """
     Service for loading and processing documents from various formats.
@@ -15,7 +30,20 @@ class DocumentService:
     chunks suitable for vector storage. Errors during loading are logged
     but don't stop the process.    
 
+    Attributes:
+        max_workers: Maximum number of files loaded concurrently. Defaults to the CPU count.
+
     """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Initialize the document service.
+        
+        Args:
+            max_workers: Maximum number of files loaded concurrently.
+                         If None, uses the number of CPUs.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
     
     @staticmethod
     def load_pdf_document(file_path: str, **kwargs):
@@ -35,10 +63,45 @@ class DocumentService:
         return HTML_loader.load()
 
 
+    def load_document(self, file_path: str) -> List[Document]:
+        """
+        Load a single PDF or HTML file.
+        
+        Errors are logged and result in an empty list, so one bad file does not
+        stop a batch.
+        
+        Args:
+            file_path: Path of the file to load.
+        """
+        try:
+            logger.debug(f"Loading file: {file_path}")
+            suffix = Path(file_path).suffix.lower()
+            if suffix == ".pdf":                                                    
+                documents = self.load_pdf_document(file_path)
+                logger.debug(f"PDF loaded successfully: {file_path}")
+                return documents
+
+            elif suffix == ".html":
+                documents = self.load_html_document(file_path, open_encoding="latin-1")
+                logger.debug(f"HTML loaded successfully: {file_path}")
+                return documents
+
+            else:
+                logger.warning(f"Unsupported file type: {file_path}")                    
+
+        except Exception as e:
+            logger.error(f"Error loading file: {file_path}: {e}")
+
+        return []
+
+
     def load_documents(self, file_paths: str | list[str]) -> List[Document]:
         """
         Load documents from a file path or list of file paths.
         
+        Multiple files are loaded concurrently in a thread pool; the returned
+        documents keep the order of file_paths.
+        
         Args:
             file_paths: Single file path (str) or list of file paths to load.
         """
@@ -46,26 +109,15 @@ class DocumentService:
         if isinstance(file_paths, str):
             file_paths = [file_paths]
         
-        documents = []
-
-        for file_path in file_paths:
-            try:
-                logger.debug(f"Loading file: {file_path}")
-                if file_path.endswith(".pdf"):                                                    
-                    documents.extend(self.load_pdf_document(file_path))
-                    logger.debug(f"PDF loaded successfully: {file_path}")
-
-                elif file_path.endswith(".html"):
-                    documents.extend(self.load_html_document(file_path, open_encoding="latin-1"))
-                    logger.debug(f"HTML loaded successfully: {file_path}")
-
-                else:
-                    logger.warning(f"Unsupported file type: {file_path}")                    
-
-            except Exception as e:
-                logger.error(f"Error loading file: {file_path}: {e}")
-                
+        if len(file_paths) <= 1 or self.max_workers <= 1:
+            results = [self.load_document(file_path) for file_path in file_paths]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(file_paths))) as executor:
+                results = list(executor.map(self.load_document, file_paths))
 
+        documents = []
+        for loaded in results:
+            documents.extend(loaded)
         return documents
     
 
@@ -127,14 +179,8 @@ class DocumentService:
             - Larger chunk_size preserves more context but may include irrelevant information
             - Overlap helps maintain context across chunk boundaries
             - The splitter uses a recursive approach to split on various separators
+            - Splitters are cached per (chunk_size, chunk_overlap) and reused across calls
         """
-        from langchain_text_splitters import RecursiveCharacterTextSplitter
-        
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-        )
-        
+        text_splitter = get_text_splitter(chunk_size, chunk_overlap)
         return text_splitter.split_documents(documents)
 
@@ -1,11 +1,17 @@
 """RAG Service module for orchestrating retrieval-augmented generation."""
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+from langchain_core.embeddings import Embeddings
 from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
 from .vectorstore_service import VectorStoreService
 from .document_service import DocumentService
-from ..chains.rag_chain import create_rag_chain
+from .retrieval_service import RetrievalService
+from ..chains.rag_chain import create_rag_chain, format_context
 from ..models.config import RAGConfig
+from ..utils.cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
@@ -21,20 +27,42 @@ class RAGService:
         _vectorstore_service: Lazy-loaded vector store service instance.
         _document_service: Lazy-loaded document service instance.
         _retrieval_service: Lazy-loaded retrieval service instance.  
+        _chain_cache: RAG chains already built for LLM instances, keyed by id(llm).
+        answer_cache: Cache of (answer, references) keyed by question, per LLM model.
 
     """
+
+    """Maximum number of RAG chains kept per session."""
+    CHAIN_CACHE_SIZE = 16
     
-    def __init__(self, config: Optional[RAGConfig] = None, session_id:str = 'Default'):
+    def __init__(
+        self,
+        config: Optional[RAGConfig] = None,
+        session_id:str = 'Default',
+        embeddings: Optional[Embeddings] = None
+    ):
         """
         Initialize the RAG service.
         
         Args:
             config: Configuration object for the RAG system. If None, uses default configuration.
+            session_id: Session identifier, used to name the session's vector store collection.
+            embeddings: Optional preloaded embeddings shared across sessions. If None, the
+                        vector store service loads the model from config on first use.
         """
         self.config = config or RAGConfig()
         self.session_id = session_id
+        self._embeddings = embeddings
         self._vectorstore_service = None
         self._document_service = None
+        self._retrieval_service = None
+        self._chain_cache: OrderedDict[int, tuple[BaseChatModel, Runnable]] = OrderedDict()
+        # Questions of a session are answered concurrently in the thread pool
+        self._chain_lock = threading.Lock()
+        self.answer_cache = SemanticCache(
+            maxsize=self.config.answer_cache_size,
+            threshold=self.config.answer_cache_similarity
+        )
 
     
     @property
@@ -50,7 +78,16 @@ class RAGService:
                 collection_name=f"session_{self.session_id}",
                 embedding_model=self.config.embedding_model,
                 model_kwargs=self.config.model_kwargs,
-                encode_kwargs=self.config.encode_kwargs
+                encode_kwargs=self.config.encode_kwargs,
+                chroma_host=self.config.chroma_host,
+                chroma_port=self.config.chroma_port,
+                embeddings=self._embeddings,
+                distance_metric=self.config.distance_metric,
+                batch_size=self.config.ingest_batch_size,
+                embedding_cache_dir=self.config.embedding_cache_dir,
+                quantize_embedding_cache=self.config.quantize_embedding_cache,
+                ingest_index_path=self.config.ingest_index_path,
+                metadata_fields=self.config.metadata_fields
             )
         return self._vectorstore_service
     
@@ -66,17 +103,70 @@ class RAGService:
         if self._document_service is None:
             self._document_service = DocumentService()
         return self._document_service
+
+
+    @property
+    def retrieval_service(self) -> RetrievalService:
+        """
+        Get or create the retrieval service instance (lazy loading).
+        
+        Every retrieval goes through it: it caches retrieved documents per query,
+        computes MMR with numpy over candidates fetched in a single query, and
+        reranks with a cross-encoder. Reset whenever the vector store is recreated.
+        
+        Returns:
+            RetrievalService: The retrieval service instance.
+        """
+        if self._retrieval_service is None:
+            self._retrieval_service = RetrievalService(
+                self.vectorstore_service.vectorstore,
+                rerank_model=self.config.rerank_model,
+                cache_size=self.config.retrieval_cache_size,
+                cache_similarity=self.config.retrieval_cache_similarity,
+                cache_ttl=self.config.retrieval_cache_ttl
+            )
+        return self._retrieval_service
+
+
+    def get_chain(self, llm: BaseChatModel) -> Runnable:
+        """
+        Get or create the RAG chain for an LLM instance.
+        
+        Chains are cached per LLM instance, so callers should reuse LLM objects
+        across questions (see main.get_cached_llm) to benefit from the cache.
+        The chain does not retrieve by itself: it takes {"context", "question"}.
+        
+        Args:
+            llm: The language model instance.
+        
+        Returns:
+            Runnable: The RAG chain bound to the LLM.
+        """
+        with self._chain_lock:
+            entry = self._chain_cache.get(id(llm))
+            if entry is not None and entry[0] is llm:
+                self._chain_cache.move_to_end(id(llm))
+                return entry[1]
+
+            chain = create_rag_chain(llm)
+            self._chain_cache[id(llm)] = (llm, chain)
+            while len(self._chain_cache) > self.CHAIN_CACHE_SIZE:
+                self._chain_cache.popitem(last=False)
+            return chain
     
 
     def initialize_vectorstore(self, force_rebuild: bool = False) -> None:
+        self._retrieval_service = None
         if force_rebuild or not self.vectorstore_service.exists():
             logger.info("Creating empty vector store...")
             self.vectorstore_service.create_empty_vectorstore()
+            # Cached answers were generated from the previous contents
+            self.clear_caches()
             logger.info("Empty vector store created successfully")
 
         else:
             logger.info("Loading existing vector store...")
-            _ = self.vectorstore_service.vectorstore  
+            self.vectorstore_service.preload()
             logger.info("Vector store loaded successfully")
 
 
@@ -108,7 +198,46 @@ class RAGService:
 
         logger.info("Adding documents to vector store...")
         self.vectorstore_service.add_documents(splits)
+        self.clear_caches()
         logger.info("Documents added to vector store successfully")
+
+
+    def close(self) -> None:
+        """
+        Release the session's resources: its vector store and caches.
+        
+        The service can still be used afterwards; the vector store is recreated empty.
+        """
+        if self._vectorstore_service is not None:
+            self._vectorstore_service.close()
+        self._retrieval_service = None
+        with self._chain_lock:
+            self._chain_cache.clear()
+        self.clear_caches()
+        logger.info(f"RAG service closed for session: {self.session_id}")
+
+
+    def clear_answer_cache(self) -> None:
+        """
+        Drop all cached answers.
+        
+        Must be called whenever new documents are indexed, since cached answers
+        were generated from the previous contents of the vector store.
+        """
+        self.answer_cache.clear()
+        logger.debug("Answer cache cleared")
+
+
+    def clear_caches(self) -> None:
+        """
+        Drop all cached answers and retrieval results.
+        
+        Must be called whenever new documents are indexed, since both were computed
+        from the previous contents of the vector store.
+        """
+        self.clear_answer_cache()
+        if self._retrieval_service is not None:
+            self._retrieval_service.clear_cache()
     
 
     def query_with_sources(self, question: str, llm: BaseChatModel) -> tuple[str, list[str]]:
@@ -117,6 +246,9 @@ class RAGService:
             
             This method performs a single retrieval operation and uses the results
             for both generating the answer and returning source references.
+            Answers are cached per model: a repeated question (exact match after
+            normalization) or a near-duplicate one (embedding similarity above
+            config.answer_cache_similarity) skips retrieval and generation.
             
             Args:
                 question: The question to ask.
@@ -125,19 +257,117 @@ class RAGService:
             Returns:
                 tuple: (answer, references) where references are source document contents.
             """
-            # Create retriever
-            vectorstore = self.vectorstore_service.vectorstore
-            retriever = vectorstore.as_retriever(
-                search_type=self.config.retrieval_strategy,
-                search_kwargs={"k": self.config.retrieval_k}
-            )
-            
+            cache_namespace = self._llm_cache_namespace(llm)
+            cached, question_embedding = self._get_cached_answer(cache_namespace, question)
+            if cached is not None:
+                return cached
+
             # Single retrieval
-            docs = retriever.invoke(question)
-            references = [doc.page_content for doc in docs]
+            references = self.retrieve_references(question)
+            
+            # Generate answer using retrieved docs (no second retrieval inside the chain)
+            chain = self.get_chain(llm)
+            # The context is built from the reference strings already extracted above
+            answer = chain.invoke({"context": self._format_context(references), "question": question})
+            
+            self.answer_cache.set(cache_namespace, question, (answer, references), question_embedding)
+            return answer, references
+
+
+    def stream_with_sources(self, question: str, llm: BaseChatModel) -> tuple[list[str], AsyncIterator[str]]:
+            """
+            Retrieve source references and return an async stream of the answer.
+            
+            Retrieval (and the answer cache lookup) run synchronously, so the references
+            are known before the first token is generated. The returned iterator yields
+            answer chunks as the LLM produces them; once fully consumed, the complete
+            answer is stored in the answer cache. A cached answer is yielded as one chunk.
             
-            # Generate answer using retrieved docs
-            chain = create_rag_chain(llm, retriever)
-            answer = chain.invoke(question)
+            Args:
+                question: The question to ask.
+                llm: The language model instance.
             
-            return answer, references
\ No newline at end of file
+            Returns:
+                tuple: (references, chunks) where references are source document contents
+                       and chunks is an async iterator over the answer text.
+            
+            Example:
+                >>> references, chunks = service.stream_with_sources("What is RAG?", llm)
+                >>> async for chunk in chunks:
+                ...     print(chunk, end="")
+            """
+            cache_namespace = self._llm_cache_namespace(llm)
+            cached, question_embedding = self._get_cached_answer(cache_namespace, question)
+            if cached is not None:
+                answer, references = cached
+
+                async def replay() -> AsyncIterator[str]:
+                    yield answer
+
+                return references, replay()
+
+            references = self.retrieve_references(question)
+            chain = self.get_chain(llm)
+
+            async def generate() -> AsyncIterator[str]:
+                parts = []
+                async for chunk in chain.astream({"context": self._format_context(references), "question": question}):
+                    parts.append(chunk)
+                    yield chunk
+                # Only complete answers are cached; an interrupted stream leaves no entry
+                self.answer_cache.set(cache_namespace, question, ("".join(parts), references), question_embedding)
+
+            return references, generate()
+
+
+    def _format_context(self, references: list[str]) -> str:
+        """Build the prompt context from the retrieved references, in rank order after reranking."""
+        return format_context(
+            references,
+            stable_order=self.config.stable_context_order and not self.config.rerank
+        )
+
+
+    def retrieve_references(self, question: str) -> list[str]:
+        """
+        Retrieve the contents of the documents most relevant to a question.
+        
+        Args:
+            question: The question to retrieve documents for.
+        
+        Returns:
+            list[str]: Page contents of the retrieved documents.
+        """
+        docs = self.retrieval_service.retrieve(
+            question,
+            strategy=self.config.retrieval_strategy,
+            k=self.config.retrieval_k,
+            rerank=self.config.rerank
+        )
+        return [doc.page_content for doc in docs]
+
+
+    def _get_cached_answer(self, cache_namespace: str, question: str) -> tuple[Optional[tuple[str, list[str]]], Optional[list[float]]]:
+        """
+        Look up a cached (answer, references) pair for a question.
+        
+        Returns:
+            tuple: (cached, question_embedding). cached is None on a miss; question_embedding
+                   is the embedding computed for the semantic lookup (None if not needed),
+                   to be passed back to the cache when storing the new answer.
+        """
+        cached = self.answer_cache.get_exact(cache_namespace, question)
+        question_embedding = None
+        if cached is None and self.config.answer_cache_size > 0:
+            question_embedding = self.vectorstore_service.embeddings.embed_query(question)
+            cached = self.answer_cache.get_similar(cache_namespace, question_embedding)
+        if cached is not None:
+            logger.info("Answer served from cache")
+        return cached, question_embedding
+
+
+    @staticmethod
+    def _llm_cache_namespace(llm: BaseChatModel) -> str:
+        """Identify the model behind an LLM instance, so cached answers are not shared across models."""
+        model = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+        return f"{type(llm).__name__}/{model}/{getattr(llm, 'temperature', None)}"
@@ -1,71 +1,389 @@
 """Retrieval Service module for document retrieval strategies."""
+import functools
 import logging
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from sentence_transformers import CrossEncoder
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
 from langchain_chroma import Chroma
+from ..utils.cache import SemanticCache
+
+try:
+    import simsimd
+except ImportError:  # Optional: pip install .[simd]
+    simsimd = None
+
+try:
+    from numba import njit
+except ImportError:  # Optional: pip install .[jit]
+    njit = None
 
 logger = logging.getLogger(__name__)
 
+
+"""Default reranker: multilingual MiniLM cross-encoder trained on mMARCO (covers Portuguese)."""
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+@functools.lru_cache(maxsize=4)
+def get_cross_encoder(model_name: str = DEFAULT_RERANK_MODEL) -> CrossEncoder:
+    """
+    Load a cross-encoder once per process; every session shares the same instance.
+    
+    Args:
+        model_name: Name of the HuggingFace cross-encoder model.
+    
+    Returns:
+        CrossEncoder: The loaded model.
+    """
+    logger.info(f"Loading cross-encoder: {model_name}")
+    return CrossEncoder(model_name)
+
+
+def _dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise dot products of the rows of a and b, with SimSIMD kernels when installed."""
+    if simsimd is not None:
+        return np.asarray(simsimd.cdist(a, b, metric="dot"), dtype=np.float32)
+    return a @ b.T
+
+
+def _mmr_select(
+    similarity_to_query: np.ndarray,
+    similarity_between: np.ndarray,
+    k: int,
+    lambda_mult: float
+) -> np.ndarray:
+    """
+    MMR selection loop over precomputed similarities, written as scalar loops for numba.
+
+    Equivalent to the vectorized loop in _mmr_numpy(), but compiled it fuses the score
+    computation, masking of selected candidates and argmax into one pass per step,
+    without allocating temporary arrays. Not compiled with fastmath, which assumes no
+    infinities while the running maxima start at -inf.
+
+    Args:
+        similarity_to_query: Similarity of each candidate to the query.
+        similarity_between: Pairwise similarities of the candidates.
+        k: Number of candidates to select (at most the number of candidates).
+        lambda_mult: Trade-off between relevance (1) and diversity (0).
+
+    Returns:
+        np.ndarray: Indices of the selected candidates, in selection order.
+    """
+    n = similarity_to_query.shape[0]
+    selected = np.empty(k, dtype=np.int64)
+    is_selected = np.zeros(n, dtype=np.bool_)
+    max_similarity_to_selected = np.full(n, -np.inf)
+    for step in range(k):
+        best = -1
+        best_score = -np.inf
+        for i in range(n):
+            if is_selected[i]:
+                continue
+            if step == 0:
+                score = similarity_to_query[i]
+            else:
+                score = lambda_mult * similarity_to_query[i] - (1 - lambda_mult) * max_similarity_to_selected[i]
+            if best < 0 or score > best_score:
+                best = i
+                best_score = score
+        selected[step] = best
+        is_selected[best] = True
+        for i in range(n):
+            if similarity_between[i, best] > max_similarity_to_selected[i]:
+                max_similarity_to_selected[i] = similarity_between[i, best]
+    return selected
+
+
+_mmr_select_jit = njit(cache=True)(_mmr_select) if njit is not None else None
+
+
+def _mmr_numpy(
+    query_embedding: Sequence[float],
+    candidate_embeddings: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Select candidates by Maximum Marginal Relevance with vectorized similarities.
+
+    Query-candidate and candidate-candidate cosine similarities are computed once with
+    two matrix products (SimSIMD's AVX-512/NEON kernels when simsimd is installed, BLAS
+    otherwise); each selection step then only updates the running maximum similarity
+    of every candidate to the already selected ones. With numba installed, the selection
+    loop runs compiled (_mmr_select).
+
+    Args:
+        query_embedding: Embedding of the query.
+        candidate_embeddings: Embeddings of the candidates, one per row.
+        k: Number of candidates to select.
+        lambda_mult: Trade-off between relevance (1) and diversity (0).
+
+    Returns:
+        List[int]: Indices of the selected candidates, in selection order.
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    k = min(k, len(candidates))
+    if k <= 0:
+        return []
+
+    # Normalize once so dot products are cosine similarities
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    candidates = np.ascontiguousarray(
+        candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    )
+
+    similarity_to_query = _dot(query.reshape(1, -1), candidates)[0]
+    similarity_between = _dot(candidates, candidates)
+    if _mmr_select_jit is not None:
+        return _mmr_select_jit(similarity_to_query, similarity_between, k, lambda_mult).tolist()
+
+    selected = [int(np.argmax(similarity_to_query))]
+    max_similarity_to_selected = similarity_between[:, selected[0]].copy()
+    while len(selected) < k:
+        scores = lambda_mult * similarity_to_query - (1 - lambda_mult) * max_similarity_to_selected
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity_to_selected, similarity_between[:, best], out=max_similarity_to_selected)
+    return selected
+
+
+def _to_documents(results: Dict[str, Any], indices: Iterable[int]) -> List[Document]:
+    """Build Documents from the given rows of a single-query Chroma query() result."""
+    return [
+        Document(
+            id=results["ids"][0][i],
+            page_content=results["documents"][0][i],
+            metadata=results["metadatas"][0][i] or {}
+        )
+        for i in indices
+    ]
+
+
 class RetrievalService:
     """
     Service for document retrieval with different search strategies.
-    
+
     This service provides a unified interface for retrieving documents from a vector store
     using different strategies: similarity search or Maximum Marginal Relevance (MMR).
-    
+
     Attributes:
         vectorstore: The ChromaDB vector store instance to search.
-    
+        use_numpy_mmr: Run MMR with the vectorized _mmr_numpy() over candidates fetched in one
+                       Chroma query, instead of langchain-chroma's per-step Python loop.
+        rerank_model: Cross-encoder used when retrieve() is called with rerank=True.
+        rerank_fetch_factor: Candidates fetched per returned document when reranking.
+        cache: Semantic cache of retrieved documents, keyed by query and retrieval settings.
+
     Example:
         >>> service = RetrievalService(vectorstore)
         >>> docs = service.retrieve("alienação fiduciária", strategy="mmr", k=5)
     """
-    
-    def __init__(self, vectorstore: Chroma):
+
+    def __init__(
+        self,
+        vectorstore: Chroma,
+        use_numpy_mmr: bool = True,
+        rerank_model: str = DEFAULT_RERANK_MODEL,
+        rerank_fetch_factor: int = 5,
+        cache_size: int = 256,
+        cache_similarity: float = 0.97,
+        cache_ttl: float = 3600.0
+    ):
         """
         Initialize the retrieval service.
-        
+
         Args:
             vectorstore: The ChromaDB vector store instance to use for retrieval.
+            use_numpy_mmr: If True, use the vectorized MMR implementation.
+            rerank_model: Name of the cross-encoder used for reranking.
+            rerank_fetch_factor: Candidates fetched per returned document when reranking.
+            cache_size: Maximum number of queries whose results are cached. 0 disables the cache.
+            cache_similarity: Minimum cosine similarity for a query to reuse the results
+                              of a near-duplicate query.
+            cache_ttl: Seconds cached results stay valid. 0 keeps them until evicted or cleared.
         """
         self.vectorstore = vectorstore
-    
+        self.use_numpy_mmr = use_numpy_mmr
+        self.rerank_model = rerank_model
+        self.rerank_fetch_factor = rerank_fetch_factor
+        self.cache = SemanticCache(maxsize=cache_size, threshold=cache_similarity, ttl=cache_ttl)
+
     def retrieve(
         self,
         query: str,
         strategy: str = "similarity",
-        k: int = 4
+        k: int = 4,
+        rerank: bool = False
     ) -> List[Document]:
         """
         Retrieve documents using specified strategy.
-        
+
+        With rerank=True, k * rerank_fetch_factor candidates are retrieved with the strategy
+        and the k best according to the cross-encoder are returned, best first.
+
+        Results are cached per (strategy, k, rerank): a repeated query (exact match after
+        normalization) or a near-duplicate one (query embedding similarity above
+        cache_similarity) skips the vector search and reranking. The cache must be
+        cleared with clear_cache() whenever documents are added to the vector store.
+
         Args:
             query: Search query
             strategy: "similarity" or "mmr" (Maximum Marginal Relevance)
             k: Number of documents to retrieve
-        
+            rerank: Rerank the candidates with the cross-encoder
+
         Returns:
             List of relevant documents
         """
+        namespace = (strategy, k, rerank)
+        cached = self.cache.get_exact(namespace, query)
+        query_embedding = None
+        if cached is None and self.cache.maxsize > 0:
+            # Embedded queries are cached by QueryBatchingEmbeddings, so the search
+            # below does not embed the query a second time
+            query_embedding = self.vectorstore.embeddings.embed_query(query)
+            cached = self.cache.get_similar(namespace, query_embedding)
+        if cached is not None:
+            logger.debug("Retrieved documents served from cache")
+            return list(cached)
+
+        results = self._retrieve(query, strategy=strategy, k=k, rerank=rerank, query_embedding=query_embedding)
+        self.cache.set(namespace, query, results, query_embedding)
+        return list(results)
+
+    def clear_cache(self) -> None:
+        """Drop all cached retrieval results."""
+        self.cache.clear()
+        logger.debug("Retrieval cache cleared")
+
+    def _retrieve(
+        self,
+        query: str,
+        strategy: str,
+        k: int,
+        rerank: bool,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        """Run the retrieval for retrieve(), bypassing the cache."""
+        if rerank:
+            candidates = self._retrieve(
+                query,
+                strategy=strategy,
+                k=k * self.rerank_fetch_factor,
+                rerank=False,
+                query_embedding=query_embedding
+            )
+            return self.rerank(query, candidates, top_n=k)
+
         logger.info(f"Retrieving documents with strategy='{strategy}', k={k}")
-        logger.debug(f"Query: {query[:100]}..." if len(query) > 100 else f"Query: {query}")
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Query: %s%s", query[:100], "..." if len(query) > 100 else "")
+
         if strategy == "similarity":
-            retriever = self.vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": k}
-            )
+            results = self.similarity_search(query, k=k, query_embedding=query_embedding)
+        elif strategy == "mmr" and self.use_numpy_mmr:
+            results = self.mmr_search(query, k=k, fetch_k=k * 2, query_embedding=query_embedding)
         elif strategy == "mmr":
             retriever = self.vectorstore.as_retriever(
                 search_type="mmr",
                 search_kwargs={"k": k, "fetch_k": k * 2}
             )
+            results = retriever.invoke(query)
         else:
             logger.critical(f"Unknown retrieval strategy: {strategy}")
             raise ValueError(f"Unknown strategy: {strategy}. Use 'similarity' or 'mmr'")
-        
-        results = retriever.invoke(query)
-        logger.debug(f"Retrieved {len(results)} documents")
+
+        logger.debug("Retrieved %d documents", len(results))
         return results
 
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        """
+        Retrieve the k documents nearest to the query with a single Chroma query.
+
+        Queries the collection directly instead of through a LangChain retriever, so no
+        retriever object is built per call and an already computed query embedding is reused.
+
+        Args:
+            query: Search query
+            k: Number of documents to retrieve
+            query_embedding: Embedding of the query, if already computed
+
+        Returns:
+            List of documents, nearest first
+        """
+        if query_embedding is None:
+            query_embedding = self.vectorstore.embeddings.embed_query(query)
+        results = self.vectorstore._collection.query(
+            query_embeddings=[query_embedding],
+            n_results=k,
+            include=["documents", "metadatas"]
+        )
+        return _to_documents(results, range(len(results["ids"][0])))
+
+    def mmr_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        """
+        Retrieve documents by Maximum Marginal Relevance, computed with numpy.
+
+        The fetch_k nearest candidates are fetched together with their embeddings in a
+        single Chroma query, then _mmr_numpy() picks k of them.
+
+        Args:
+            query: Search query
+            k: Number of documents to retrieve
+            fetch_k: Number of nearest candidates to choose from
+            lambda_mult: Trade-off between relevance (1) and diversity (0)
+            query_embedding: Embedding of the query, if already computed
+
+        Returns:
+            List of selected documents, most relevant first
+        """
+        if query_embedding is None:
+            query_embedding = self.vectorstore.embeddings.embed_query(query)
+        results = self.vectorstore._collection.query(
+            query_embeddings=[query_embedding],
+            n_results=fetch_k,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        if not results["ids"][0]:
+            return []
+
+        selected = _mmr_numpy(query_embedding, np.asarray(results["embeddings"][0]), k, lambda_mult)
+        return _to_documents(results, selected)
+
+    def rerank(self, query: str, documents: List[Document], top_n: int = 4) -> List[Document]:
+        """
+        Reorder documents by cross-encoder relevance to the query.
+
+        Args:
+            query: Search query
+            documents: Candidate documents
+            top_n: Number of documents to keep
+
+        Returns:
+            The top_n most relevant documents, best first
+        """
+        if not documents:
+            return []
+        ranking = get_cross_encoder(self.rerank_model).rank(
+            query,
+            [doc.page_content for doc in documents],
+            top_k=top_n
+        )
+        logger.debug("Reranked %d candidates", len(documents))
+        return [documents[entry["corpus_id"]] for entry in ranking]
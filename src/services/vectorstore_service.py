@@ -1,10 +1,20 @@
+import asyncio
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cached_property
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, Dict, Any, Set, Tuple
+import chromadb
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from ..utils.embeddings import get_embeddings
+from ..utils.embeddings import get_embeddings, cache_document_embeddings, embedding_cache_namespace, QueryBatchingEmbeddings
+from ..utils.ingest_index import IngestIndex
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +30,20 @@ class VectorStoreService:
         embedding_model: Name of the HuggingFace embedding model to use.
         model_kwargs: Additional arguments for the embedding model.
         encode_kwargs: Additional arguments for encoding (e.g., normalization).
-        _embeddings: Cached embeddings instance (lazy loaded).
-        _vectorstore: Cached vector store instance (lazy loaded).
+        chroma_host: Host of a shared Chroma server, or None for an in-process store.
+        chroma_port: Port of the shared Chroma server.
+        distance_metric: HNSW distance used by the collection.
+        batch_size: Number of chunks embedded and written to Chroma per add call.
+        embedding_cache_dir: Directory of the persistent chunk embedding cache, or None.
+        quantize_embedding_cache: Whether cached chunk embeddings are stored as int8.
+        indexed_cache_size: Maximum number of chunk IDs remembered as already indexed.
+        _indexed_ids: IDs of chunks known to be in the collection, least recently used first.
+        ingest_index_path: Path of the SQLite index of ingested chunks shared by processes, or None.
+        ingest_index: Opened IngestIndex (lazy loaded), when ingest_index_path is set.
+        metadata_fields: Metadata keys stored with each chunk, or None to store all of them.
+        _base_embeddings: Injected embeddings instance, if any.
+        embeddings: Embeddings instance (lazy loaded, cached in the instance __dict__).
+        vectorstore: Vector store instance (lazy loaded, cached in the instance __dict__).
     
     Example:
         >>> service = VectorStoreService(collection_name="session_123")
@@ -36,7 +58,17 @@ class VectorStoreService:
         collection_name: str = "default",        
         embedding_model: Optional[str] = None,
         model_kwargs: Optional[Dict[str, Any]] = None,
-        encode_kwargs: Optional[Dict[str, Any]] = None
+        encode_kwargs: Optional[Dict[str, Any]] = None,
+        chroma_host: Optional[str] = None,
+        chroma_port: int = 8000,
+        embeddings: Optional[Embeddings] = None,
+        distance_metric: str = "ip",
+        batch_size: int = 128,
+        embedding_cache_dir: Optional[str] = None,
+        quantize_embedding_cache: bool = False,
+        indexed_cache_size: int = 50_000,
+        ingest_index_path: Optional[str] = None,
+        metadata_fields: Optional[Iterable[str]] = None
     ):
         """
         Initialize the vector store service.
@@ -49,42 +81,114 @@ class VectorStoreService:
                          (e.g., {"device": "cuda"}).
             encode_kwargs: Dictionary of arguments for encoding
                           (e.g., {"normalize_embeddings": True}).
+            chroma_host: Host of a shared Chroma server. If None, the collection is
+                         kept in-process and is only visible to this worker.
+            chroma_port: Port of the shared Chroma server.
+            embeddings: Already loaded embeddings instance to use (e.g. preloaded at
+                        application startup). If None, it is created on first access
+                        from embedding_model, model_kwargs and encode_kwargs.
+            distance_metric: HNSW distance of the collection ("ip", "cosine" or "l2").
+                             Inner product skips the per-comparison normalization of
+                             cosine and ranks identically for normalized embeddings.
+            batch_size: Number of chunks embedded and written to Chroma per add call.
+            embedding_cache_dir: Directory of the persistent cache of chunk embeddings,
+                                 keyed by content hash. If None, chunks are always embedded.
+            quantize_embedding_cache: Store cached chunk embeddings int8-quantized.
+            indexed_cache_size: Number of chunk IDs remembered as already indexed, so
+                                re-uploaded chunks are skipped without asking Chroma.
+                                0 disables the cache.
+            ingest_index_path: Path of a SQLite database recording the chunks indexed per
+                               collection on the shared Chroma server, by all processes
+                               sharing the path. Recorded chunks are hints: they are
+                               confirmed against the collection like any other chunk, and
+                               rows the collection does not confirm are removed. Ignored
+                               without chroma_host, since in-process collections do not
+                               outlive the process. If None, no index is kept.
+            metadata_fields: Metadata keys stored with each chunk (e.g. ("source", "page")).
+                             Loaders attach document-level metadata (PDF producer, dates,
+                             page count...) to every chunk; keeping only the keys that
+                             are read back shrinks every row Chroma writes.
+                             If None, all metadata is stored.
         """
         self.collection_name = collection_name
         self.embedding_model = embedding_model
         self.model_kwargs = model_kwargs
         self.encode_kwargs = encode_kwargs
-        self._embeddings = None
-        self._vectorstore = None
+        self.chroma_host = chroma_host
+        self.chroma_port = chroma_port
+        self._base_embeddings = embeddings
+        self.distance_metric = distance_metric
+        self.batch_size = batch_size
+        self.embedding_cache_dir = embedding_cache_dir
+        self.quantize_embedding_cache = quantize_embedding_cache
+        self.indexed_cache_size = indexed_cache_size
+        self._indexed_ids: OrderedDict[str, None] = OrderedDict()
+        self._indexed_lock = threading.Lock()
+        self.ingest_index_path = ingest_index_path
+        self.metadata_fields = tuple(metadata_fields) if metadata_fields is not None else None
     
 
-    @property
-    def embeddings(self) -> HuggingFaceEmbeddings:
+    @cached_property
+    def embeddings(self) -> Embeddings:
         """
         Get or create the embeddings instance (lazy loading).
         
-        The embeddings are created on first access and cached for subsequent use.
+        The embeddings are created on first access and stored in the instance, so
+        later accesses are plain attribute reads.
+        Query embeddings go through QueryBatchingEmbeddings, which batches concurrent
+        questions and caches repeated ones. With embedding_cache_dir set, document
+        embeddings are read from / written to the persistent content-keyed cache.
         
         Returns:
-            HuggingFaceEmbeddings: The embeddings instance configured with the specified model.
+            Embeddings: The injected embeddings, or the HuggingFace model configured with
+                        the specified settings wrapped in QueryBatchingEmbeddings, behind
+                        the document embedding cache when enabled.
         """
-        if self._embeddings is None:
+        embeddings = self._base_embeddings
+        if embeddings is None:
             logger.info(f"Initializing embeddings model: {self.embedding_model}")
-            self._embeddings = get_embeddings(
+            embeddings = QueryBatchingEmbeddings(get_embeddings(
                 model_name=self.embedding_model,
                 model_kwargs=self.model_kwargs,
                 encode_kwargs=self.encode_kwargs
-            )
+            ))
             logger.debug("Embeddings model loaded successfully")
-        return self._embeddings
+        if self.embedding_cache_dir:
+            embeddings = cache_document_embeddings(
+                embeddings,
+                self.embedding_cache_dir,
+                namespace=embedding_cache_namespace(embeddings, self.embedding_model or "default"),
+                quantize=self.quantize_embedding_cache
+            )
+        return embeddings
     
 
-    @property
+    @cached_property
+    def ingest_index(self) -> Optional[IngestIndex]:
+        """
+        Get or open the persistent index of ingested chunks (lazy loading).
+        
+        Returns:
+            Optional[IngestIndex]: The index, or None if ingest_index_path is not set or
+                                   the collection is in-process.
+        """
+        if not self.ingest_index_path:
+            return None
+        if not self.chroma_host:
+            logger.warning("Ignoring ingest_index_path: in-process collections do not outlive the process")
+            return None
+        logger.info(f"Opening ingest index: {self.ingest_index_path}")
+        return IngestIndex(self.ingest_index_path)
+
+
+    @cached_property
     def vectorstore(self) -> Chroma:
         """
         Get or load the vector store instance (lazy loading).
         
         The vector store is loaded from memory if it exists, otherwise it creates a new one.
+        It is stored in the instance, so later accesses are plain attribute reads;
+        create_empty_vectorstore() replaces it and close() removes it.
         
         Returns:
             Chroma: The ChromaDB vector store instance.
@@ -92,11 +196,52 @@ class VectorStoreService:
         Raises:
             ValueError: If the vector store does not exist, it creates a new one.
         """
-        if self._vectorstore is None:
-            self._vectorstore = self.create_empty_vectorstore()
-        return self._vectorstore
+        return self.create_empty_vectorstore()
 
     
+    def preload(self) -> None:
+        """
+        Load the embeddings and the vector store now instead of on first use.
+        
+        Both are lazy, so without this the first request pays the embedding model
+        download/load and the collection creation. Call it from an application startup
+        hook (e.g. a FastAPI lifespan) to move that cost out of request latency.
+        
+        Example:
+            >>> service = VectorStoreService(collection_name="docs")
+            >>> service.preload()
+        """
+        logger.info(f"Preloading vector store: {self.collection_name}")
+        _ = self.embeddings
+        _ = self.vectorstore
+
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        """
+        Build the Chroma client arguments.
+        
+        Returns:
+            Dict[str, Any]: {"client": HttpClient} when a shared server is configured,
+                            otherwise an empty dict (in-process client).
+        """
+        if not self.chroma_host:
+            return {}
+        return {"client": chromadb.HttpClient(host=self.chroma_host, port=self.chroma_port)}
+
+
+    def _collection_configuration(self) -> Dict[str, Any]:
+        """
+        Build the Chroma collection configuration.
+        
+        Only applies when the collection is created; an existing collection on a shared
+        server keeps the distance it was created with.
+        
+        Returns:
+            Dict[str, Any]: HNSW index configuration with the configured distance metric.
+        """
+        return {"hnsw": {"space": self.distance_metric}}
+
+
     def exists(self) -> bool:
         """
         Check if a vector store exists for the configured collection name.
@@ -104,7 +249,7 @@ class VectorStoreService:
         Returns:
             bool: True if the vector store exists and contains data, False otherwise.
         """
-        return self._vectorstore is not None
+        return "vectorstore" in self.__dict__
 
     
     def create_empty_vectorstore(self) -> Chroma:
@@ -112,29 +257,42 @@ class VectorStoreService:
         Create an empty vector store without any documents.
         
         Useful for initializing a vectorstore before uploading documents.
-        The vector store is persisted to disk at the configured persist_directory.
+        Without chroma_host the collection lives in the in-process client's memory,
+        so inserts never wait on disk syncs; with chroma_host it is stored, and made
+        durable, by the Chroma server.
         
         Returns:
             Chroma: The empty ChromaDB vector store instance.
         """        
         logger.info(f"Creating empty vector store for collection: {self.collection_name}")
-        self._vectorstore = Chroma(
+        self._forget_indexed()
+        if self.ingest_index is not None:
+            self.ingest_index.forget(self.collection_name)
+        vectorstore = Chroma(
             collection_name=self.collection_name,
-            embedding_function=self.embeddings
+            embedding_function=self.embeddings,
+            collection_configuration=self._collection_configuration(),
+            **self._client_kwargs()
         )
+        # Replace the cached vectorstore property
+        self.__dict__["vectorstore"] = vectorstore
         logger.info("Empty vector store created successfully")
-        return self._vectorstore
+        return vectorstore
         
     
-    def create_from_documents(self, documents: List[Document]) -> Chroma:
+    def create_from_documents(self, documents: Iterable[Document], batch_size: Optional[int] = None) -> Chroma:
         """
-        Create a new vector store from a list of documents.
+        Create a new vector store from a stream of documents.
         
-        This method generates embeddings for all documents and stores them in ChromaDB.
-        The vector store is persisted to disk at the configured persist_directory.
+        This method creates an empty collection and adds the documents to it in a single
+        streaming pass with add_documents_streaming(), so only a couple of batches are held
+        in memory and documents can be produced lazily (e.g. by a generator that loads and
+        splits files one at a time).
         
         Args:
-            documents: List of LangChain Document objects to index.
+            documents: Iterable of LangChain Document objects to index.
+            batch_size: Number of documents embedded and written per call.
+                        If None, uses the service's batch_size.
         
         Returns:
             Chroma: The created ChromaDB vector store instance.
@@ -143,39 +301,543 @@ class VectorStoreService:
             This operation can be time-consuming for large document collections,
             especially if using CPU for embeddings.
         """
-        logger.info(f"Creating vector store from {len(documents)} documents")       
+        logger.info("Creating vector store from documents")
+        self.create_empty_vectorstore()
+        added = sum(1 for _ in self.add_documents_streaming(documents, batch_size))
+        logger.info(f"Vector store created ({added} new chunks)")
+        return self.vectorstore
+
+
+    def add_documents_streaming(
+        self,
+        documents: Iterable[Document],
+        batch_size: Optional[int] = None
+    ) -> Iterator[str]:
+        """
+        Add documents from an iterable, yielding the IDs of new chunks as they are written.
         
-        empty_docs = [i for i, d in enumerate(documents) if not d.page_content.strip()]
-        if empty_docs:
-            logger.warning(f"Found {len(empty_docs)} documents with empty content at indices: {empty_docs[:10]}...")
+        Documents are pulled batch_size at a time and never collected into a list, so
+        memory stays bounded by a couple of batches (plus the IDs of the chunks seen so
+        far) however large the corpus is. Documents with empty content are skipped. Like
+        add_documents(), chunks are stored under the hash of their content, chunks already
+        in the collection or earlier in the stream are skipped and embedding overlaps the
+        Chroma writes, but batches are not regrouped by length, since that requires the
+        whole corpus.
         
-        self._vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            collection_name=self.collection_name
-        )
-        logger.info("Vector store created and persisted successfully")
-        return self._vectorstore
+        Args:
+            documents: Iterable of LangChain Document objects to add, e.g. a generator.
+            batch_size: Number of documents embedded and written per call.
+                        If None, uses the service's batch_size.
+        
+        Yields:
+            str: ID (content hash) of each newly added chunk, batch by batch.
+        
+        Example:
+            >>> for chunk_id in service.add_documents_streaming(iter_splits(paths)):
+            ...     progress.update(1)
+        """
+        batch_size = batch_size or self.batch_size
+        seen = empty = added = 0
+        # The previous batch may still be in flight when the next one is checked against
+        # the collection, so chunks repeated across batches are filtered out here
+        planned: Set[str] = set()
+
+        def batches() -> Iterator[Dict[str, Document]]:
+            nonlocal seen, empty
+            iterator = iter(documents)
+            while batch := list(islice(iterator, batch_size)):
+                seen += len(batch)
+                non_empty = [doc for doc in batch if doc.page_content.strip()]
+                empty += len(batch) - len(non_empty)
+                chunks = {
+                    chunk_id: doc for chunk_id, doc in self._unique_chunks(non_empty).items()
+                    if chunk_id not in planned
+                }
+                planned.update(chunks)
+                yield chunks
+
+        for new_ids in self._index_batches(batches()):
+            added += len(new_ids)
+            logger.debug("Indexed %d documents so far (%d new chunks)", seen, added)
+            yield from new_ids
+        
+        if empty:
+            logger.warning(f"Skipped {empty} documents with empty content")
+        logger.info(f"Streamed {seen} documents into the vector store ({added} new chunks)")
     
 
     def add_documents(self, documents: List[Document]) -> List[str]:
         """
-        Add new documents to an existing vector store.
+        Add new documents to the vector store, creating it if it does not exist yet.
         
         This method is useful for incrementally adding documents without rebuilding
-        the entire vector store. The vector store must already exist.
+        the entire vector store.
+        Each chunk is stored under the hash of its content, so identical chunks are only
+        embedded and stored once: duplicates within the upload and chunks already in the
+        collection (e.g. from a re-uploaded document) are skipped.
+        Chunks are written in batches of batch_size: each batch is embedded in a
+        single embed_documents() call (batched by the encoder according to
+        encode_kwargs["batch_size"]) and inserted with a single Chroma upsert, so pass
+        every split of an upload at once rather than calling this per file. Each
+        upsert runs in a background thread while the next batch is embedded.
+        Chunks are grouped into batches by length (longest first), so each batch
+        holds chunks of similar length and little of the encoder's work goes to
+        padding. The encoder only sorts by length within a single call.
+        
+        Args:
+            documents: List of LangChain Document objects to add.
+        
+        Returns:
+            List[str]: List of document IDs (content hashes) of the newly added documents,
+                       in the order the documents were given.
+        """
+        logger.info(f"Adding {len(documents)} documents to vector store")
+        unique, batches = self._plan_batches(documents)
+
+        added = set()
+        for new_ids in self._index_batches(batches):
+            added.update(new_ids)
+            logger.debug("Indexed %d/%d chunks (%d new in last batch)", len(added), len(unique), len(new_ids))
+
+        return self._added_ids(documents, unique, added)
+
+
+    async def aadd_documents(self, documents: List[Document], concurrency: int = 2) -> List[str]:
+        """
+        Add new documents to the vector store, indexing batches concurrently.
+        
+        Async counterpart of add_documents(), with the same deduplication, batching and
+        return value. Up to `concurrency` batches are embedded and written at the same
+        time in worker threads, which hides Chroma round trips when the collection lives
+        on a shared server (CHROMA_HOST). With an in-process collection and a single
+        encoder, add_documents() already overlaps embedding with the writes.
+        Hashing and planning the batches (and creating the embeddings and vector store on
+        first use) also run in a worker thread, so no CPU-bound step blocks the event
+        loop. asyncio.to_thread() runs each step in a copy of the caller's context, so
+        context variables (e.g. tracing spans) carry over.
         
         Args:
             documents: List of LangChain Document objects to add.
+            concurrency: Maximum number of batches indexed at the same time.
+        
+        Returns:
+            List[str]: List of document IDs (content hashes) of the newly added documents,
+                       in the order the documents were given.
+        
+        Example:
+            >>> ids = await service.aadd_documents(splits, concurrency=4)
+        """
+        logger.info(f"Adding {len(documents)} documents to vector store ({concurrency} concurrent batches)")
+
+        def plan() -> Tuple[Dict[str, Document], List[Dict[str, Document]]]:
+            # cached_property does not lock: build the lazy attributes once here, before
+            # the batch workers would race to create them
+            for name in ("embeddings", "vectorstore", "ingest_index"):
+                getattr(self, name)
+            return self._plan_batches(documents)
+
+        unique, batches = await asyncio.to_thread(plan)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def index(batch: Dict[str, Document]) -> List[str]:
+            async with semaphore:
+                return await asyncio.to_thread(self._index_batch, batch)
+
+        results = await asyncio.gather(*(index(batch) for batch in batches))
+        return self._added_ids(documents, unique, set(chain.from_iterable(results)))
+
+
+    def add_documents_fast(
+        self,
+        texts: List[str],
+        metadatas: List[Optional[Dict[str, Any]]],
+        embeddings: np.ndarray
+    ) -> List[str]:
+        """
+        Write already embedded chunks given as parallel columns, without Document objects.
+        
+        For bulk loads that computed the embeddings themselves (e.g. in a separate job):
+        the columns go to the Chroma collection as they are, in upserts of batch_size
+        rows, skipping the per-chunk Document boxing and the LangChain wrapper.
+        Chunks are stored under the hash of their content like in add_documents(), but
+        are not looked up in the collection first, since there is nothing to save by
+        skipping them: the upsert overwrites a chunk already indexed (its embedding,
+        content and metadata), and since IDs are content hashes it is overwritten with
+        identical content, so skipping the lookup is safe.
+        
+        Args:
+            texts: Chunk contents.
+            metadatas: Metadata of each chunk (None for no metadata).
+            embeddings: 2-D array with one embedding per chunk; converted to float32.
         
         Returns:
-            List[str]: List of document IDs assigned to the newly added documents.
+            List[str]: IDs (content hashes) of the chunks written, in order, without duplicates.
         
         Raises:
-            ValueError: If the vector store does not exist. Use create_from_documents() first.
+            ValueError: If the three columns do not have the same number of rows.
+        
+        Example:
+            >>> vectors = model.encode(texts, normalize_embeddings=True)
+            >>> ids = service.add_documents_fast(texts, [{"source": "a.pdf"}] * len(texts), vectors)
         """
-        logger.info(f"Adding {len(documents)} documents to vector store")
-        result = self.vectorstore.add_documents(documents)
-        logger.debug(f"Added {len(result)} document IDs")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or not len(texts) == len(metadatas) == len(embeddings):
+            raise ValueError(
+                f"Expected {len(texts)} texts, metadatas and embedding rows, got "
+                f"{len(metadatas)} metadatas and embeddings of shape {embeddings.shape}"
+            )
+        # First row of each distinct chunk; Chroma rejects duplicate IDs in one upsert
+        rows = {}
+        for row, chunk_id in enumerate(self.chunk_ids(texts)):
+            rows.setdefault(chunk_id, row)
+        ids = list(rows)
+        if len(ids) < len(texts):
+            order = np.fromiter(rows.values(), dtype=np.intp, count=len(ids))
+            texts = [texts[row] for row in order]
+            metadatas = [metadatas[row] for row in order]
+            embeddings = embeddings[order]
+
+        logger.info(f"Writing {len(ids)} embedded chunks to vector store")
+        for start in range(0, len(ids), self.batch_size):
+            end = start + self.batch_size
+            self._write_columns(ids[start:end], texts[start:end], metadatas[start:end], embeddings[start:end])
+        return ids
+
+
+    def add_texts(self, texts: List[str], metadatas: Optional[List[Optional[Dict[str, Any]]]] = None) -> List[str]:
+        """
+        Add raw text chunks to an existing vector store, without wrapping them in Documents.
+        
+        Same deduplication as add_documents(): each chunk is stored under the hash of its
+        content, and duplicates and chunks already in the collection are skipped before
+        embedding. Chunks are embedded and written batch_size at a time, in input order.
+        
+        Args:
+            texts: Chunk contents.
+            metadatas: Metadata of each chunk (None for no metadata). If None, chunks are
+                       stored without metadata.
+        
+        Returns:
+            List[str]: IDs (content hashes) of the newly added chunks, in input order.
+        
+        Raises:
+            ValueError: If metadatas does not have one entry per text.
+        
+        Example:
+            >>> ids = service.add_texts(["First chunk", "Second chunk"], [{"page": 1}, {"page": 2}])
+        """
+        if metadatas is None:
+            metadatas = [None] * len(texts)
+        if len(metadatas) != len(texts):
+            raise ValueError(f"Expected {len(texts)} metadatas, got {len(metadatas)}")
+        # First row of each distinct chunk, by ID
+        rows = {}
+        for row, chunk_id in enumerate(self.chunk_ids(texts)):
+            rows.setdefault(chunk_id, row)
+        items = list(rows.items())
+
+        added = []
+        for start in range(0, len(items), self.batch_size):
+            new_rows = self._new_chunks(dict(items[start:start + self.batch_size]))
+            if not new_rows:
+                continue
+            new_texts = [texts[row] for row in new_rows.values()]
+            embeddings = self._embed_texts(new_texts)
+            added += self._write_columns(
+                list(new_rows), new_texts, [metadatas[row] for row in new_rows.values()], embeddings
+            )
+        skipped = len(texts) - len(added)
+        if skipped:
+            logger.info(f"Skipped {skipped} duplicate chunks already indexed")
+        return added
+
+
+    @classmethod
+    def parallel_add(
+        cls,
+        documents: List[Document],
+        n_workers: int = 4,
+        **service_kwargs: Any
+    ) -> List[str]:
+        """
+        Add documents to a collection on a shared Chroma server from several worker processes.
+        
+        The chunks are deduplicated and sharded by content hash, so identical chunks land
+        in the same shard and are embedded once. Each worker process builds its own
+        VectorStoreService (embedding model and Chroma client included, so nothing large
+        is pickled) and runs add_documents() on its shard. Embedding runs in parallel on
+        n_workers model copies, and the server receives n_workers concurrent writers.
+        
+        Args:
+            documents: List of LangChain Document objects to add.
+            n_workers: Number of worker processes.
+            **service_kwargs: Arguments for the VectorStoreService of each worker, e.g.
+                              collection_name, embedding_model, chroma_host and batch_size.
+                              chroma_host is required: an in-process collection would only
+                              exist inside the worker that wrote it.
+        
+        Returns:
+            List[str]: IDs (content hashes) of the newly added chunks, in the order the
+                       documents were given.
+        
+        Raises:
+            ValueError: If chroma_host is not given or embeddings is passed.
+        
+        Example:
+            >>> ids = VectorStoreService.parallel_add(
+            ...     splits, n_workers=4, collection_name="corpus", chroma_host="chroma"
+            ... )
+        """
+        if not service_kwargs.get("chroma_host"):
+            raise ValueError("parallel_add() requires chroma_host: workers must write to a shared Chroma server")
+        if service_kwargs.get("embeddings") is not None:
+            raise ValueError("parallel_add() workers load their own embeddings; pass embedding_model instead")
+
+        unique = {}
+        for chunk_id, doc in zip(cls.chunk_ids([doc.page_content for doc in documents]), documents):
+            unique.setdefault(chunk_id, doc)
+        shards = [[] for _ in range(n_workers)]
+        for chunk_id, doc in unique.items():
+            shards[int(chunk_id[:8], 16) % n_workers].append(doc)
+        shards = [shard for shard in shards if shard]
+
+        logger.info(f"Adding {len(unique)} chunks from {len(shards)} worker processes")
+        with ProcessPoolExecutor(max_workers=len(shards) or 1) as pool:
+            results = pool.map(_ingest_shard, [service_kwargs] * len(shards), shards)
+            added = set(chain.from_iterable(results))
+        return cls._added_ids(documents, unique, added)
+
+
+    def _plan_batches(self, documents: List[Document]) -> Tuple[Dict[str, Document], List[Dict[str, Document]]]:
+        """
+        Deduplicate chunks by content hash and group them into batches by length.
+        
+        Args:
+            documents: Chunks to index.
+        
+        Returns:
+            Tuple of the unique chunks by ID, in input order, and the batches of at most
+            batch_size chunks by ID, longest chunks first.
+        """
+        unique = self._unique_chunks(documents)
+        items = sorted(unique.items(), key=lambda item: len(item[1].page_content), reverse=True)
+        batches = [dict(items[start:start + self.batch_size]) for start in range(0, len(items), self.batch_size)]
+        return unique, batches
+
+
+    def _unique_chunks(self, documents: List[Document]) -> Dict[str, Document]:
+        """Return the chunks by ID, in input order, keeping the first of each duplicate."""
+        unique = {}
+        for chunk_id, doc in zip(self.chunk_ids([doc.page_content for doc in documents]), documents):
+            unique.setdefault(chunk_id, doc)
+        return unique
+
+
+    @staticmethod
+    def _added_ids(documents: List[Document], unique: Dict[str, Document], added: set) -> List[str]:
+        """Return the IDs of the added chunks in input order, logging how many were skipped."""
+        result = [chunk_id for chunk_id in unique if chunk_id in added]
+        skipped = len(documents) - len(result)
+        if skipped:
+            logger.info(f"Skipped {skipped} duplicate chunks already indexed")
+        logger.debug("Added %d document IDs", len(result))
         return result
 
+
+    def _index_batches(self, batches: Iterable[Dict[str, Document]]) -> Iterator[List[str]]:
+        """
+        Embed and write batches of chunks, overlapping embedding with the Chroma writes.
+        
+        Each batch is embedded in the calling thread and written to the collection by a
+        single background writer, so the encoder works on batch N+1 while batch N is
+        inserted. At most one write is in flight: the next write waits for the previous
+        one, which bounds memory to two batches of embeddings. Chunks already in the
+        collection are skipped before embedding.
+        
+        Args:
+            batches: Batches of unique chunks to index, by ID.
+        
+        Yields:
+            List[str]: IDs (content hashes) of the chunks added by each written batch.
+        """
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-writer") as writer:
+            pending = None
+            for batch in batches:
+                new_docs = self._new_chunks(batch)
+                if not new_docs:
+                    continue
+
+                embeddings = self._embed_texts([doc.page_content for doc in new_docs.values()])
+                if pending is not None:
+                    yield pending.result()
+                pending = writer.submit(self._write_batch, list(new_docs), list(new_docs.values()), embeddings)
+            if pending is not None:
+                yield pending.result()
+
+
+    def _index_batch(self, batch: Dict[str, Document]) -> List[str]:
+        """
+        Embed and write one batch of chunks, skipping chunks already in the collection.
+        
+        Args:
+            batch: Unique chunks to index, by ID.
+        
+        Returns:
+            List[str]: IDs (content hashes) of the chunks added.
+        """
+        new_docs = self._new_chunks(batch)
+        if not new_docs:
+            return []
+        embeddings = self._embed_texts([doc.page_content for doc in new_docs.values()])
+        return self._write_batch(list(new_docs), list(new_docs.values()), embeddings)
+
+
+    def _new_chunks(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the chunks of a batch (by ID, e.g. to their Document) that are not in the collection yet.
+        
+        Chunks remembered as indexed by this instance are dropped without a lookup; the
+        others are checked against the collection. Chunks recorded in the ingest index
+        are only hints and are checked too: rows of chunks the collection does not have
+        (e.g. after it was reset on the server) are removed from the index.
+        """
+        unique = dict(batch)
+        with self._indexed_lock:
+            for chunk_id in [chunk_id for chunk_id in unique if chunk_id in self._indexed_ids]:
+                self._indexed_ids.move_to_end(chunk_id)
+                del unique[chunk_id]
+        if not unique:
+            return {}
+        existing = set(self.vectorstore.get(ids=list(unique), include=[])["ids"])
+        self._remember_indexed(existing)
+        if self.ingest_index is not None:
+            stale = self.ingest_index.contains(self.collection_name, unique) - existing
+            if stale:
+                logger.warning(f"Ingest index listed {len(stale)} chunks missing from {self.collection_name}")
+                self.ingest_index.discard(self.collection_name, list(stale))
+        self._record_ingested(list(existing))
+        return {chunk_id: doc for chunk_id, doc in unique.items() if chunk_id not in existing}
+
+
+    def _remember_indexed(self, ids: Iterable[str]) -> None:
+        """Record chunk IDs as present in the collection, evicting the least recently used."""
+        if self.indexed_cache_size <= 0:
+            return
+        with self._indexed_lock:
+            for chunk_id in ids:
+                self._indexed_ids[chunk_id] = None
+                self._indexed_ids.move_to_end(chunk_id)
+            while len(self._indexed_ids) > self.indexed_cache_size:
+                self._indexed_ids.popitem(last=False)
+
+
+    def _record_ingested(self, ids: List[str]) -> None:
+        """Record chunk IDs as present in the collection in the ingest index, if any."""
+        if self.ingest_index is not None:
+            self.ingest_index.add(self.collection_name, ids)
+
+
+    def _forget_indexed(self) -> None:
+        """Drop the remembered chunk IDs, when the collection is replaced or deleted."""
+        with self._indexed_lock:
+            self._indexed_ids.clear()
+
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of chunks, splitting it in halves if the encoder runs out of memory.
+        
+        Args:
+            texts: Contents of the chunks to embed.
+        
+        Returns:
+            List[List[float]]: One embedding per chunk, in order.
+        
+        Raises:
+            RuntimeError: If a single chunk cannot be embedded.
+        """
+        try:
+            return self.embeddings.embed_documents(texts)
+        except RuntimeError as e:
+            # torch.OutOfMemoryError is a RuntimeError
+            if len(texts) <= 1:
+                raise
+            half = len(texts) // 2
+            logger.warning(f"Embedding {len(texts)} chunks failed ({e}), retrying in batches of {half}")
+            return self._embed_texts(texts[:half]) + self._embed_texts(texts[half:])
+
+
+    def _write_batch(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> List[str]:
+        """Upsert embedded chunks into the collection and return their IDs."""
+        return self._write_columns(
+            ids, [doc.page_content for doc in documents], [doc.metadata for doc in documents], embeddings
+        )
+
+
+    def _write_columns(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Optional[Dict[str, Any]]],
+        embeddings: Any
+    ) -> List[str]:
+        """Upsert embedded chunks given as parallel columns into the collection and return their IDs."""
+        if self.metadata_fields is not None:
+            fields = self.metadata_fields
+            metadatas = [
+                {key: metadata[key] for key in fields if key in metadata} if metadata else None
+                for metadata in metadatas
+            ]
+        self.vectorstore._collection.upsert(
+            ids=ids,
+            # Chroma stores float32; an array skips its per-value validation of nested lists
+            embeddings=np.asarray(embeddings, dtype=np.float32),
+            documents=texts,
+            # Chroma rejects empty metadata dicts, but accepts None
+            metadatas=[metadata or None for metadata in metadatas]
+        )
+        self._remember_indexed(ids)
+        self._record_ingested(ids)
+        return ids
+
+
+    def close(self) -> None:
+        """
+        Release the vector store.
+        
+        An in-process collection is deleted, since the embedded Chroma client keeps it in
+        memory for the lifetime of the process. A collection on a shared Chroma server is
+        left in place for other workers; only the local handle is dropped. The ingest
+        index connection is closed.
+        """
+        self._forget_indexed()
+        vectorstore = self.__dict__.pop("vectorstore", None)
+        ingest_index = self.__dict__.pop("ingest_index", None)
+        if vectorstore is not None and not self.chroma_host:
+            vectorstore.delete_collection()
+            logger.info(f"Deleted in-process collection: {self.collection_name}")
+        if ingest_index is not None:
+            ingest_index.close()
+
+
+    @staticmethod
+    def chunk_id(content: str) -> str:
+        """Return the ID a chunk is stored under: a hash of its content."""
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+    @staticmethod
+    def chunk_ids(contents: Iterable[str]) -> List[str]:
+        """Return the IDs of many chunks, like chunk_id() but without a method call per chunk."""
+        blake2b = hashlib.blake2b
+        return [blake2b(content.encode("utf-8"), digest_size=16).hexdigest() for content in contents]
+
+
+def _ingest_shard(service_kwargs: Dict[str, Any], documents: List[Document]) -> List[str]:
+    """Index a shard of documents with a service of its own; run in a parallel_add() worker."""
+    service = VectorStoreService(**service_kwargs)
+    try:
+        return service.add_documents(documents)
+    finally:
+        # Only drops the local handle: the collection lives on the shared server
+        service.close()
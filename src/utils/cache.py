@@ -0,0 +1,333 @@
+"""
+Cache utilities for the RAG system.
+
+This module provides small in-memory caches used on the query path:
+- SemanticCache: LRU cache that matches entries by normalized text or by
+  embedding similarity, so repeated and near-duplicate questions can skip work.
+- LRUTTLCache: mapping bounded by entry count and idle time, for long-lived
+  per-session state.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .quantization import quantize_int8
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Two-tier LRU cache keyed by text.
+
+    Lookups first try an exact match on the normalized text (lowercased, whitespace
+    collapsed). If that misses and a query embedding is provided, the embedding is
+    compared against the embeddings of cached entries and the best entry is returned
+    when its similarity reaches the threshold.
+
+    Entries are grouped by a namespace (e.g. the LLM model answering the question),
+    so values produced under one namespace are never returned for another.
+    Cached embeddings are stored int8-quantized (1 byte per dimension) and compared
+    against the float query embedding. Access is serialized with a lock, since the
+    cache is shared by the event loop and thread pool workers.
+
+    Attributes:
+        maxsize: Maximum number of entries kept. Least recently used entries are evicted.
+                 A maxsize of 0 disables the cache.
+        threshold: Minimum similarity for a semantic hit. Embeddings are expected to be
+                   L2-normalized, so the dot product equals the cosine similarity.
+        ttl: Seconds an entry stays valid after it is stored, however often it is read.
+             0 or less means no expiry. Expired entries are dropped when they are looked up.
+
+    Example:
+        >>> cache = SemanticCache(maxsize=128, threshold=0.97)
+        >>> cache.set("groq/llama", "What is RAG?", ("answer", []), embedding=q_emb)
+        >>> cache.get("groq/llama", "what is  rag?")
+        ('answer', [])
+    """
+
+    def __init__(self, maxsize: int = 512, threshold: float = 0.97, ttl: float = 0.0):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept.
+            threshold: Minimum similarity for a semantic hit.
+            ttl: Seconds an entry stays valid after it is stored.
+        """
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._entries: OrderedDict[
+            str, tuple[Hashable, Optional[tuple[np.ndarray, np.ndarray]], Any, float]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize text for exact matching (lowercase, collapsed whitespace)."""
+        return " ".join(text.lower().split())
+
+
+    def _key(self, namespace: Hashable, text: str) -> str:
+        data = f"{namespace}\x00{self.normalize(text)}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+    def get(
+        self,
+        namespace: Hashable,
+        text: str,
+        embedding: Optional[Sequence[float]] = None
+    ) -> Optional[Any]:
+        """
+        Look up a value by exact text, falling back to embedding similarity.
+
+        Args:
+            namespace: Namespace the entry was stored under.
+            text: Text to look up.
+            embedding: Optional embedding of the text for the semantic tier.
+
+        Returns:
+            The cached value, or None on a miss.
+        """
+        value = self.get_exact(namespace, text)
+        if value is None and embedding is not None:
+            value = self.get_similar(namespace, embedding)
+        return value
+
+
+    def get_exact(self, namespace: Hashable, text: str) -> Optional[Any]:
+        """Return the value stored for the normalized text, or None."""
+        key = self._key(namespace, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+
+    def get_similar(self, namespace: Hashable, embedding: Sequence[float]) -> Optional[Any]:
+        """Return the value of the most similar cached entry above the threshold, or None."""
+        keys = []
+        vectors = []
+        scales = []
+        with self._lock:
+            self._expire()
+            for key, (entry_namespace, entry_embedding, _, _) in self._entries.items():
+                if entry_namespace == namespace and entry_embedding is not None:
+                    keys.append(key)
+                    vectors.append(entry_embedding[0])
+                    scales.append(entry_embedding[1])
+        if not vectors:
+            return None
+
+        # Scored outside the lock; the best entry may be evicted meanwhile, which is a miss
+        query = np.asarray(embedding, dtype=np.float32)
+        similarities = (np.stack(vectors).astype(np.float32) @ query) * np.asarray(scales)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(keys[best])
+            if entry is None:
+                return None
+            logger.debug(f"Semantic cache hit (similarity={similarities[best]:.4f})")
+            self._entries.move_to_end(keys[best])
+            return entry[2]
+
+
+    def set(
+        self,
+        namespace: Hashable,
+        text: str,
+        value: Any,
+        embedding: Optional[Sequence[float]] = None
+    ) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            namespace: Namespace to store the entry under.
+            text: Text the value was computed for.
+            value: Value to cache.
+            embedding: Optional embedding of the text, enabling semantic hits.
+        """
+        if self.maxsize <= 0:
+            return
+        vector = quantize_int8(embedding) if embedding is not None else None
+        key = self._key(namespace, text)
+        with self._lock:
+            self._entries[key] = (namespace, vector, value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+    def _expired(self, entry: tuple) -> bool:
+        """Tell whether an entry was stored more than ttl seconds ago."""
+        return self.ttl > 0 and time.monotonic() - entry[3] >= self.ttl
+
+
+    def _expire(self) -> None:
+        """Drop all expired entries. The caller must hold the lock."""
+        if self.ttl <= 0:
+            return
+        for key in [key for key, entry in self._entries.items() if self._expired(entry)]:
+            del self._entries[key]
+
+
+class LRUTTLCache:
+    """
+    Mapping that evicts least recently used entries and entries idle for too long.
+
+    Reading an entry refreshes both its recency and its idle timer. Expired entries
+    are evicted lazily, on the next access to the cache. Every removal (eviction,
+    deletion or clear) calls on_evict(key, value), so values holding resources can
+    release them. Access is serialized with a lock, since the cache may be shared by
+    the event loop and thread pool workers.
+
+    Attributes:
+        maxsize: Maximum number of entries. 0 or less means no limit.
+        ttl: Seconds an entry may stay unused before it is evicted. 0 or less means no expiry.
+        on_evict: Optional callback called with (key, value) for every removed entry.
+
+    Example:
+        >>> sessions = LRUTTLCache(maxsize=256, ttl=3600, on_evict=lambda key, service: service.close())
+        >>> sessions["abc"] = service
+        >>> sessions.get("abc") is service
+        True
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: float = 3600.0,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries.
+            ttl: Seconds an entry may stay unused before it is evicted.
+            on_evict: Optional callback called with (key, value) for every removed entry.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._entries)
+
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            self._expire()
+            return key in self._entries
+
+
+    def __iter__(self) -> Iterator[Hashable]:
+        with self._lock:
+            self._expire()
+            return iter(list(self._entries))
+
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._expire()
+            previous = self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic(), value)
+            if previous is not None and previous[1] is not value:
+                self._evict(key, previous[1])
+            while self.maxsize > 0 and len(self._entries) > self.maxsize:
+                oldest, (_, oldest_value) = self._entries.popitem(last=False)
+                logger.info(f"Evicting least recently used entry: {oldest}")
+                self._evict(oldest, oldest_value)
+
+
+    def __delitem__(self, key: Hashable) -> None:
+        with self._lock:
+            _, value = self._entries.pop(key)
+            self._evict(key, value)
+
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value for key and mark it as used, or default if absent or expired."""
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries[key] = (time.monotonic(), entry[1])
+            self._entries.move_to_end(key)
+            return entry[1]
+
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            while self._entries:
+                key, (_, value) = self._entries.popitem(last=False)
+                self._evict(key, value)
+
+
+    def _expire(self) -> None:
+        """Evict entries that have not been used for ttl seconds."""
+        if self.ttl <= 0:
+            return
+        deadline = time.monotonic() - self.ttl
+        # Entries are kept in order of last use, so expired ones are at the front
+        while self._entries:
+            key, (last_used, value) = next(iter(self._entries.items()))
+            if last_used > deadline:
+                break
+            del self._entries[key]
+            logger.info(f"Evicting idle entry: {key}")
+            self._evict(key, value)
+
+
+    def _evict(self, key: Hashable, value: Any) -> None:
+        if self.on_evict is None:
+            return
+        try:
+            self.on_evict(key, value)
+        except Exception as e:
+            logger.error(f"Failed to release evicted entry {key}: {e}", exc_info=True)
+
+
+_MISSING = object()
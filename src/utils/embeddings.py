@@ -4,17 +4,289 @@ Embeddings utility module for creating HuggingFace embedding instances.
 This module provides a convenient function to create and configure HuggingFace
 embedding models with sensible defaults.
 """
+import hashlib
+import importlib.util
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+from langchain_classic.embeddings import CacheBackedEmbeddings
+from langchain_classic.storage import EncoderBackedStore, LocalFileStore
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
-from typing import Optional, Dict, Any
+from pathlib import Path
+from typing import Optional, Dict, Any, Hashable, List
+
+from .cache import LRUTTLCache
+from .quantization import dequantize_int8, quantize_int8
 
 logger = logging.getLogger(__name__)
 
+# Where int8-quantized ONNX exports of the embedding models are kept
+ONNX_CACHE_DIR = Path(os.getenv("ONNX_CACHE_DIR", Path.home() / ".cache" / "rag" / "onnx"))
+ONNX_QUANTIZATION = "avx512_vnni"
+ONNX_QUANTIZED_FILE = f"onnx/model_qint8_{ONNX_QUANTIZATION}.onnx"
+
+# Texts whose token IDs OnnxEmbeddings keeps for re-embedding (0 = tokenize every time)
+TOKEN_CACHE_SIZE = int(os.getenv("EMBEDDINGS_TOKEN_CACHE_SIZE", "0"))
+
+# Compile the encoder with torch.compile on CUDA (slow first calls, faster steady state)
+TORCH_COMPILE = os.getenv("TORCH_COMPILE_EMBEDDINGS", "false").strip().lower() == "true"
+
+# Loaded models shared by every caller in the process, keyed by model name and kwargs.
+# At most EMBEDDINGS_CACHE_SIZE models are kept; with EMBEDDINGS_IDLE_TIMEOUT set, a model
+# not requested for that many seconds is dropped on the next call, so its weights are freed
+# once no service holds it anymore. Sessions keep the instance they were given, so the
+# timeout should be longer than a session is expected to stay idle.
+_embeddings_cache: LRUTTLCache = LRUTTLCache(
+    maxsize=int(os.getenv("EMBEDDINGS_CACHE_SIZE", "4")),
+    ttl=float(os.getenv("EMBEDDINGS_IDLE_TIMEOUT", "0"))
+)
+_embeddings_lock = threading.Lock()
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convert (nested) dicts and lists into hashable tuples for use as cache keys."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value if isinstance(value, Hashable) else repr(value)
+
+
+def _onnx_available() -> bool:
+    """Check whether the optional ONNX Runtime backend (optimum + onnxruntime) is installed."""
+    return importlib.util.find_spec("optimum") is not None and importlib.util.find_spec("onnxruntime") is not None
+
+
+def _export_quantized_onnx(model_name: str) -> Path:
+    """
+    Export a model to ONNX with int8 dynamic quantization, once per model.
+    
+    Args:
+        model_name: Name of the HuggingFace embedding model.
+    
+    Returns:
+        Path: Local model directory containing ONNX_QUANTIZED_FILE.
+    """
+    model_dir = ONNX_CACHE_DIR / model_name.replace("/", "__")
+    if not (model_dir / ONNX_QUANTIZED_FILE).exists():
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+        logger.info(f"Exporting int8-quantized ONNX model for {model_name} to {model_dir}")
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save_pretrained(str(model_dir))
+        export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, str(model_dir))
+    return model_dir
+
+
+def _compile_encoder(embeddings: HuggingFaceEmbeddings) -> None:
+    """
+    Compile the transformer of a loaded sentence-transformers model with torch.compile.
+    
+    Uses mode="reduce-overhead" (CUDA graphs) to cut kernel launch overhead, with dynamic
+    shapes so varying batch sizes and sequence lengths don't each trigger a recompilation.
+    A warmup encode runs the compilation at load time instead of on the first request.
+    On any failure the model is left uncompiled.
+    
+    Args:
+        embeddings: Embeddings whose underlying model runs on CUDA.
+    """
+    import torch
+
+    if not hasattr(torch, "compile"):
+        return
+    model = embeddings._client[0].auto_model
+    try:
+        model.compile(mode="reduce-overhead", dynamic=True)
+        embeddings._client.encode(["warmup"] * 4, batch_size=4)
+        logger.info("Embedding model compiled with torch.compile")
+    except Exception as e:
+        # Undo nn.Module.compile() so calls go to the eager forward again
+        model._compiled_call_impl = None
+        logger.warning(f"torch.compile failed, using the eager model: {e}")
+
+
+def _mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """
+    Mean-pool token embeddings over the attention mask, optionally L2-normalizing the result.
+    
+    The masked sum is a single einsum contraction, so no masked copy of the
+    (batch, tokens, hidden) array is allocated.
+    
+    Args:
+        token_embeddings: Encoder output of shape (batch, tokens, hidden).
+        attention_mask: Mask of shape (batch, tokens), 1 for real tokens and 0 for padding.
+        normalize: L2-normalize the pooled embeddings.
+    
+    Returns:
+        np.ndarray: Pooled embeddings of shape (batch, hidden), float32.
+    """
+    mask = attention_mask.astype(np.float32)
+    pooled = np.einsum("bth,bt->bh", token_embeddings.astype(np.float32, copy=False), mask)
+    pooled /= mask.sum(axis=1, keepdims=True).clip(min=1)
+    if normalize:
+        pooled /= np.linalg.norm(pooled, axis=1, keepdims=True).clip(min=1e-12)
+    return pooled
+
+
+def _supports_numpy_pooling(model_dir: Path, encode_kwargs: Dict[str, Any]) -> bool:
+    """
+    Check whether OnnxEmbeddings reproduces the saved sentence-transformers model exactly.
+    
+    That is the case for a Transformer followed by mean pooling and optionally Normalize,
+    encoded with no options other than normalize_embeddings and batch_size.
+    """
+    if not set(encode_kwargs) <= {"normalize_embeddings", "batch_size"}:
+        return False
+    try:
+        modules = json.loads((model_dir / "modules.json").read_text(encoding="utf-8"))
+        pooling = json.loads((model_dir / "1_Pooling" / "config.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    types = [module["type"].rsplit(".", 1)[-1] for module in modules]
+    pooling_modes = {key for key, value in pooling.items() if key.startswith("pooling_mode_") and value}
+    return types[:2] == ["Transformer", "Pooling"] and set(types[2:]) <= {"Normalize"} \
+        and pooling_modes == {"pooling_mode_mean_tokens"}
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Mean-pooling sentence encoder run directly with ONNX Runtime, pooled in numpy.
+    
+    Runs the int8 ONNX export written by _export_quantized_onnx() without the
+    sentence-transformers/PyTorch stack: texts are tokenized, the ONNX session produces
+    token embeddings and _mean_pool() pools and normalizes them.
+    
+    All texts of a call are tokenized up front in one (parallel, Rust) tokenizer call,
+    then grouped into batches by token count and padded per batch, so padding is minimal.
+    With token_cache_size > 0, token IDs are also kept per text, so texts embedded again
+    (e.g. a re-index after the embedding cache was cleared) are not re-tokenized.
+    
+    Attributes:
+        model_dir: Directory of the saved model (tokenizer, configs and ONNX files).
+        batch_size: Number of texts per ONNX session run.
+        normalize: L2-normalize the embeddings.
+        max_length: Maximum number of tokens per text; longer texts are truncated.
+        token_cache_size: Maximum number of tokenized texts kept. 0 disables the cache.
+    
+    Example:
+        >>> embeddings = OnnxEmbeddings(_export_quantized_onnx("sentence-transformers/all-MiniLM-L6-v2"))
+        >>> vector = embeddings.embed_query("Como trocar o filtro hidráulico?")
+    """
+
+    def __init__(
+        self,
+        model_dir: str | Path,
+        file_name: str = ONNX_QUANTIZED_FILE,
+        batch_size: int = 8,
+        normalize: bool = True,
+        token_cache_size: int = 0
+    ):
+        """
+        Load the tokenizer and the ONNX Runtime session.
+        
+        Args:
+            model_dir: Directory of the saved model.
+            file_name: ONNX file to run, relative to model_dir.
+            batch_size: Number of texts per ONNX session run.
+            normalize: L2-normalize the embeddings.
+            token_cache_size: Maximum number of tokenized texts kept. 0 disables the cache.
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.model_dir = Path(model_dir)
+        self.batch_size = batch_size
+        self.normalize = normalize
+        self.token_cache_size = token_cache_size
+        self._token_cache: OrderedDict[bytes, Dict[str, List[int]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+        self.session = onnxruntime.InferenceSession(str(self.model_dir / file_name), providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        try:
+            config = json.loads((self.model_dir / "sentence_bert_config.json").read_text(encoding="utf-8"))
+            self.max_length = config["max_seq_length"]
+        except (OSError, ValueError, KeyError):
+            self.max_length = self.tokenizer.model_max_length
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in batches of similar length.
+        
+        Args:
+            texts: Texts to embed.
+        
+        Returns:
+            List[List[float]]: One embedding per text, in input order.
+        """
+        features = self._tokenize(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(features[i]["input_ids"]), reverse=True)
+        embeddings: List[List[float]] = [[] for _ in texts]
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.tokenizer.pad([features[i] for i in batch], return_tensors="np")
+            inputs = {name: array.astype(np.int64) for name, array in encoded.items() if name in self._input_names}
+            token_embeddings = self.session.run(None, inputs)[0]
+            pooled = _mean_pool(token_embeddings, encoded["attention_mask"], self.normalize)
+            for i, vector in zip(batch, pooled.tolist()):
+                embeddings[i] = vector
+        return embeddings
+
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self.embed_documents([text])[0]
+
+
+    def _tokenize(self, texts: List[str]) -> List[Dict[str, List[int]]]:
+        """
+        Tokenize texts without padding, reusing cached token IDs.
+        
+        Args:
+            texts: Texts to tokenize.
+        
+        Returns:
+            List[Dict[str, List[int]]]: Tokenizer features (input_ids, attention_mask, ...)
+                                        of each text, in input order.
+        """
+        keys = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts]
+        features: List[Optional[Dict[str, List[int]]]] = [None] * len(texts)
+        if self.token_cache_size > 0:
+            with self._lock:
+                for i, key in enumerate(keys):
+                    features[i] = self._token_cache.get(key)
+
+        missing = [i for i, feature in enumerate(features) if feature is None]
+        if missing:
+            encoded = self.tokenizer([texts[i] for i in missing], truncation=True, max_length=self.max_length)
+            for position, i in enumerate(missing):
+                features[i] = {name: values[position] for name, values in encoded.items()}
+
+        if self.token_cache_size > 0:
+            with self._lock:
+                for i, key in enumerate(keys):
+                    self._token_cache[key] = features[i]
+                    self._token_cache.move_to_end(key)
+                while len(self._token_cache) > self.token_cache_size:
+                    self._token_cache.popitem(last=False)
+        return features
+
+
 def get_embeddings(
     model_name: Optional[str] = None,
     model_kwargs: Optional[Dict[str, Any]] = None,
-    encode_kwargs: Optional[Dict[str, Any]] = None
-) -> HuggingFaceEmbeddings:
+    encode_kwargs: Optional[Dict[str, Any]] = None,
+    normalize: bool = True
+) -> Embeddings:
     """
     Create and configure a HuggingFace embeddings instance.
     
@@ -22,6 +294,21 @@ def get_embeddings(
     If arguments are not provided, it uses a multilingual model and auto-detects
     the device (CUDA if available, otherwise CPU).
     
+    Models are loaded once per process: calls with the same model name and kwargs
+    return the same instance, so every session shares one copy of the weights.
+    The registry keeps the EMBEDDINGS_CACHE_SIZE most recently requested models and,
+    if EMBEDDINGS_IDLE_TIMEOUT is set, forgets models not requested for that long.
+    
+    On CPU, when the optional ONNX backend is installed (pip install .[onnx]) and
+    model_kwargs does not choose a backend, the model is exported once to an int8
+    dynamically quantized ONNX model under ONNX_CACHE_DIR and run with ONNX Runtime,
+    which uses VNNI int8 instructions where available. Mean-pooling models are run
+    directly by OnnxEmbeddings, which pools in numpy instead of through torch.
+    Any failure falls back to PyTorch.
+    
+    On CUDA, with TORCH_COMPILE_EMBEDDINGS=true, the PyTorch model is compiled with
+    torch.compile at load time (see _compile_encoder()).
+    
     Args:
         model_name: Name of the HuggingFace embedding model to use.
                    If None, uses "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2".
@@ -29,11 +316,20 @@ def get_embeddings(
                      If None, auto-detects device (CUDA/CPU).
                      Example: {"device": "cuda"} or {"device": "cpu"}.
         encode_kwargs: Dictionary of arguments for encoding embeddings.
-                      If None, uses {"normalize_embeddings": True}.
-                      Normalization is essential for cosine similarity search.
+                      If None, uses {"normalize_embeddings": normalize, "batch_size": 32} on
+                      CUDA and a batch size of 8 on CPU. GPU throughput saturates around
+                      batches of 32.
+        normalize: L2-normalize embeddings when encode_kwargs is None. Normalization costs
+                   an extra pass over every output batch; skip it only when every consumer
+                   normalizes by itself (e.g. a "cosine" collection). Inner-product
+                   collections (the default distance_metric), MMR and the semantic caches
+                   compare raw dot products and need normalized embeddings. int8
+                   quantization does not normalize: its per-vector scale only maps the
+                   largest component to 127.
     
     Returns:
-        HuggingFaceEmbeddings: Configured embeddings instance ready to use.
+        Embeddings: Configured embeddings instance ready to use (HuggingFaceEmbeddings,
+                    or OnnxEmbeddings for the numpy-pooled ONNX encoder).
     
     Example:
         >>> embeddings = get_embeddings()
@@ -60,14 +356,285 @@ def get_embeddings(
         model_kwargs = {"device": device}
     
     if encode_kwargs is None:
-        encode_kwargs = {"normalize_embeddings": True}
+        batch_size = 32 if str(model_kwargs.get("device", "")).startswith("cuda") else 8
+        encode_kwargs = {"normalize_embeddings": normalize, "batch_size": batch_size}
     
-    logger.info(f"Loading embedding model: {model_name}")
-    embeddings = HuggingFaceEmbeddings(
-        model_name=model_name,
-        model_kwargs=model_kwargs,
-        encode_kwargs=encode_kwargs
-    )
+    cache_key = (model_name, _freeze(model_kwargs), _freeze(encode_kwargs))
+    with _embeddings_lock:
+        embeddings = _embeddings_cache.get(cache_key)
+        if embeddings is not None:
+            logger.debug(f"Reusing loaded embedding model: {model_name}")
+            return embeddings
+
+        logger.info(f"Loading embedding model: {model_name}")
+        embeddings = None
+        if str(model_kwargs.get("device", "")) == "cpu" and "backend" not in model_kwargs and _onnx_available():
+            try:
+                model_dir = _export_quantized_onnx(model_name)
+                if _supports_numpy_pooling(model_dir, encode_kwargs):
+                    embeddings = OnnxEmbeddings(
+                        model_dir,
+                        batch_size=encode_kwargs.get("batch_size", 8),
+                        normalize=encode_kwargs.get("normalize_embeddings", False),
+                        token_cache_size=TOKEN_CACHE_SIZE
+                    )
+                else:
+                    embeddings = HuggingFaceEmbeddings(
+                        model_name=str(model_dir),
+                        model_kwargs={**model_kwargs, "backend": "onnx", "model_kwargs": {"file_name": ONNX_QUANTIZED_FILE}},
+                        encode_kwargs=encode_kwargs
+                    )
+                logger.info("Using int8-quantized ONNX encoder")
+            except Exception as e:
+                logger.warning(f"Failed to load quantized ONNX model, falling back to PyTorch: {e}")
+        if embeddings is None:
+            embeddings = HuggingFaceEmbeddings(
+                model_name=model_name,
+                model_kwargs=model_kwargs,
+                encode_kwargs=encode_kwargs
+            )
+            if TORCH_COMPILE and str(model_kwargs.get("device", "")).startswith("cuda"):
+                _compile_encoder(embeddings)
+        _embeddings_cache[cache_key] = embeddings
     logger.info("Embedding model loaded successfully")
     return embeddings
 
+
+def _serialize_int8(vector: List[float]) -> bytes:
+    """Serialize an embedding as its float32 scale followed by its int8 components."""
+    quantized, scale = quantize_int8(vector)
+    return scale.tobytes() + quantized.tobytes()
+
+
+def _deserialize_int8(data: bytes) -> List[float]:
+    """Reconstruct an embedding serialized by _serialize_int8()."""
+    scale = np.frombuffer(data[:4], dtype=np.float32)[0]
+    quantized = np.frombuffer(data[4:], dtype=np.int8)
+    return dequantize_int8(quantized, scale).tolist()
+
+
+def embedding_cache_namespace(embeddings: Embeddings, model_name: str) -> str:
+    """
+    Build the document embedding cache namespace of an embeddings instance.
+    
+    Vectors are only interchangeable between encoders that share the model, the backend
+    (PyTorch or ONNX), the weights' dtype and normalize_embeddings, so all of them are
+    part of the namespace.
+    
+    Args:
+        embeddings: Embeddings instance whose vectors are cached, optionally wrapped in
+                    QueryBatchingEmbeddings.
+        model_name: Name of the embedding model.
+    
+    Returns:
+        str: Namespace for cache_document_embeddings(), e.g.
+             "sentence-transformers/all-MiniLM-L6-v2.torch.float32.normalized".
+    """
+    if isinstance(embeddings, QueryBatchingEmbeddings):
+        embeddings = embeddings.embeddings
+    if isinstance(embeddings, OnnxEmbeddings):
+        backend, dtype, normalize = "onnx", "int8", embeddings.normalize
+    elif isinstance(embeddings, HuggingFaceEmbeddings):
+        backend = embeddings.model_kwargs.get("backend", "torch")
+        inner_kwargs = embeddings.model_kwargs.get("model_kwargs") or {}
+        if backend == "onnx" and inner_kwargs.get("file_name") == ONNX_QUANTIZED_FILE:
+            dtype = "int8"
+        else:
+            dtype = str(inner_kwargs.get("torch_dtype", "float32")).removeprefix("torch.")
+        normalize = embeddings.encode_kwargs.get("normalize_embeddings", False)
+    else:
+        # Unknown encoders only share vectors with instances of the same class
+        backend, dtype, normalize = type(embeddings).__name__.lower(), "default", False
+    return f"{model_name}.{backend}.{dtype}.{'normalized' if normalize else 'unnormalized'}"
+
+
+def cache_document_embeddings(
+    embeddings: Embeddings,
+    cache_dir: str | Path,
+    namespace: str,
+    quantize: bool = False
+) -> CacheBackedEmbeddings:
+    """
+    Wrap embeddings with a persistent, content-keyed cache of document embeddings.
+    
+    Document embeddings are stored on disk under a hash of the namespace and the text,
+    so chunks already embedded by any session (or before a restart) are read back instead
+    of going through the model again. Query embeddings are not cached here; they go
+    straight to the wrapped instance.
+    
+    With quantize=True, vectors are stored int8-quantized (1 byte per dimension plus a
+    4-byte scale, instead of JSON floats) under a separate namespace, and read back as
+    approximate float vectors (cosine error in the order of 1e-3). Cache misses return
+    the same approximation, so a text gets identical vectors whether it was cached or not.
+    
+    Args:
+        embeddings: Embeddings instance to wrap.
+        cache_dir: Directory of the on-disk store. Created on first write.
+        namespace: Cache namespace, e.g. from embedding_cache_namespace(), so vectors of
+                   different encoders are never mixed.
+        quantize: Store vectors int8-quantized.
+    
+    Returns:
+        CacheBackedEmbeddings: The cached embeddings.
+    
+    Example:
+        >>> embeddings = cache_document_embeddings(get_embeddings(), "data/embedding_cache", "my-model")
+        >>> vectors = embeddings.embed_documents(["chunk 1", "chunk 2"])
+    """
+    if not quantize:
+        return CacheBackedEmbeddings.from_bytes_store(
+            embeddings,
+            LocalFileStore(cache_dir),
+            namespace=namespace,
+            key_encoder="blake2b"
+        )
+
+    prefix = f"{namespace}.int8/"
+    store = EncoderBackedStore(
+        LocalFileStore(cache_dir),
+        key_encoder=lambda text: prefix + hashlib.blake2b(text.encode("utf-8")).hexdigest(),
+        value_serializer=_serialize_int8,
+        value_deserializer=_deserialize_int8
+    )
+    return CacheBackedEmbeddings(_Int8RoundTripEmbeddings(embeddings), store)
+
+
+class _Int8RoundTripEmbeddings(Embeddings):
+    """Embeddings wrapper returning document vectors as read back from the int8 cache."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [_deserialize_int8(_serialize_int8(vector)) for vector in self.embeddings.embed_documents(texts)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class QueryBatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that micro-batches concurrent query embeddings and caches them.
+    
+    Questions arriving from different request threads within batch_window seconds are
+    embedded together in one forward pass by a background worker thread, instead of
+    one encoder call per question. Query embeddings are also kept in an LRU cache keyed
+    by a hash of the text, so repeated questions (e.g. the answer cache lookup followed
+    by retrieval of the same question) are embedded only once.
+    
+    Document embeddings are passed straight through to the wrapped instance.
+    
+    Attributes:
+        embeddings: The wrapped embeddings instance.
+        max_batch_size: Maximum number of queries embedded per forward pass.
+        batch_window: Seconds the worker waits for more queries after the first one.
+        cache_size: Maximum number of query embeddings kept in the LRU cache.
+        idle_timeout: Seconds without queries after which the worker thread exits.
+                      It is restarted on the next query.
+    
+    Example:
+        >>> embeddings = QueryBatchingEmbeddings(get_embeddings())
+        >>> vector = embeddings.embed_query("Como trocar o filtro hidráulico?")
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 32,
+        batch_window: float = 0.01,
+        cache_size: int = 1024,
+        idle_timeout: float = 60.0
+    ):
+        """
+        Initialize the wrapper.
+        
+        Args:
+            embeddings: Embeddings instance to wrap.
+            max_batch_size: Maximum number of queries embedded per forward pass.
+            batch_window: Seconds to wait for more queries after the first one.
+            cache_size: Maximum number of cached query embeddings. 0 disables the cache.
+            idle_timeout: Seconds without queries before the worker thread exits.
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.cache_size = cache_size
+        self.idle_timeout = idle_timeout
+        self._queue: queue.Queue[tuple[str, Future]] = queue.Queue()
+        self._cache: OrderedDict[bytes, List[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with the wrapped instance."""
+        return self.embeddings.embed_documents(texts)
+
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query, batching it with concurrent queries and caching the result.
+        
+        Args:
+            text: Query text.
+        
+        Returns:
+            List[float]: The query embedding.
+        """
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        future: Future = Future()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+            # Enqueue while holding the lock so an idle worker can't exit in between
+            self._queue.put((text, future))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+                self._worker.start()
+
+        embedding = future.result()
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = embedding
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return embedding
+
+
+    def _run(self) -> None:
+        """Worker loop: collect queued queries into batches and embed them."""
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.idle_timeout)]
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # For HuggingFaceEmbeddings without query-specific encode kwargs,
+            # embed_documents encodes exactly like embed_query, but in one pass
+            try:
+                vectors = self.embeddings.embed_documents([text for text, _ in batch])
+                if len(vectors) != len(batch):
+                    raise RuntimeError(f"Expected {len(batch)} query embeddings, got {len(vectors)}")
+            except Exception as e:
+                logger.error(f"Query embedding batch failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            logger.debug(f"Embedded {len(batch)} queries in one batch")
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
@@ -0,0 +1,134 @@
+"""
+Persistent index of ingested chunks.
+
+IngestIndex records which chunk IDs (content hashes) were written to which
+collection in a small SQLite database shared by worker processes. Its rows are
+hints: the vector store remains the source of truth, and rows it does not
+confirm are discarded.
+"""
+import logging
+import sqlite3
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER of older SQLite builds (999)
+_MAX_PARAMS = 900
+
+
+class IngestIndex:
+    """
+    SQLite table of the chunk IDs indexed per collection.
+
+    The database runs in WAL mode, so any number of processes can read it while
+    one writes, and lookups do not wait for writers. Writes use synchronous=NORMAL:
+    a crash may lose the last rows, which only means those chunks are looked up in
+    the vector store again.
+
+    Attributes:
+        path: Path of the SQLite database file.
+
+    Example:
+        >>> index = IngestIndex("data/ingest_index.sqlite")
+        >>> index.add("session_123", ["3f2a..."])
+        >>> index.contains("session_123", ["3f2a...", "9b1c..."])
+        {'3f2a...'}
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the index database.
+
+        Args:
+            path: Path of the SQLite database file. Parent directories are created.
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; writes are grouped with explicit transactions
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA temp_store=MEMORY")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            "collection TEXT NOT NULL, h TEXT NOT NULL, PRIMARY KEY (collection, h)"
+            ") WITHOUT ROWID"
+        )
+        logger.debug(f"Opened ingest index: {path}")
+
+    def contains(self, collection: str, ids: Iterable[str]) -> Set[str]:
+        """
+        Return the IDs already recorded for a collection.
+
+        Args:
+            collection: Name of the collection.
+            ids: Chunk IDs to look up.
+
+        Returns:
+            Set[str]: The subset of ids that is recorded.
+        """
+        found = set()
+        ids = iter(ids)
+        with self._lock:
+            while group := list(islice(ids, _MAX_PARAMS)):
+                rows = self._db.execute(
+                    f"SELECT h FROM seen WHERE collection = ? AND h IN ({','.join('?' * len(group))})",
+                    [collection, *group]
+                )
+                found.update(h for (h,) in rows)
+        return found
+
+    def add(self, collection: str, ids: List[str]) -> None:
+        """
+        Record chunk IDs as indexed in a collection, in a single transaction.
+
+        Args:
+            collection: Name of the collection.
+            ids: Chunk IDs written to the collection.
+        """
+        if not ids:
+            return
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO seen VALUES (?, ?)",
+                    [(collection, chunk_id) for chunk_id in ids]
+                )
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def discard(self, collection: str, ids: List[str]) -> None:
+        """
+        Drop recorded chunk IDs of a collection, e.g. when they turn out to be stale.
+
+        Args:
+            collection: Name of the collection.
+            ids: Chunk IDs to drop.
+        """
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM seen WHERE collection = ? AND h = ?",
+                [(collection, chunk_id) for chunk_id in ids]
+            )
+
+    def forget(self, collection: str) -> None:
+        """
+        Drop all IDs recorded for a collection, e.g. when it is deleted.
+
+        Args:
+            collection: Name of the collection.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM seen WHERE collection = ?", (collection,))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
@@ -7,16 +7,37 @@ This module provides a centralized logging setup with configurable levels:
 - WARNING: Warning level events (empty documents, missing optional configs)
 - CRITICAL: Errors or higher than warning (failed operations, missing required configs)
 """
+import atexit
 import logging
+import queue
 import sys
+import time
 import uuid
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
 
 # Default logs directory
-LOGS_DIR = Path(__file__).parent.parent.parent / "logs"
+LOGS_DIR = Path(__file__).resolve().parents[2] / "logs"
+
+# Background thread writing queued records to the configured handlers
+_listener: Optional[QueueListener] = None
+
+
+def stop_logging() -> None:
+    """
+    Stop the background log writer, flushing every queued record.
+    
+    Runs at interpreter exit; call it explicitly to flush logs earlier.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
 
 
 def generate_log_filename(user_id: str, session_id: Optional[str] = None) -> str:
@@ -37,9 +58,9 @@ def generate_log_filename(user_id: str, session_id: Optional[str] = None) -> str
         'user123_sess456_05-02-2026-14-30.log'
     """
     if session_id is None:
-        session_id = str(uuid.uuid4())[:8]
+        session_id = uuid.uuid4().hex[:8]
     
-    timestamp = datetime.now().strftime("%d-%m-%Y-%H-%M")
+    timestamp = time.strftime("%d-%m-%Y-%H-%M")
     return f"{user_id}_{session_id}_{timestamp}.log"
 
 
@@ -57,6 +78,11 @@ def setup_logging(
     This function sets up logging with a consistent format across all modules.
     Call this once at application startup (e.g., in main.py).
     
+    Loggers only put records on a queue; the console/file writes happen on a
+    background QueueListener thread, so logging on the request and embedding paths
+    never waits for I/O. The message itself (arguments merged, traceback rendered)
+    is still built on the logging thread, by QueueHandler.prepare().
+    
     Args:
         level: Logging level. Use logging.DEBUG, logging.INFO, logging.WARNING, 
                or logging.CRITICAL. Default is INFO.
@@ -99,18 +125,24 @@ def setup_logging(
     # Create formatter
     formatter = logging.Formatter(format_string)
     
+    # Skip collecting thread/process info on every record unless the format uses it
+    logging.logThreads = "%(thread" in format_string
+    logging.logProcesses = "%(process" in format_string
+    logging.logMultiprocessing = "%(processName" in format_string
+    
     # Get root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
     
     # Remove existing handlers to avoid duplicates
+    stop_logging()
     root_logger.handlers = []
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # Determine log file path
     log_file_path = ""
@@ -134,8 +166,16 @@ def setup_logging(
         file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
-        
+        handlers.append(file_handler)
+    
+    # The handlers run on the listener thread; loggers only enqueue records
+    global _listener
+    log_queue: queue.Queue = queue.Queue(-1)
+    root_logger.addHandler(QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    
+    if log_file_path:
         # Log the session info to the file
         root_logger.info(f"Log session started - User: {user_id}, Session: {session_id}")
     
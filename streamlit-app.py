@@ -1,28 +1,182 @@
 import os
-import requests
+import hashlib
+import httpx
+import orjson
 import uuid
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Tuple
 from dotenv import load_dotenv
 
 import streamlit as st
 from src.utils.logging_config import setup_logging
 
 from src.models.config import RAGConfig
+from src.utils.cache import LRUTTLCache
+from src.utils.compression import gzip_chunks, is_compressed
 
-load_dotenv()
+
+@st.cache_resource
+def _load_env() -> None:
+    """Load .env into os.environ once per process instead of re-parsing it on every rerun."""
+    load_dotenv()
+
+
+_load_env()
 
 API_URL = os.getenv("API_URL")
+# Timeouts in seconds; indexing and LLM calls can take a while to respond
+API_TIMEOUT = httpx.Timeout(connect=5, read=120, write=60, pool=5)
+# Answers kept client-side for repeated questions: entry count and idle seconds
+ANSWER_CACHE_SIZE = 128
+ANSWER_CACHE_TTL = 600
+# Characters of each reference shown in the chat
+REFERENCE_PREVIEW_CHARS = 500
+# Files sent per /upload request, and how many of those requests run at once
+UPLOAD_GROUP_SIZE = 3
+UPLOAD_WORKERS = 4
+# Seconds between polls of /upload/{task_id} while documents are indexed
+UPLOAD_POLL_INTERVAL = 0.5
 
 logger = logging.getLogger(__name__)
 
-# Initialize RAG configuration
-rag_config = RAGConfig()
+# Initialize RAG configuration (once per process, not on every rerun)
+@st.cache_resource
+def _get_rag_config() -> RAGConfig:
+    return RAGConfig()
+
+
+@st.cache_resource
+def _get_model_lookups() -> Tuple[Dict[Tuple[str, str], str], Dict[str, List[str]]]:
+    """
+    Build the model lookup tables used while rendering.
+    
+    Returns:
+        Tuple of ({(provider, model_id): label}, {provider: [model_id, ...]}),
+        with model ids in display order.
+    """
+    language_models = _get_rag_config().available_language_models
+    labels = {(p, mid): label for p, ms in language_models.items() for mid, label in ms}
+    options = {p: [mid for mid, _ in ms] for p, ms in language_models.items()}
+    return labels, options
+
+
+rag_config = _get_rag_config()
 available_providers = rag_config.available_providers
-available_language_models = rag_config.available_language_models
+MODEL_LABELS, MODEL_OPTIONS = _get_model_lookups()
 
 
 st.set_page_config(page_title="Document AI Q&A Assistant", page_icon="📚", layout="wide")
 
+def create_http_client() -> httpx.Client:
+    """
+    Create an HTTP client with a keep-alive connection pool for API calls.
+    
+    Reusing one client across reruns avoids a new TCP (and TLS) handshake per
+    request. When the h2 package is installed (pip install .[http2]) and the API
+    is served over HTTPS by an HTTP/2-capable proxy, requests are multiplexed
+    over a single connection; otherwise the client falls back to HTTP/1.1.
+    Connection failures are retried; uploads and questions are never re-sent
+    once the server has received them.
+    """
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    transport = httpx.HTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        retries=2
+    )
+    return httpx.Client(timeout=API_TIMEOUT, transport=transport)
+
+
+@st.cache_resource
+def get_upload_executor() -> ThreadPoolExecutor:
+    """Thread pool for document uploads, shared by every browser session."""
+    return ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+def upload_group(http: httpx.Client, session_id: str, files: List) -> httpx.Response:
+    """
+    Upload a group of files to the API in a single multipart request.
+    
+    Runs in the upload thread pool, so it must not call any Streamlit functions.
+    Each file object is passed to httpx as-is, which reads it directly
+    rather than copying it via getvalue(). When none of the files is already
+    compressed (HTML rather than PDF), the body is gzipped while it is sent.
+    """
+    compressible = True
+    for f in files:
+        f.seek(0)
+        compressible = compressible and not is_compressed(f.read(4))
+        f.seek(0)
+    files_to_upload = [
+        ("files", (f.name, f, f.type or "application/octet-stream"))
+        for f in files
+    ]
+    url = f"{API_URL}/upload"
+    params = {"session_id": session_id}
+    request = http.build_request("POST", url, params=params, files=files_to_upload)
+    if compressible:
+        request = http.build_request(
+            "POST",
+            url,
+            params=params,
+            content=gzip_chunks(request.stream),
+            headers={"Content-Type": request.headers["Content-Type"], "Content-Encoding": "gzip"}
+        )
+    return http.send(request)
+
+
+@st.cache_resource
+def get_answer_cache() -> LRUTTLCache:
+    """(answer, references, reference previews) of completed questions, shared by every browser session."""
+    return LRUTTLCache(maxsize=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL)
+
+
+def api_key_digest(api_key: str) -> str:
+    """Short SHA-256 digest identifying an API key without revealing it."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+def preview_references(references: List[str]) -> List[str]:
+    """Truncate references for display, once per answer rather than on every rerun."""
+    return [
+        ref[:REFERENCE_PREVIEW_CHARS] + "..." if len(ref) > REFERENCE_PREVIEW_CHARS else ref
+        for ref in references
+    ]
+
+
+def iter_answer_chunks(response: httpx.Response, references: List[str]) -> Iterator[str]:
+    """
+    Yield answer chunks from a /question/stream Server-Sent Events response.
+    
+    Answer tokens arrive as unnamed `data:` events. The trailing `references`
+    event is added to `references` once the answer is complete, and an `error`
+    event is raised as a RuntimeError.
+    """
+    event = "message"
+    for line in response.iter_lines():
+        if not line:
+            event = "message"
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data = orjson.loads(line[len("data:"):])
+            if event == "references":
+                references.extend(data)
+            elif event == "error":
+                raise RuntimeError(data)
+            else:
+                yield data
+
+
+if "http" not in st.session_state:
+    st.session_state.http = create_http_client()
+
 if "user_id_key" not in st.session_state:
     st.session_state.user_id_key = str(uuid.uuid4())
 
@@ -42,20 +196,35 @@ if "logging_initialized" not in st.session_state:
 if "uploaded_files" not in st.session_state:
     st.session_state.uploaded_files = []
 
+# Same names as uploaded_files, for O(1) membership checks (the list keeps display order)
+if "uploaded_files_set" not in st.session_state:
+    st.session_state.uploaded_files_set = set()
+
 if "is_processing" not in st.session_state:
     st.session_state.is_processing = False
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+if "show_full_history" not in st.session_state:
+    st.session_state.show_full_history = False
+
+# Bumped on every successful upload, so cached answers never outlive the documents they came from
+if "documents_version" not in st.session_state:
+    st.session_state.documents_version = 0
+
 if "total_chunks" not in st.session_state:
     st.session_state.total_chunks = 0
 
+# Each key is stored with a short digest, computed only when the key changes; the
+# digest identifies the key in cache keys so the key itself is never stored there
 if "groq_api_key" not in st.session_state:
     st.session_state.groq_api_key = ""
+    st.session_state.groq_api_key_digest = api_key_digest("")
 
 if "gemini_api_key" not in st.session_state:
     st.session_state.gemini_api_key = ""
+    st.session_state.gemini_api_key_digest = api_key_digest("")
 
 logger.info("Starting Document AI Q&A Assistant")
 
@@ -96,8 +265,10 @@ with st.sidebar:
             )
             if groq_key != st.session_state.groq_api_key:
                 st.session_state.groq_api_key = groq_key
+                st.session_state.groq_api_key_digest = api_key_digest(groq_key)
 
             st.session_state.current_api_key = st.session_state.groq_api_key
+            st.session_state.current_api_key_digest = st.session_state.groq_api_key_digest
             
 
     elif provider == "gemini":         
@@ -115,16 +286,17 @@ with st.sidebar:
             )
             if gemini_key != st.session_state.gemini_api_key:
                 st.session_state.gemini_api_key = gemini_key
+                st.session_state.gemini_api_key_digest = api_key_digest(gemini_key)
             
             st.session_state.current_api_key = st.session_state.gemini_api_key    
+            st.session_state.current_api_key_digest = st.session_state.gemini_api_key_digest
 
         
     # Model selection based on provider
-    model_options = available_language_models[provider]
     model = st.selectbox(
         "Model",
-        options=[m[0] for m in model_options],
-        format_func=lambda x: next(m[1] for m in model_options if m[0] == x)
+        options=MODEL_OPTIONS[provider],
+        format_func=lambda x: MODEL_LABELS[(provider, x)]
     )
     
     # Temperature slider
@@ -150,7 +322,7 @@ with st.sidebar:
 
     if uploaded_files:
         # Filter to only new files
-        new_files = [f for f in uploaded_files if f.name not in st.session_state.uploaded_files]
+        new_files = [f for f in uploaded_files if f.name not in st.session_state.uploaded_files_set]
         
         if new_files:
             if len(new_files) > MAX_FILES:
@@ -160,41 +332,97 @@ with st.sidebar:
             if st.button("Process Documents", type="primary"):
                 st.session_state.is_processing = True
                 
-                with st.spinner("Uploading and processing documents..."):
-                    # Prepare files for multipart upload
-                    files_to_upload = [
-                        ("files", (f.name, f.getvalue(), f.type or "application/octet-stream"))
-                        for f in new_files
-                    ]
-                    
-                    try:
-                        response = requests.post(f"{API_URL}/upload",
-                                                 params={"session_id": st.session_state.user_id_key},
-                                                 files=files_to_upload)
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            st.success(f"✅ {result['message']}")
-                            logger.debug(f"Documents indexed: {result['documents_indexed']}")
-                            logger.debug(f"Total chunks: {result['total_chunks']}")
-                            
-                            # Track uploaded files
-                            st.session_state.uploaded_files.extend([f.name for f in new_files])
-                            logger.debug(f"Uploaded files: {st.session_state.uploaded_files}")
-                           
-                        else:
-                            st.error(f"Failed to process: {response.text}")
-                            logger.error(f"Upload failed: {response.status_code} {response.text}")
-
-                    except requests.exceptions.ConnectionError as connection_error:
-                        st.error(f"Cannot connect to API. Make sure the server is running on {API_URL}.")
-                        logger.error(f"Cannot connect to API: {connection_error}")
-
-                    except Exception as e:
-                        st.error(f"Error: {str(e)}")
-                        logger.error(f"Upload error: {e}", exc_info=True)
-                    finally:
-                        st.session_state.is_processing = False
+                # Upload in groups of UPLOAD_GROUP_SIZE files, several requests in flight at once,
+                # so the transfer of one group overlaps with the server indexing another
+                groups = [new_files[i:i + UPLOAD_GROUP_SIZE] for i in range(0, len(new_files), UPLOAD_GROUP_SIZE)]
+                progress = st.progress(0.0, text="Uploading and processing documents...")
+                futures = {
+                    get_upload_executor().submit(
+                        upload_group,
+                        st.session_state.http,
+                        st.session_state.user_id_key,
+                        group
+                    ): group
+                    for group in groups
+                }
+                tasks = {}  # task_id -> group of files being indexed by it
+                total_documents = 0
+                total_chunks = 0
+                failed = False
+
+                try:
+                    # The API responds once a group's files are saved and indexes them in the background
+                    for done, future in enumerate(as_completed(futures), 1):
+                        group = futures[future]
+                        progress.progress(done / len(futures) / 2, text=f"Uploaded {done}/{len(futures)} upload batches")
+                        try:
+                            response = future.result()
+
+                            if response.status_code == 202:
+                                tasks[response.json()["task_id"]] = group
+                            else:
+                                failed = True
+                                st.error(f"Failed to process: {response.text}")
+                                logger.error(f"Upload failed: {response.status_code} {response.text}")
+
+                        except httpx.ConnectError as connection_error:
+                            failed = True
+                            st.error(f"Cannot connect to API. Make sure the server is running on {API_URL}.")
+                            logger.error(f"Cannot connect to API: {connection_error}")
+
+                        except Exception as e:
+                            failed = True
+                            st.error(f"Error: {str(e)}")
+                            logger.error(f"Upload error: {e}", exc_info=True)
+
+                    # Poll the indexing tasks until every one has finished
+                    pending = dict(tasks)
+                    while pending:
+                        time.sleep(UPLOAD_POLL_INTERVAL)
+                        for task_id, group in list(pending.items()):
+                            try:
+                                response = st.session_state.http.get(f"{API_URL}/upload/{task_id}")
+                                response.raise_for_status()
+                                result = response.json()
+                            except Exception as e:
+                                failed = True
+                                del pending[task_id]
+                                st.error(f"Error: {str(e)}")
+                                logger.error(f"Upload status error: {e}", exc_info=True)
+                                continue
+
+                            if result["status"] == "completed":
+                                del pending[task_id]
+                                total_documents += result["documents_indexed"]
+                                total_chunks += result["total_chunks"]
+                                logger.debug(f"Documents indexed: {result['documents_indexed']}")
+                                logger.debug(f"Total chunks: {result['total_chunks']}")
+
+                                # Track uploaded files
+                                st.session_state.uploaded_files.extend([f.name for f in group])
+                                st.session_state.uploaded_files_set.update(f.name for f in group)
+                                st.session_state.documents_version += 1
+                                logger.debug(f"Uploaded files: {st.session_state.uploaded_files}")
+
+                            elif result["status"] == "failed":
+                                del pending[task_id]
+                                failed = True
+                                st.error(result["message"])
+                                logger.error(f"Indexing failed: {result['message']}")
+
+                        indexed = len(tasks) - len(pending)
+                        progress.progress(
+                            0.5 + indexed / len(tasks) / 2,
+                            text=f"Processed {indexed}/{len(tasks)} upload batches"
+                        )
+
+                    if total_documents and not failed:
+                        st.success(f"✅ Documents processed successfully ({total_documents} documents, {total_chunks} chunks)")
+                    elif total_documents:
+                        st.warning(f"Some documents were processed ({total_documents} documents, {total_chunks} chunks)")
+                finally:
+                    progress.empty()
+                    st.session_state.is_processing = False
 
     # uploaded files
     if st.session_state.uploaded_files:
@@ -208,18 +436,29 @@ with st.sidebar:
 st.header(" Ask Questions")
 st.markdown("Ask questions about the documents you uploaded.")
 
-# chat messages
-for message in st.session_state.messages:
+# chat messages (only the most recent ones unless the full history was requested)
+CHAT_HISTORY_WINDOW = 20
+messages = st.session_state.messages
+if len(messages) > CHAT_HISTORY_WINDOW:
+    hidden = len(messages) - CHAT_HISTORY_WINDOW
+    st.button(
+        "Hide earlier messages" if st.session_state.show_full_history else f"Show {hidden} earlier messages",
+        on_click=lambda: st.session_state.update(show_full_history=not st.session_state.show_full_history)
+    )
+    if not st.session_state.show_full_history:
+        messages = messages[-CHAT_HISTORY_WINDOW:]
+
+for message in messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
         if message["role"] == "assistant" and message.get("model"):
-            model_label = next((m[1] for m in available_language_models.get(message.get("provider", ""), []) if m[0] == message["model"]), message["model"])
+            model_label = MODEL_LABELS.get((message.get("provider", ""), message["model"]), message["model"])
             st.caption(f"Model: {model_label}")
         if "references" in message:
             with st.expander("📖 View References"):
-                for i, ref in enumerate(message["references"], 1):
+                for i, ref in enumerate(message["references_preview"], 1):
                     st.markdown(f"**Reference {i}:**")
-                    st.text(ref[:500] + "..." if len(ref) > 500 else ref)
+                    st.text(ref)
                     st.divider()
 
 
@@ -231,79 +470,123 @@ if prompt := st.chat_input("Ask a question about your documents..."):
         st.markdown(prompt)
     logger.debug(f"User message: {prompt}")
 
+    # Repeated questions with the same settings and documents are answered from the cache.
+    answer_key = (
+        st.session_state.user_id_key,
+        st.session_state.documents_version,
+        provider,
+        model,
+        temperature,
+        prompt,
+        st.session_state.current_api_key_digest
+    )
+    cached_answer = get_answer_cache().get(answer_key)
+
     # Generate response
     with st.chat_message("assistant"):
         # Check if API key is configured
         if not st.session_state.current_api_key:
             error_msg = f"Please enter your {available_providers[provider]['name']} API key in the sidebar."
             st.warning(error_msg)
-            st.caption(f"Model: {next(m[1] for m in available_language_models[provider] if m[0] == model)}")
+            st.caption(f"Model: {MODEL_LABELS.get((provider, model), model)}")
             st.session_state.messages.append({"role": "assistant", "content": error_msg, "model": model, "provider": provider})
             logger.warning(error_msg)
 
+        elif cached_answer is not None:
+            answer, references, references_preview = cached_answer
+            st.markdown(answer)
+            st.caption(f"Model: {MODEL_LABELS.get((provider, model), model)}")
+
+            if references:
+                with st.expander("References Used"):
+                    for i, ref in enumerate(references_preview, 1):
+                        st.markdown(f"**Reference {i}:**")
+                        st.text(ref)
+                        st.divider()
+
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": answer,
+                "references": references,
+                "references_preview": references_preview,
+                "model": model,
+                "provider": provider
+            })
+            logger.debug("Answer served from the client cache")
+
         else:
-            with st.spinner(f"Thinking ({model})..."):
-                try:
-                    response = requests.post(
-                        f"{API_URL}/question",
-                        json={
-                            "session_id":st.session_state.user_id_key,
-                            "question": prompt,
-                            "provider": provider,
-                            "model": model,
-                            "api_key": st.session_state.current_api_key,
-                            "temperature": temperature
-                        },
-                        headers={"Content-Type": "application/json"}
-                    )
+            response = None
+            try:
+                request = st.session_state.http.build_request(
+                    "POST",
+                    f"{API_URL}/question/stream",
+                    content=orjson.dumps({
+                        "session_id":st.session_state.user_id_key,
+                        "question": prompt,
+                        "provider": provider,
+                        "model": model,
+                        "api_key": st.session_state.current_api_key,
+                        "temperature": temperature
+                    }),
+                    headers={"Content-Type": "application/json"}
+                )
+                # The spinner covers retrieval; answer tokens are rendered as they arrive
+                with st.spinner(f"Thinking ({model})..."):
+                    response = st.session_state.http.send(request, stream=True)
+                
+                if response.status_code == 200:
+                    references = []
+                    answer = st.write_stream(iter_answer_chunks(response, references))
+                    references_preview = preview_references(references)
+                    get_answer_cache()[answer_key] = (answer, references, references_preview)
+                    st.caption(f"Model: {MODEL_LABELS.get((provider, model), model)}")
                     
-                    if response.status_code == 200:
-                        result = response.json()
-                        answer = result["answer"]
-                        references = result["references"]
-                        
-                        st.markdown(answer)
-                        st.caption(f"Model: {next(m[1] for m in available_language_models[provider] if m[0] == model)}")
-                        
-                        if references:
-                            with st.expander("References Used"):
-                                for i, ref in enumerate(references, 1):
-                                    st.markdown(f"**Reference {i}:**")
-                                    st.text(ref[:500] + "..." if len(ref) > 500 else ref)
-                                    st.divider()
-                        
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": answer,
-                            "references": references,
-                            "model": model,
-                            "provider": provider
-                        })
-
-                    elif response.status_code == 401:
-                        error_msg = "Invalid API key. Please check your key in the sidebar and try again."
-                        st.warning(error_msg)
-                        st.caption(f"Model: {next(m[1] for m in available_language_models[provider] if m[0] == model)}")
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg, "model": model, "provider": provider})
-                        logger.warning(f"Auth error: {response.text}")
-
-                    else:
-                        error_msg = f"Error: {response.text}"
-                        st.error(error_msg)
-                        st.caption(f"Model: {next(m[1] for m in available_language_models[provider] if m[0] == model)}")
-                        st.session_state.messages.append({"role": "assistant", "content": error_msg, "model": model, "provider": provider})
-                        logger.error(f"Query error: {error_msg}")
-
-                except requests.exceptions.ConnectionError as e:
-                    error_msg = f"Cannot connect to API. Make sure the server is running on {API_URL}."
-                    st.error(error_msg)
-                    st.caption(f"Model: {next(m[1] for m in available_language_models[provider] if m[0] == model)}")
+                    if references:
+                        with st.expander("References Used"):
+                            for i, ref in enumerate(references_preview, 1):
+                                st.markdown(f"**Reference {i}:**")
+                                st.text(ref)
+                                st.divider()
+                    
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": answer,
+                        "references": references,
+                        "references_preview": references_preview,
+                        "model": model,
+                        "provider": provider
+                    })
+
+                elif response.status_code == 401:
+                    response.read()
+                    error_msg = "Invalid API key. Please check your key in the sidebar and try again."
+                    st.warning(error_msg)
+                    st.caption(f"Model: {MODEL_LABELS.get((provider, model), model)}")
                     st.session_state.messages.append({"role": "assistant", "content": error_msg, "model": model, "provider": provider})
-                    logger.error(f"Connection error: {e}")
+                    logger.warning(f"Auth error: {response.text}")
 
-                except Exception as e:
-                    error_msg = f"Error: {str(e)}"
+                else:
+                    response.read()
+                    error_msg = f"Error: {response.text}"
                     st.error(error_msg)
-                    st.caption(f"Model: {next(m[1] for m in available_language_models[provider] if m[0] == model)}")
+                    st.caption(f"Model: {MODEL_LABELS.get((provider, model), model)}")
                     st.session_state.messages.append({"role": "assistant", "content": error_msg, "model": model, "provider": provider})
-                    logger.error(f"Query error: {e}")
\ No newline at end of file
+                    logger.error(f"Query error: {error_msg}")
+
+            except httpx.ConnectError as e:
+                error_msg = f"Cannot connect to API. Make sure the server is running on {API_URL}."
+                st.error(error_msg)
+                st.caption(f"Model: {MODEL_LABELS.get((provider, model), model)}")
+                st.session_state.messages.append({"role": "assistant", "content": error_msg, "model": model, "provider": provider})
+                logger.error(f"Connection error: {e}")
+
+            except Exception as e:
+                error_msg = f"Error: {str(e)}"
+                st.error(error_msg)
+                st.caption(f"Model: {MODEL_LABELS.get((provider, model), model)}")
+                st.session_state.messages.append({"role": "assistant", "content": error_msg, "model": model, "provider": provider})
+                logger.error(f"Query error: {e}")
+
+            finally:
+                if response is not None:
+                    response.close()
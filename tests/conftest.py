@@ -1,29 +1,31 @@
 """Shared pytest fixtures for all tests."""
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, create_autospec, patch
 from fastapi.testclient import TestClient
+from langchain_chroma import Chroma
 
+import main
 from src.services.document_service import DocumentService
 from src.services.vectorstore_service import VectorStoreService
 from src.services.rag_service import RAGService
 from src.models.config import RAGConfig
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rag_config():
-    """RAG configuration instance."""
+    """RAG configuration instance, shared by all tests (never mutated)."""
     return RAGConfig()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def document_service():
-    """Document service instance."""
+    """Document service instance, shared by all tests (stateless)."""
     return DocumentService()
 
 
-@pytest.fixture
-def mock_embeddings():
-    """Mock HuggingFace embeddings to avoid loading the model."""
+@pytest.fixture(scope="session")
+def _session_embeddings():
+    """Patch get_embeddings with a single mock for the whole test session."""
     with patch("src.services.vectorstore_service.get_embeddings") as mock:
         mock_embedding = MagicMock()
         mock_embedding.embed_documents.return_value = [[0.1] * 384]
@@ -32,27 +34,83 @@ def mock_embeddings():
         yield mock_embedding
 
 
+@pytest.fixture
+def mock_embeddings(_session_embeddings):
+    """Mock HuggingFace embeddings to avoid loading the model."""
+    # Tests set side effects and assert on calls, so start each one from a clean mock
+    _session_embeddings.reset_mock(side_effect=True)
+    return _session_embeddings
+
+
 @pytest.fixture
 def vectorstore_service(mock_embeddings):
     """VectorStore service with mocked embeddings."""
-    return VectorStoreService(
+    # Function-scoped: tests change attributes such as batch_size. Construction is cheap
+    # (embeddings are patched once per session and loaded lazily), so a fresh service per
+    # test costs less than resetting a shared one; closing it drops the test's collection.
+    service = VectorStoreService(
         collection_name="test_collection",
         embedding_model="test-model"
     )
+    yield service
+    service.close()
+
+
+@pytest.fixture(scope="session")
+def _chroma_instance():
+    """Chroma instance double spec'd from the real class, built once (autospeccing takes ~50 ms)."""
+    return create_autospec(Chroma, instance=True)
 
 
 @pytest.fixture
-def rag_service(mock_embeddings):
-    """RAG service with mocked embeddings."""
+def mock_chroma(_chroma_instance):
+    """
+    Patch Chroma in the vectorstore service with a spec'd class.
+    
+    Calls to the collection wrapper (e.g. get) are checked against Chroma's signatures.
+    The instance starts each test with no calls and an empty collection.
+    """
+    _chroma_instance.reset_mock(return_value=True, side_effect=True)
+    _chroma_instance.get.return_value = {"ids": []}
+    with patch(
+        "src.services.vectorstore_service.Chroma",
+        new=MagicMock(spec=Chroma, return_value=_chroma_instance)
+    ) as mock:
+        yield mock
+
+
+@pytest.fixture(scope="module")
+def _module_rag_service(_session_embeddings):
+    """RAG service built once per test module."""
     config = RAGConfig()
     return RAGService(config, session_id="test-session")
 
 
 @pytest.fixture
+def rag_service(_module_rag_service, mock_embeddings):
+    """RAG service with mocked embeddings."""
+    yield _module_rag_service
+    # Drop the vector store, retriever and caches so the next test starts fresh
+    _module_rag_service.close()
+
+
+@pytest.fixture(scope="session")
 def api_client():
-    """FastAPI test client."""
-    from main import app
-    return TestClient(app)
+    """FastAPI test client, shared by all tests."""
+    # Not entered as a context manager: that would run the app's lifespan and preload
+    # the real embedding model
+    return TestClient(main.app)
+
+
+@pytest.fixture(autouse=True)
+def reset_app_state():
+    """Drop the sessions, upload tasks and LLMs a test left in the API's module-level caches."""
+    yield
+    main._llms.clear()
+    main._sessions.clear()
+    main._services_in_use.clear()
+    main._evicted_in_use.clear()
+    main._upload_tasks.clear()
 
 
 @pytest.fixture
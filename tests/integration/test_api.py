@@ -38,6 +38,45 @@ class TestSessionEndpoint:
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
 
+    def test_delete_closes_session(self, api_client):
+        """Should close the session's service when it is deleted."""
+        import main
+        service = MagicMock()
+        main._sessions["closing-session"] = service
+        
+        response = api_client.delete("/session/closing-session")
+        
+        assert response.status_code == 200
+        service.close.assert_called_once()
+        assert "closing-session" not in main._sessions
+
+    def test_delete_defers_close_while_in_use(self, api_client):
+        """Should close a deleted session's service only once the work using it is done."""
+        import main
+        service = MagicMock()
+        main._sessions["busy-session"] = service
+        
+        with main.rag_service_in_use("busy-session"):
+            response = api_client.delete("/session/busy-session")
+            
+            assert response.status_code == 200
+            service.close.assert_not_called()
+        
+        service.close.assert_called_once()
+
+    def test_reuses_evicted_service_while_in_use(self, api_client):
+        """Should hand out the evicted service again instead of opening a second one."""
+        import main
+        service = MagicMock()
+        main._sessions["busy-session"] = service
+        
+        with main.rag_service_in_use("busy-session"):
+            del main._sessions["busy-session"]
+            
+            assert main.get_rag_service("busy-session") is service
+        
+        service.close.assert_not_called()
+
 
 class TestUploadEndpoint:
     """Tests for /upload endpoint."""
@@ -67,6 +106,122 @@ class TestUploadEndpoint:
         assert response.status_code == 400
         assert "No valid PDF or HTML" in response.json()["detail"]
 
+    def test_saves_valid_files(self, api_client, tmp_path):
+        """Should stream valid files to disk before indexing them."""
+        content = b"%PDF-1.4 fake content" * 1000
+        files = [("files", ("manual.pdf", content, "application/pdf"))]
+        
+        with patch("main.UPLOAD_DIR", tmp_path), patch("main.get_rag_service") as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.document_service.load_documents.return_value = []
+            mock_service.document_service.split_documents.return_value = []
+            mock_get_service.return_value = mock_service
+            
+            response = api_client.post("/upload", params={"session_id": "test"}, files=files)
+        
+        assert response.status_code == 202
+        saved = list(tmp_path.glob("*/manual.pdf"))
+        assert len(saved) == 1
+        assert saved[0].read_bytes() == content
+
+    def test_accepts_uppercase_extensions(self, api_client, tmp_path):
+        """Should accept file extensions regardless of case."""
+        files = [("files", ("MANUAL.PDF", b"%PDF-1.4", "application/pdf"))]
+        
+        with patch("main.UPLOAD_DIR", tmp_path), patch("main.get_rag_service") as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.document_service.load_documents.return_value = []
+            mock_service.document_service.split_documents.return_value = []
+            mock_get_service.return_value = mock_service
+            
+            response = api_client.post("/upload", params={"session_id": "test"}, files=files)
+        
+        assert response.status_code == 202
+
+    def test_accepts_gzip_encoded_upload(self, api_client, tmp_path):
+        """Should decompress a gzip-encoded multipart body before saving the files."""
+        from src.utils.compression import gzip_chunks
+        content = b"<html><body>" + b"manual text " * 1000 + b"</body></html>"
+        multipart = api_client.build_request(
+            "POST", "/upload", files=[("files", ("manual.html", content, "text/html"))]
+        )
+        request = api_client.build_request(
+            "POST",
+            "/upload",
+            params={"session_id": "test"},
+            content=gzip_chunks(multipart.stream),
+            headers={"Content-Type": multipart.headers["Content-Type"], "Content-Encoding": "gzip"}
+        )
+        
+        with patch("main.UPLOAD_DIR", tmp_path), patch("main.get_rag_service") as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.document_service.load_documents.return_value = []
+            mock_service.document_service.split_documents.return_value = []
+            mock_get_service.return_value = mock_service
+            
+            response = api_client.send(request)
+        
+        assert response.status_code == 202
+        assert list(tmp_path.glob("*/manual.html"))[0].read_bytes() == content
+
+    def test_rejected_upload_creates_no_folder(self, api_client, tmp_path):
+        """Should not create an upload folder when no file is valid."""
+        files = [("files", ("notes.txt", b"content", "text/plain"))]
+        
+        with patch("main.UPLOAD_DIR", tmp_path):
+            response = api_client.post("/upload", params={"session_id": "test"}, files=files)
+        
+        assert response.status_code == 400
+        assert list(tmp_path.iterdir()) == []
+
+
+    def test_indexes_in_background(self, api_client, tmp_path):
+        """Should return a task id and report the indexing outcome on /upload/{task_id}."""
+        files = [("files", ("manual.pdf", b"%PDF-1.4", "application/pdf"))]
+        
+        with patch("main.UPLOAD_DIR", tmp_path), patch("main.get_rag_service") as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.document_service.load_documents.return_value = ["doc"]
+            mock_service.document_service.split_documents.return_value = ["chunk1", "chunk2"]
+            mock_get_service.return_value = mock_service
+            
+            response = api_client.post("/upload", params={"session_id": "test"}, files=files)
+        
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+        
+        # TestClient runs background tasks before returning the response
+        status = api_client.get(f"/upload/{response.json()['task_id']}").json()
+        assert status["status"] == "completed"
+        assert status["documents_indexed"] == 1
+        assert status["total_chunks"] == 2
+        mock_service.vectorstore_service.add_documents.assert_called_once_with(["chunk1", "chunk2"])
+
+    def test_reports_failed_indexing(self, api_client, tmp_path):
+        """Should mark the task as failed when indexing raises."""
+        files = [("files", ("manual.pdf", b"%PDF-1.4", "application/pdf"))]
+        
+        with patch("main.UPLOAD_DIR", tmp_path), patch("main.get_rag_service") as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.document_service.load_documents.side_effect = RuntimeError("bad pdf")
+            mock_get_service.return_value = mock_service
+            
+            response = api_client.post("/upload", params={"session_id": "test"}, files=files)
+        
+        status = api_client.get(f"/upload/{response.json()['task_id']}").json()
+        assert status["status"] == "failed"
+        assert "bad pdf" in status["message"]
+
+
+class TestUploadStatusEndpoint:
+    """Tests for /upload/{task_id} endpoint."""
+
+    def test_unknown_task_returns_404(self, api_client):
+        """Should return 404 for an unknown task id."""
+        response = api_client.get("/upload/nonexistent-task-id")
+        
+        assert response.status_code == 404
+
 
 class TestQuestionEndpoint:
     """Tests for /question endpoint."""
@@ -122,3 +277,101 @@ class TestQuestionEndpoint:
                 assert "answer" in data
                 assert "references" in data
                 assert data["answer"] == "Test answer"
+
+
+class TestQuestionStreamEndpoint:
+    """Tests for /question/stream endpoint."""
+
+    def test_streams_answer_then_references(self, api_client):
+        """Should send answer chunks as SSE data events followed by a references event."""
+        async def chunks():
+            for chunk in ["Test ", "answer"]:
+                yield chunk
+
+        with patch("main.get_rag_service") as mock_get_service:
+            mock_service = MagicMock()
+            mock_service.stream_with_sources.return_value = (["ref1"], chunks())
+            mock_get_service.return_value = mock_service
+            
+            with patch("main.get_llm"):
+                response = api_client.post("/question/stream", json={
+                    "session_id": "test",
+                    "question": "What is RAG?",
+                    "api_key": "fake-key"
+                })
+                
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/event-stream")
+                assert response.text == (
+                    'data: "Test "\n\n'
+                    'data: "answer"\n\n'
+                    'event: references\ndata: ["ref1"]\n\n'
+                )
+
+    def test_keeps_session_open_until_stream_ends(self, api_client):
+        """Should not close a session evicted while its answer is still streaming."""
+        import main
+        service = MagicMock()
+        main._sessions["streaming-session"] = service
+        
+        async def chunks():
+            yield "Test "
+            del main._sessions["streaming-session"]
+            service.close.assert_not_called()
+            yield "answer"
+
+        service.stream_with_sources.return_value = (["ref1"], chunks())
+        with patch("main.get_llm"):
+            response = api_client.post("/question/stream", json={
+                "session_id": "streaming-session",
+                "question": "What is RAG?",
+                "api_key": "fake-key"
+            })
+        
+        assert "event: error" not in response.text
+        service.close.assert_called_once()
+
+    async def test_releases_session_when_client_disconnects_before_reading(self):
+        """Should release the session even if the stream body is never iterated."""
+        import main
+        from starlette.requests import ClientDisconnect
+        service = MagicMock()
+        service.stream_with_sources.return_value = (["ref1"], MagicMock())
+        main._sessions["gone-session"] = service
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("client went away")
+        
+        with patch("main.get_llm"):
+            response = await main.ask_question_stream(main.QuestionRequest(
+                session_id="gone-session",
+                question="What is RAG?",
+                api_key="fake-key"
+            ))
+            
+            assert main._services_in_use == {service: 1}
+            with pytest.raises(ClientDisconnect):
+                await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        
+        assert main._services_in_use == {}
+
+
+class TestLLMCache:
+    """Tests for get_cached_llm."""
+
+    def test_reuses_llm_without_keeping_plaintext_key(self):
+        """Should return the same LLM for the same settings, cached under a hash of the API key."""
+        import main
+        
+        with patch("main.get_llm", side_effect=lambda **kwargs: MagicMock()) as mock_get_llm:
+            first = main.get_cached_llm("groq", "llama-3.1-8b-instant", "secret-key", 0.7)
+            second = main.get_cached_llm("groq", "llama-3.1-8b-instant", "secret-key", 0.7)
+            other = main.get_cached_llm("groq", "llama-3.1-8b-instant", "other-key", 0.7)
+        
+        assert first is second
+        assert other is not first
+        assert mock_get_llm.call_count == 2
+        assert not any("secret-key" in key for key in main._llms._entries)
@@ -1,12 +1,23 @@
 """Integration tests for RAGService."""
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
 from langchain_core.documents import Document
 
 from src.services.rag_service import RAGService
+from src.services.retrieval_service import RetrievalService
 from src.models.config import RAGConfig
 
 
+def _query_result(*contents):
+    """Build the Chroma query() result returning documents with the given contents."""
+    return {
+        "ids": [[f"id{i}" for i in range(len(contents))]],
+        "documents": [list(contents)],
+        "metadatas": [[{} for _ in contents]],
+    }
+
+
 class TestRAGServiceInit:
     """Tests for RAGService initialization."""
 
@@ -70,7 +81,8 @@ class TestAddDocuments:
         """Should add documents after vectorstore is initialized."""
         with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
             mock_vs = MagicMock()
-            mock_vs.add_documents.return_value = ["id1", "id2"]
+            mock_vs.embeddings = rag_service.vectorstore_service.embeddings
+            mock_vs.get.return_value = {"ids": []}
             mock_chroma.return_value = mock_vs
             
             rag_service.initialize_vectorstore()
@@ -86,7 +98,7 @@ class TestAddDocuments:
                     return_value=sample_documents
                 ):
                     rag_service.add_documents(["/fake/path.pdf"])
-                    mock_vs.add_documents.assert_called()
+                    mock_vs._collection.upsert.assert_called()
 
 
 class TestQueryWithSources:
@@ -96,12 +108,8 @@ class TestQueryWithSources:
         """Should return tuple of (answer, references)."""
         with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
             mock_vs = MagicMock()
-            mock_retriever = MagicMock()
-            mock_retriever.invoke.return_value = [
-                Document(page_content="Reference 1", metadata={}),
-                Document(page_content="Reference 2", metadata={})
-            ]
-            mock_vs.as_retriever.return_value = mock_retriever
+            mock_vs.embeddings = rag_service.vectorstore_service.embeddings
+            mock_vs._collection.query.return_value = _query_result("Reference 1", "Reference 2")
             mock_chroma.return_value = mock_vs
             
             rag_service.initialize_vectorstore()
@@ -115,3 +123,180 @@ class TestQueryWithSources:
                 assert isinstance(answer, str)
                 assert isinstance(refs, list)
                 assert len(refs) == 2
+
+
+class TestAnswerCache:
+    """Tests for the answer cache in query_with_sources."""
+
+    def _setup_vectorstore(self, rag_service, mock_chroma):
+        mock_vs = MagicMock()
+        mock_vs.embeddings = rag_service.vectorstore_service.embeddings
+        mock_vs._collection.query.return_value = _query_result("Reference 1")
+        mock_chroma.return_value = mock_vs
+        rag_service.initialize_vectorstore()
+
+    def test_repeated_question_skips_chain(self, rag_service):
+        """Should answer a repeated question from the cache."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            self._setup_vectorstore(rag_service, mock_chroma)
+            
+            with patch("src.services.rag_service.create_rag_chain") as mock_chain:
+                mock_chain.return_value.invoke.return_value = "Test answer"
+                mock_llm = MagicMock()
+                
+                first = rag_service.query_with_sources("What is RAG?", mock_llm)
+                second = rag_service.query_with_sources("  what is rag? ", mock_llm)
+                
+                assert first == second
+                assert mock_chain.return_value.invoke.call_count == 1
+
+    def test_cache_cleared_after_adding_documents(self, rag_service, sample_documents):
+        """Should regenerate answers once new documents are indexed."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            self._setup_vectorstore(rag_service, mock_chroma)
+            
+            with patch("src.services.rag_service.create_rag_chain") as mock_chain:
+                mock_chain.return_value.invoke.return_value = "Test answer"
+                mock_llm = MagicMock()
+                
+                rag_service.query_with_sources("What is RAG?", mock_llm)
+                with patch.object(rag_service.document_service, 'load_documents', return_value=sample_documents):
+                    rag_service.add_documents(["/fake/path.pdf"])
+                rag_service.query_with_sources("What is RAG?", mock_llm)
+                
+                assert mock_chain.return_value.invoke.call_count == 2
+                assert mock_chroma.return_value._collection.query.call_count == 2
+
+    def test_cache_cleared_after_rebuild(self, rag_service):
+        """Should regenerate answers once the vector store is rebuilt."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            self._setup_vectorstore(rag_service, mock_chroma)
+            
+            with patch("src.services.rag_service.create_rag_chain") as mock_chain:
+                mock_chain.return_value.invoke.return_value = "Test answer"
+                mock_llm = MagicMock()
+                
+                rag_service.query_with_sources("What is RAG?", mock_llm)
+                rag_service.initialize_vectorstore(force_rebuild=True)
+                rag_service.query_with_sources("What is RAG?", mock_llm)
+                
+                assert mock_chain.return_value.invoke.call_count == 2
+
+
+class TestChainCache:
+    """Tests for retriever and chain reuse."""
+
+    def test_reuses_chain_for_same_llm(self, rag_service):
+        """Should build the chain once per LLM instance."""
+        with patch("src.services.vectorstore_service.Chroma"):
+            rag_service.initialize_vectorstore()
+            
+            with patch("src.services.rag_service.create_rag_chain") as mock_chain:
+                mock_llm = MagicMock()
+                first = rag_service.get_chain(mock_llm)
+                second = rag_service.get_chain(mock_llm)
+                
+                assert first is second
+                mock_chain.assert_called_once()
+
+    def test_concurrent_access(self, rag_service):
+        """Should keep the chain cache consistent when questions run in parallel threads."""
+        llms = [MagicMock() for _ in range(RAGService.CHAIN_CACHE_SIZE * 2)]
+        
+        with patch("src.services.rag_service.create_rag_chain"):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(rag_service.get_chain, llms * 50))
+        
+        assert len(rag_service._chain_cache) == RAGService.CHAIN_CACHE_SIZE
+
+
+class TestSingleRetrieval:
+    """Tests that query_with_sources retrieves only once."""
+
+    def test_chain_receives_retrieved_context(self, rag_service):
+        """Should pass the retrieved context to the chain instead of a retriever."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.embeddings = rag_service.vectorstore_service.embeddings
+            mock_vs._collection.query.return_value = _query_result("Reference 1", "Reference 2")
+            mock_chroma.return_value = mock_vs
+            rag_service.initialize_vectorstore()
+            
+            with patch("src.services.rag_service.create_rag_chain") as mock_chain:
+                mock_chain.return_value.invoke.return_value = "Test answer"
+                rag_service.query_with_sources("Test question", MagicMock())
+                
+                mock_chain.assert_called_once()
+                assert len(mock_chain.call_args[0]) == 1
+                mock_chain.return_value.invoke.assert_called_once_with({
+                    "context": "Reference 1\n\nReference 2",
+                    "question": "Test question"
+                })
+                mock_vs._collection.query.assert_called_once()
+
+
+class TestContextOrder:
+    """Tests for the order of the retrieved chunks in the prompt context."""
+
+    def test_keeps_rank_order_by_default(self):
+        """Should send the chunks in rank order unless stable_context_order is set."""
+        service = RAGService(RAGConfig(rerank=False))
+        
+        assert service._format_context(["b", "a"]) == "b\n\na"
+
+    def test_stable_order_sorts_chunks(self):
+        """Should sort the chunks when stable_context_order is set."""
+        service = RAGService(RAGConfig(stable_context_order=True, rerank=False))
+        
+        assert service._format_context(["b", "a"]) == "a\n\nb"
+
+    def test_keeps_reranked_order(self):
+        """Should keep the reranked order even with stable_context_order set."""
+        service = RAGService(RAGConfig(stable_context_order=True, rerank=True))
+        
+        assert service._format_context(["b", "a"]) == "b\n\na"
+
+
+class TestStreamWithSources:
+    """Tests for streaming answers with stream_with_sources."""
+
+    async def test_streams_chunks_and_caches_answer(self, rag_service):
+        """Should yield the answer in chunks and cache the complete answer."""
+        async def fake_astream(inputs):
+            for chunk in ["Test ", "answer"]:
+                yield chunk
+
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.embeddings = rag_service.vectorstore_service.embeddings
+            mock_vs._collection.query.return_value = _query_result("Reference 1")
+            mock_chroma.return_value = mock_vs
+            rag_service.initialize_vectorstore()
+            
+            with patch("src.services.rag_service.create_rag_chain") as mock_chain:
+                mock_chain.return_value.astream.side_effect = fake_astream
+                mock_llm = MagicMock()
+                
+                references, chunks = rag_service.stream_with_sources("What is RAG?", mock_llm)
+                streamed = [chunk async for chunk in chunks]
+                
+                assert references == ["Reference 1"]
+                assert streamed == ["Test ", "answer"]
+                assert rag_service.query_with_sources("What is RAG?", mock_llm) == ("Test answer", ["Reference 1"])
+                mock_chain.return_value.invoke.assert_not_called()
+
+
+class TestMMRRetrieval:
+    """Tests for MMR retrieval in RAGService."""
+
+    def test_mmr_strategy_uses_retrieval_service(self, mock_embeddings):
+        """Should retrieve through RetrievalService when the strategy is MMR."""
+        service = RAGService(RAGConfig(retrieval_strategy="mmr", retrieval_k=2))
+        with patch("src.services.vectorstore_service.Chroma"):
+            service.initialize_vectorstore()
+            
+            with patch.object(RetrievalService, "retrieve", return_value=[Document(page_content="Reference 1")]) as mock_retrieve:
+                references = service.retrieve_references("Test question")
+            
+            mock_retrieve.assert_called_once_with("Test question", strategy="mmr", k=2, rerank=False)
+            assert references == ["Reference 1"]
@@ -0,0 +1,144 @@
+"""Tests for the cache utilities."""
+import threading
+
+import pytest
+from unittest.mock import patch
+
+from src.utils.cache import LRUTTLCache, SemanticCache
+
+
+class TestSemanticCache:
+    """Tests for the semantic answer cache."""
+
+    def test_exact_hit_ignores_case_and_whitespace(self):
+        """Should match normalized text."""
+        cache = SemanticCache()
+        cache.set("model", "What is RAG?", "answer")
+        
+        assert cache.get("model", "  what is   RAG? ") == "answer"
+
+    def test_namespaces_are_isolated(self):
+        """Should not return values stored under another namespace."""
+        cache = SemanticCache()
+        cache.set("model-a", "What is RAG?", "answer")
+        
+        assert cache.get("model-b", "What is RAG?") is None
+
+    def test_semantic_hit_above_threshold(self):
+        """Should return the entry of a similar embedding."""
+        cache = SemanticCache(threshold=0.9)
+        cache.set("model", "What is RAG?", "answer", embedding=[1.0, 0.0])
+        
+        assert cache.get("model", "Explain RAG", embedding=[0.99, 0.14]) == "answer"
+        assert cache.get("model", "Unrelated", embedding=[0.0, 1.0]) is None
+
+    def test_evicts_least_recently_used(self):
+        """Should evict the oldest entry once maxsize is exceeded."""
+        cache = SemanticCache(maxsize=2)
+        cache.set("model", "a", 1)
+        cache.set("model", "b", 2)
+        cache.get("model", "a")
+        cache.set("model", "c", 3)
+        
+        assert len(cache) == 2
+        assert cache.get("model", "b") is None
+        assert cache.get("model", "a") == 1
+
+    def test_zero_maxsize_disables_cache(self):
+        """Should not store anything when maxsize is 0."""
+        cache = SemanticCache(maxsize=0)
+        cache.set("model", "a", 1)
+        
+        assert cache.get("model", "a") is None
+
+
+    def test_expires_entries_after_ttl(self):
+        """Should drop entries stored longer than the ttl ago, even if they were read."""
+        cache = SemanticCache(ttl=10)
+        with patch("src.utils.cache.time.monotonic", return_value=100.0):
+            cache.set("model", "What is RAG?", "answer", embedding=[1.0, 0.0])
+        
+        with patch("src.utils.cache.time.monotonic", return_value=105.0):
+            assert cache.get("model", "What is RAG?") == "answer"
+        with patch("src.utils.cache.time.monotonic", return_value=110.0):
+            assert cache.get("model", "What is RAG?") is None
+            assert cache.get("model", "Explain RAG", embedding=[1.0, 0.0]) is None
+        assert len(cache) == 0
+
+    def test_expired_entries_are_skipped_by_semantic_lookup(self):
+        """Should not return an expired entry for a similar embedding."""
+        cache = SemanticCache(threshold=0.9, ttl=10)
+        with patch("src.utils.cache.time.monotonic", return_value=100.0):
+            cache.set("model", "What is RAG?", "answer", embedding=[1.0, 0.0])
+        
+        with patch("src.utils.cache.time.monotonic", return_value=111.0):
+            assert cache.get_similar("model", [0.99, 0.14]) is None
+
+
+    def test_concurrent_access(self):
+        """Should stay consistent when threads read, write, expire and clear at the same time."""
+        cache = SemanticCache(maxsize=32, threshold=0.5, ttl=0.001)
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(300):
+                    embedding = [1.0, (i % 7) / 7]
+                    cache.set("model", f"q{n}-{i}", i, embedding=embedding)
+                    cache.get("model", f"q{n}-{i - 1}", embedding=embedding)
+                    if i % 50 == 0:
+                        cache.clear()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert len(cache) <= 32
+
+
+class TestLRUTTLCache:
+    """Tests for the LRU + idle TTL cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Should evict the least recently used entry and report it."""
+        evicted = []
+        cache = LRUTTLCache(maxsize=2, ttl=0, on_evict=lambda key, value: evicted.append(key))
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.get("a")
+        cache["c"] = 3
+        
+        assert evicted == ["b"]
+        assert "a" in cache and "c" in cache
+
+    def test_expires_idle_entries(self):
+        """Should evict entries unused for longer than the ttl."""
+        evicted = []
+        cache = LRUTTLCache(maxsize=0, ttl=10, on_evict=lambda key, value: evicted.append(value))
+        with patch("src.utils.cache.time.monotonic", return_value=100.0):
+            cache["a"] = 1
+        with patch("src.utils.cache.time.monotonic", return_value=105.0):
+            cache["b"] = 2
+        
+        with patch("src.utils.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+            assert cache.get("b") == 2
+        
+        assert evicted == [1]
+
+    def test_delete_calls_on_evict(self):
+        """Should release explicitly deleted entries."""
+        evicted = []
+        cache = LRUTTLCache(on_evict=lambda key, value: evicted.append(key))
+        cache["a"] = 1
+        
+        del cache["a"]
+        
+        assert evicted == ["a"]
+        with pytest.raises(KeyError):
+            cache["a"]
@@ -0,0 +1,103 @@
+"""Tests for gzip request compression."""
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from src.utils.compression import GZipRequestMiddleware, gzip_chunks, is_compressed
+
+
+@pytest.fixture
+def echo_client():
+    """Client for an app that echoes the request body and headers back."""
+    app = FastAPI()
+    app.add_middleware(GZipRequestMiddleware)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {
+            "body": (await request.body()).decode(),
+            "content_encoding": request.headers.get("content-encoding")
+        }
+
+    return TestClient(app)
+
+
+class TestGzipChunks:
+    """Tests for gzip_chunks."""
+
+    def test_round_trips(self):
+        """Should produce a gzip stream of the concatenated chunks."""
+        chunks = [b"<html>", b"hello " * 1000, b"</html>"]
+
+        body = b"".join(gzip_chunks(chunks))
+
+        assert gzip.decompress(body) == b"".join(chunks)
+        assert len(body) < len(b"".join(chunks))
+
+
+class TestIsCompressed:
+    """Tests for is_compressed."""
+
+    @pytest.mark.parametrize("head", [b"%PDF", b"\x1f\x8b\x08\x00", b"PK\x03\x04"])
+    def test_detects_compressed_formats(self, head):
+        """Should detect PDF, gzip and zip content."""
+        assert is_compressed(head)
+
+    def test_text_is_not_compressed(self):
+        """Should not flag HTML as compressed."""
+        assert not is_compressed(b"<!DO")
+
+
+class TestGZipRequestMiddleware:
+    """Tests for GZipRequestMiddleware."""
+
+    def test_decompresses_gzip_body(self, echo_client):
+        """Should hand the decompressed body to the app without the encoding header."""
+        response = echo_client.post(
+            "/echo",
+            content=gzip.compress(b"hello world"),
+            headers={"Content-Encoding": "gzip"}
+        )
+
+        assert response.json() == {"body": "hello world", "content_encoding": None}
+
+    def test_decompresses_streamed_body(self, echo_client):
+        """Should decompress a chunked body as it is received."""
+        response = echo_client.post(
+            "/echo",
+            content=gzip_chunks(iter([b"hello ", b"world"])),
+            headers={"Content-Encoding": "gzip"}
+        )
+
+        assert response.json()["body"] == "hello world"
+
+    def test_passes_plain_body_through(self, echo_client):
+        """Should leave requests without Content-Encoding unchanged."""
+        response = echo_client.post("/echo", content=b"hello world")
+
+        assert response.json()["body"] == "hello world"
+
+    def test_rejects_invalid_gzip(self, echo_client):
+        """Should respond 400 to a body that is not valid gzip."""
+        response = echo_client.post("/echo", content=b"not gzip", headers={"Content-Encoding": "gzip"})
+
+        assert response.status_code == 400
+
+    def test_rejects_body_over_size_limit(self):
+        """Should respond 413 to a gzip body that decompresses past max_body_size."""
+        app = FastAPI()
+        app.add_middleware(GZipRequestMiddleware, max_body_size=1024 * 1024)
+
+        @app.post("/echo")
+        async def echo(request: Request):
+            return {"size": len(await request.body())}
+
+        response = TestClient(app).post(
+            "/echo",
+            content=gzip.compress(b"\0" * (8 * 1024 * 1024)),
+            headers={"Content-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 413
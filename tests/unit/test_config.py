@@ -1,5 +1,7 @@
 """Tests for RAGConfig."""
 import pytest
+import torch
+from unittest.mock import patch
 from src.models.config import RAGConfig
 
 
@@ -45,3 +47,50 @@ class TestRAGConfig:
         config = RAGConfig()
         
         assert config.encode_kwargs.get("normalize_embeddings") is True
+
+    def test_encode_kwargs_batch_size(self):
+        """Encode kwargs should batch chunks using embed_batch_size."""
+        config = RAGConfig(embed_batch_size=64)
+        
+        assert config.encode_kwargs.get("batch_size") == 64
+
+    def test_half_precision_on_cuda(self):
+        """Should load the embedding model in FP16 on CUDA without BF16 support."""
+        with patch("torch.cuda.is_bf16_supported", return_value=False):
+            config = RAGConfig(model_kwargs={"device": "cuda"})
+        
+        assert config.model_kwargs["model_kwargs"]["torch_dtype"] == torch.float16
+
+    def test_bfloat16_when_supported(self):
+        """Should prefer BF16 on GPUs that support it."""
+        with patch("torch.cuda.is_available", return_value=True), \
+             patch("torch.cuda.is_bf16_supported", return_value=True):
+            config = RAGConfig(model_kwargs={"device": "cuda"})
+        
+        assert config.model_kwargs["model_kwargs"]["torch_dtype"] == torch.bfloat16
+
+    def test_default_batch_size_depends_on_device(self):
+        """Should default to batches of 32 on CUDA and 8 on CPU."""
+        assert RAGConfig(model_kwargs={"device": "cuda"}).encode_kwargs["batch_size"] == 32
+        assert RAGConfig(model_kwargs={"device": "cpu"}).encode_kwargs["batch_size"] == 8
+
+    def test_full_precision_on_cpu(self):
+        """Should keep the default dtype on CPU."""
+        config = RAGConfig(model_kwargs={"device": "cpu"})
+        
+        assert "model_kwargs" not in config.model_kwargs
+
+    def test_does_not_mutate_caller_dicts(self):
+        """Should fill in defaults on copies of the kwargs dicts it was given."""
+        encode_kwargs = {"normalize_embeddings": True}
+        inner_kwargs = {"attn_implementation": "sdpa"}
+        model_kwargs = {"device": "cuda", "model_kwargs": inner_kwargs}
+        
+        with patch("torch.cuda.is_bf16_supported", return_value=False):
+            config = RAGConfig(model_kwargs=model_kwargs, encode_kwargs=encode_kwargs)
+        
+        assert config.encode_kwargs["batch_size"] == 32
+        assert config.model_kwargs["model_kwargs"]["torch_dtype"] == torch.float16
+        assert encode_kwargs == {"normalize_embeddings": True}
+        assert model_kwargs == {"device": "cuda", "model_kwargs": inner_kwargs}
+        assert inner_kwargs == {"attn_implementation": "sdpa"}
@@ -3,7 +3,46 @@ import pytest
 from unittest.mock import patch, MagicMock
 from langchain_core.documents import Document
 
-from src.services.document_service import DocumentService
+from src.services.document_service import DocumentService, get_text_splitter
+
+
+def _minimal_pdf(text: str) -> bytes:
+    """Build a one-page PDF showing the given text, with a valid xref table."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+@pytest.fixture(scope="session")
+def tiny_pdf(tmp_path_factory):
+    """Path of a real one-page PDF, written once per session."""
+    path = tmp_path_factory.mktemp("docs") / "manual.pdf"
+    path.write_bytes(_minimal_pdf("Hydraulic filter manual"))
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def tiny_html(tmp_path_factory):
+    """Path of a real HTML page, written once per session."""
+    path = tmp_path_factory.mktemp("docs") / "manual.html"
+    path.write_text("<html><head><title>Manual</title></head><body><p>Replace the filter.</p></body></html>")
+    return str(path)
 
 
 class TestDocumentServiceInit:
@@ -18,17 +57,15 @@ class TestDocumentServiceInit:
 class TestLoadDocuments:
     """Tests for load_documents method."""
 
-    def test_accepts_single_path(self, document_service):
+    def test_accepts_single_path(self, document_service, tiny_pdf):
         """Should accept a single path string."""
-        with patch.object(document_service, 'load_pdf_document', return_value=[]):
-            result = document_service.load_documents("/fake/path.pdf")
-            assert isinstance(result, list)
+        result = document_service.load_documents(tiny_pdf)
+        assert len(result) == 1
 
-    def test_accepts_list_of_paths(self, document_service):
+    def test_accepts_list_of_paths(self, document_service, tiny_pdf, tiny_html):
         """Should accept a list of paths."""
-        with patch.object(document_service, 'load_pdf_document', return_value=[]):
-            result = document_service.load_documents(["/fake/path1.pdf", "/fake/path2.pdf"])
-            assert isinstance(result, list)
+        result = document_service.load_documents([tiny_pdf, tiny_html])
+        assert [doc.metadata["source"] for doc in result] == [tiny_pdf, tiny_html]
 
     def test_handles_nonexistent_file(self, document_service):
         """Should log error and return empty for nonexistent files."""
@@ -40,19 +77,20 @@ class TestLoadDocuments:
         result = document_service.load_documents(["/some/file.txt", "/some/file.docx"])
         assert result == []
 
-    def test_loads_pdf_files(self, document_service):
-        """Should call load_pdf_document for PDF files."""
-        mock_doc = Document(page_content="test", metadata={})
-        with patch.object(document_service, 'load_pdf_document', return_value=[mock_doc]) as mock:
-            result = document_service.load_documents(["/fake/test.pdf"])
-            mock.assert_called_once_with("/fake/test.pdf")
+    def test_loads_pdf_files(self, document_service, tiny_pdf):
+        """Should load one document per PDF page with its text."""
+        result = document_service.load_documents([tiny_pdf])
+        
+        assert len(result) == 1
+        assert result[0].page_content == "Hydraulic filter manual"
+        assert result[0].metadata["source"] == tiny_pdf
 
-    def test_loads_html_files(self, document_service):
-        """Should call load_html_document for HTML files."""
-        mock_doc = Document(page_content="test", metadata={})
-        with patch.object(document_service, 'load_html_document', return_value=[mock_doc]) as mock:
-            result = document_service.load_documents(["/fake/test.html"])
-            mock.assert_called_once()
+    def test_loads_html_files(self, document_service, tiny_html):
+        """Should load the text of HTML files."""
+        result = document_service.load_documents([tiny_html])
+        
+        assert len(result) == 1
+        assert "Replace the filter." in result[0].page_content
 
 
 class TestSplitDocuments:
@@ -63,11 +101,17 @@ class TestSplitDocuments:
         result = document_service.split_documents([])
         assert result == []
 
-    def test_splits_long_document(self, document_service):
-        """Should split documents longer than chunk_size."""
-        long_doc = Document(page_content="A" * 2000, metadata={"source": "test"})
-        result = document_service.split_documents([long_doc], chunk_size=500, chunk_overlap=50)
+    @pytest.mark.parametrize("content,chunk_size,chunk_overlap,max_length", [
+        ("A" * 2000, 500, 50, 500),
+        ("Word " * 500, 100, 10, 150),  # Allow some flexibility due to splitter behavior
+    ])
+    def test_splits_long_document(self, document_service, content, chunk_size, chunk_overlap, max_length):
+        """Should split documents longer than chunk_size into chunks of about chunk_size."""
+        long_doc = Document(page_content=content, metadata={"source": "test"})
+        result = document_service.split_documents([long_doc], chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        
         assert len(result) > 1
+        assert all(len(chunk.page_content) <= max_length for chunk in result)
 
     def test_preserves_short_document(self, document_service):
         """Should not split documents shorter than chunk_size."""
@@ -75,18 +119,49 @@ class TestSplitDocuments:
         result = document_service.split_documents([short_doc], chunk_size=500)
         assert len(result) == 1
 
-    def test_respects_chunk_size(self, document_service):
-        """Chunks should not exceed chunk_size significantly."""
-        long_doc = Document(page_content="Word " * 500, metadata={"source": "test"})
-        result = document_service.split_documents([long_doc], chunk_size=100, chunk_overlap=10)
-        
-        for chunk in result:
-            # Allow some flexibility due to splitter behavior
-            assert len(chunk.page_content) <= 150
-
     def test_uses_default_parameters(self, document_service):
         """Should use default chunk_size and overlap."""
         doc = Document(page_content="Test content", metadata={})
         # Should not raise with defaults
         result = document_service.split_documents([doc])
         assert isinstance(result, list)
+
+
+class TestParallelLoading:
+    """Tests for concurrent loading of multiple files."""
+
+    def test_preserves_file_order(self):
+        """Should return documents in the order of the input paths."""
+        service = DocumentService(max_workers=4)
+        paths = [f"/fake/doc{i}.pdf" for i in range(8)]
+        
+        def fake_load(path):
+            return [Document(page_content=path, metadata={})]
+        
+        with patch.object(service, 'load_pdf_document', side_effect=fake_load):
+            result = service.load_documents(paths)
+        
+        assert [doc.page_content for doc in result] == paths
+
+    def test_failed_file_does_not_stop_batch(self):
+        """Should skip files that fail to load and keep the others."""
+        service = DocumentService(max_workers=4)
+        
+        def fake_load(path):
+            if "bad" in path:
+                raise ValueError("corrupt file")
+            return [Document(page_content=path, metadata={})]
+        
+        with patch.object(service, 'load_pdf_document', side_effect=fake_load):
+            result = service.load_documents(["/fake/good.pdf", "/fake/bad.pdf", "/fake/good2.pdf"])
+        
+        assert [doc.page_content for doc in result] == ["/fake/good.pdf", "/fake/good2.pdf"]
+
+
+class TestTextSplitterCache:
+    """Tests for splitter reuse."""
+
+    def test_reuses_splitter_for_same_settings(self):
+        """Should return the same splitter for the same chunk settings."""
+        assert get_text_splitter(500, 50) is get_text_splitter(500, 50)
+        assert get_text_splitter(500, 50) is not get_text_splitter(400, 50)
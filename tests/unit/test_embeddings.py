@@ -0,0 +1,353 @@
+"""Tests for get_embeddings."""
+import json
+import numpy as np
+import pytest
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from src.utils import embeddings as embeddings_module
+from src.utils.embeddings import (
+    get_embeddings, cache_document_embeddings, embedding_cache_namespace, QueryBatchingEmbeddings, OnnxEmbeddings,
+    _mean_pool
+)
+
+
+def _save_sentence_transformer_config(model_dir, pooling_mode="mean"):
+    """Write the module and pooling configs of a saved sentence-transformers model."""
+    modules = [
+        {"idx": 0, "name": "0", "path": "", "type": "sentence_transformers.models.Transformer"},
+        {"idx": 1, "name": "1", "path": "1_Pooling", "type": "sentence_transformers.models.Pooling"},
+    ]
+    (model_dir / "modules.json").write_text(json.dumps(modules))
+    (model_dir / "1_Pooling").mkdir()
+    (model_dir / "1_Pooling" / "config.json").write_text(json.dumps({
+        "pooling_mode_mean_tokens": pooling_mode == "mean",
+        "pooling_mode_cls_token": pooling_mode == "cls",
+    }))
+
+
+@pytest.fixture(autouse=True)
+def clear_embeddings_cache():
+    """Start every test with no loaded models and without the optional ONNX backend."""
+    embeddings_module._embeddings_cache.clear()
+    with patch("src.utils.embeddings._onnx_available", return_value=False):
+        yield
+    embeddings_module._embeddings_cache.clear()
+
+
+class TestGetEmbeddings:
+    """Tests for the shared embedding model factory."""
+
+    def test_reuses_loaded_model(self):
+        """Should load a model only once for the same settings."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf:
+            first = get_embeddings("test-model", {"device": "cpu"}, {"normalize_embeddings": True})
+            second = get_embeddings("test-model", {"device": "cpu"}, {"normalize_embeddings": True})
+            
+            assert first is second
+            mock_hf.assert_called_once()
+
+    def test_uses_quantized_onnx_on_cpu(self, tmp_path):
+        """Should load the int8 ONNX export on CPU when the ONNX backend is installed."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch("src.utils.embeddings._onnx_available", return_value=True), \
+             patch("src.utils.embeddings._export_quantized_onnx", return_value=tmp_path):
+            get_embeddings("test-model", {"device": "cpu"})
+            
+            kwargs = mock_hf.call_args.kwargs
+            assert kwargs["model_name"] == str(tmp_path)
+            assert kwargs["model_kwargs"]["backend"] == "onnx"
+            assert kwargs["model_kwargs"]["model_kwargs"]["file_name"] == embeddings_module.ONNX_QUANTIZED_FILE
+
+    def test_falls_back_to_pytorch_when_export_fails(self):
+        """Should load the PyTorch model if the ONNX export fails."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch("src.utils.embeddings._onnx_available", return_value=True), \
+             patch("src.utils.embeddings._export_quantized_onnx", side_effect=RuntimeError("no network")):
+            get_embeddings("test-model", {"device": "cpu"})
+            
+            mock_hf.assert_called_once_with(
+                model_name="test-model",
+                model_kwargs={"device": "cpu"},
+                encode_kwargs={"normalize_embeddings": True, "batch_size": 8}
+            )
+
+    def test_different_settings_load_separately(self):
+        """Should load a separate model for different settings."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf:
+            get_embeddings("test-model", {"device": "cpu"})
+            get_embeddings("other-model", {"device": "cpu"})
+            
+            assert mock_hf.call_count == 2
+
+    def test_skips_normalization_when_disabled(self):
+        """Should not normalize embeddings by default when normalize is False."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf:
+            get_embeddings("test-model", {"device": "cpu"}, normalize=False)
+            
+            assert mock_hf.call_args.kwargs["encode_kwargs"] == {"normalize_embeddings": False, "batch_size": 8}
+
+    def test_keeps_most_recently_used_models(self):
+        """Should drop the least recently requested model beyond the registry size."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch.object(embeddings_module._embeddings_cache, "maxsize", 1):
+            get_embeddings("test-model", {"device": "cpu"})
+            get_embeddings("other-model", {"device": "cpu"})
+            get_embeddings("test-model", {"device": "cpu"})
+            
+            assert mock_hf.call_count == 3
+
+    def test_forgets_idle_models(self):
+        """Should reload a model not requested for longer than the idle timeout."""
+        now = [0.0]
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch.object(embeddings_module._embeddings_cache, "ttl", 60), \
+             patch("src.utils.cache.time.monotonic", side_effect=lambda: now[0]):
+            for now[0] in (0.0, 30.0, 100.0):
+                get_embeddings("test-model", {"device": "cpu"})
+            
+            assert mock_hf.call_count == 2
+
+
+    def test_uses_numpy_pooled_onnx_for_mean_pooling_models(self, tmp_path):
+        """Should run a mean-pooling model with OnnxEmbeddings instead of sentence-transformers."""
+        _save_sentence_transformer_config(tmp_path)
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch("src.utils.embeddings.OnnxEmbeddings") as mock_onnx, \
+             patch("src.utils.embeddings._onnx_available", return_value=True), \
+             patch("src.utils.embeddings._export_quantized_onnx", return_value=tmp_path):
+            embeddings = get_embeddings("test-model", {"device": "cpu"})
+            
+            assert embeddings is mock_onnx.return_value
+            mock_onnx.assert_called_once_with(tmp_path, batch_size=8, normalize=True, token_cache_size=0)
+            mock_hf.assert_not_called()
+
+    def test_keeps_sentence_transformers_for_other_pooling(self, tmp_path):
+        """Should run models with other pooling modes through sentence-transformers."""
+        _save_sentence_transformer_config(tmp_path, pooling_mode="cls")
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch("src.utils.embeddings.OnnxEmbeddings") as mock_onnx, \
+             patch("src.utils.embeddings._onnx_available", return_value=True), \
+             patch("src.utils.embeddings._export_quantized_onnx", return_value=tmp_path):
+            get_embeddings("test-model", {"device": "cpu"})
+            
+            mock_onnx.assert_not_called()
+            assert mock_hf.call_args.kwargs["model_kwargs"]["backend"] == "onnx"
+
+
+class TestTorchCompile:
+    """Tests for compiling the CUDA encoder with torch.compile."""
+
+    def test_compiles_and_warms_up_on_cuda(self):
+        """Should compile the transformer and run a warmup encode when enabled on CUDA."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch("src.utils.embeddings.TORCH_COMPILE", True):
+            get_embeddings("test-model", {"device": "cuda"})
+            
+            client = mock_hf.return_value._client
+            client[0].auto_model.compile.assert_called_once_with(mode="reduce-overhead", dynamic=True)
+            client.encode.assert_called_once()
+
+    def test_keeps_eager_model_when_compile_fails(self):
+        """Should return the eager model if compilation fails."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch("src.utils.embeddings.TORCH_COMPILE", True):
+            mock_hf.return_value._client.encode.side_effect = RuntimeError("inductor error")
+            
+            embeddings = get_embeddings("test-model", {"device": "cuda"})
+            
+            assert embeddings is mock_hf.return_value
+            assert mock_hf.return_value._client[0].auto_model._compiled_call_impl is None
+
+    def test_not_compiled_on_cpu(self):
+        """Should not compile CPU models."""
+        with patch("src.utils.embeddings.HuggingFaceEmbeddings") as mock_hf, \
+             patch("src.utils.embeddings.TORCH_COMPILE", True):
+            get_embeddings("test-model", {"device": "cpu"})
+            
+            mock_hf.return_value._client[0].auto_model.compile.assert_not_called()
+
+
+class TestOnnxEmbeddings:
+    """Tests for the numpy-pooled ONNX encoder."""
+
+    def test_mean_pool_matches_reference(self):
+        """Should average the unmasked token embeddings and normalize them."""
+        rng = np.random.default_rng(0)
+        tokens = rng.normal(size=(2, 4, 3)).astype(np.float32)
+        mask = np.array([[1, 1, 0, 0], [1, 1, 1, 1]])
+        
+        pooled = _mean_pool(tokens, mask)
+        
+        expected = np.stack([tokens[0, :2].mean(axis=0), tokens[1].mean(axis=0)])
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+        np.testing.assert_allclose(pooled, expected, rtol=1e-5)
+
+    def _embeddings(self, tmp_path, **kwargs):
+        """Build OnnxEmbeddings over a fake character-level tokenizer and ONNX session."""
+        def tokenize(texts, **kwargs):
+            return {
+                "input_ids": [[7] * len(text) for text in texts],
+                "attention_mask": [[1] * len(text) for text in texts],
+                "token_type_ids": [[0] * len(text) for text in texts],
+            }
+
+        def pad(features, return_tensors):
+            width = max(len(feature["input_ids"]) for feature in features)
+            return {
+                name: np.array([feature[name] + [0] * (width - len(feature[name])) for feature in features])
+                for name in features[0]
+            }
+
+        def run(output_names, inputs):
+            # Token embedding = [1, sequence length], so each pooled vector encodes its text's length
+            lengths = inputs["attention_mask"].sum(axis=1, keepdims=True).astype(np.float32)
+            tokens = np.ones(inputs["attention_mask"].shape + (2,), dtype=np.float32)
+            tokens[..., 1] = lengths
+            return [tokens]
+
+        session = MagicMock()
+        session.get_inputs.return_value = [MagicMock(), MagicMock()]
+        session.get_inputs.return_value[0].name = "input_ids"
+        session.get_inputs.return_value[1].name = "attention_mask"
+        session.run.side_effect = run
+        tokenizer = MagicMock(side_effect=tokenize)
+        tokenizer.pad.side_effect = pad
+        with patch("transformers.AutoTokenizer.from_pretrained", return_value=tokenizer), \
+             patch("onnxruntime.InferenceSession", return_value=session):
+            return OnnxEmbeddings(tmp_path, normalize=False, **kwargs), tokenizer, session
+
+    def test_embeds_in_input_order(self, tmp_path):
+        """Should tokenize once, encode texts grouped by token count and return embeddings in input order."""
+        embeddings, tokenizer, session = self._embeddings(tmp_path, batch_size=2)
+        
+        vectors = embeddings.embed_documents(["a", "abc", "ab"])
+        
+        assert vectors == [[1.0, 1.0], [1.0, 3.0], [1.0, 2.0]]
+        tokenizer.assert_called_once()
+        assert [len(c.args[0]) for c in tokenizer.pad.call_args_list] == [2, 1]
+        assert set(session.run.call_args.args[1]) == {"input_ids", "attention_mask"}
+
+    def test_reuses_cached_tokens(self, tmp_path):
+        """Should only tokenize texts that are not in the token cache."""
+        embeddings, tokenizer, _ = self._embeddings(tmp_path, token_cache_size=8)
+        
+        embeddings.embed_documents(["a", "abc"])
+        vectors = embeddings.embed_documents(["abc", "abcd"])
+        
+        assert vectors == [[1.0, 3.0], [1.0, 4.0]]
+        assert tokenizer.call_args.args[0] == ["abcd"]
+
+
+class TestQueryBatchingEmbeddings:
+    """Tests for the query micro-batching wrapper."""
+
+    def test_caches_repeated_queries(self):
+        """Should embed a repeated query only once."""
+        inner = MagicMock()
+        inner.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        embeddings = QueryBatchingEmbeddings(inner, batch_window=0)
+        
+        assert embeddings.embed_query("abc") == [3.0]
+        assert embeddings.embed_query("abc") == [3.0]
+        inner.embed_documents.assert_called_once_with(["abc"])
+
+    def test_batches_concurrent_queries(self):
+        """Should embed queries arriving within the window in one call."""
+        inner = MagicMock()
+        inner.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        embeddings = QueryBatchingEmbeddings(inner, batch_window=0.5, max_batch_size=4)
+        texts = ["a", "bb", "ccc", "dddd"]
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(embeddings.embed_query, texts))
+        
+        assert results == [[1.0], [2.0], [3.0], [4.0]]
+        assert inner.embed_documents.call_count == 1
+
+    def test_propagates_errors(self):
+        """Should raise the embedding error in the calling thread."""
+        inner = MagicMock()
+        inner.embed_documents.side_effect = RuntimeError("CUDA out of memory")
+        embeddings = QueryBatchingEmbeddings(inner, batch_window=0)
+        
+        with pytest.raises(RuntimeError, match="out of memory"):
+            embeddings.embed_query("abc")
+
+    def test_documents_pass_through(self):
+        """Should embed documents directly with the wrapped instance."""
+        inner = MagicMock()
+        inner.embed_documents.return_value = [[0.1], [0.2]]
+        embeddings = QueryBatchingEmbeddings(inner)
+        
+        assert embeddings.embed_documents(["a", "b"]) == [[0.1], [0.2]]
+
+
+class TestDocumentEmbeddingCache:
+    """Tests for the persistent document embedding cache."""
+
+    def test_reuses_cached_document_embeddings(self, tmp_path):
+        """Should embed a chunk only once across wrapper instances sharing the store."""
+        inner = MagicMock()
+        inner.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        
+        first = cache_document_embeddings(inner, tmp_path, namespace="test-model")
+        second = cache_document_embeddings(inner, tmp_path, namespace="test-model")
+        
+        assert first.embed_documents(["chunk one", "chunk"]) == [[9.0], [5.0]]
+        assert second.embed_documents(["chunk", "new"]) == [[5.0], [3.0]]
+        assert inner.embed_documents.call_args_list[1].args[0] == ["new"]
+
+    def test_namespaces_are_isolated(self, tmp_path):
+        """Should not share embeddings between models."""
+        inner = MagicMock()
+        inner.embed_documents.side_effect = lambda texts: [[1.0] for _ in texts]
+        
+        cache_document_embeddings(inner, tmp_path, namespace="model-a").embed_documents(["chunk"])
+        cache_document_embeddings(inner, tmp_path, namespace="model-b").embed_documents(["chunk"])
+        
+        assert inner.embed_documents.call_count == 2
+
+    def test_quantized_cache_round_trip(self, tmp_path):
+        """Should read back int8-quantized vectors close to the original ones."""
+        inner = MagicMock()
+        inner.embed_documents.side_effect = lambda texts: [[0.6, -0.8, 0.0] for _ in texts]
+        
+        cache_document_embeddings(inner, tmp_path, namespace="test-model", quantize=True).embed_documents(["chunk"])
+        cached = cache_document_embeddings(inner, tmp_path, namespace="test-model", quantize=True).embed_documents(["chunk"])
+        
+        assert inner.embed_documents.call_count == 1
+        assert cached[0] == pytest.approx([0.6, -0.8, 0.0], abs=1e-2)
+        assert all(path.stat().st_size == 4 + 3 for path in tmp_path.rglob("*") if path.is_file())
+
+    def test_quantized_cache_returns_same_vector_on_miss_and_hit(self, tmp_path):
+        """Should return the dequantized vector for a new chunk, as later reads do."""
+        inner = MagicMock()
+        inner.embed_documents.side_effect = lambda texts: [[0.61, -0.8, 0.013] for _ in texts]
+        
+        missed = cache_document_embeddings(inner, tmp_path, namespace="test-model", quantize=True).embed_documents(["chunk"])
+        hit = cache_document_embeddings(inner, tmp_path, namespace="test-model", quantize=True).embed_documents(["chunk"])
+        
+        assert inner.embed_documents.call_count == 1
+        assert missed == hit
+        assert missed[0] != [0.61, -0.8, 0.013]
+
+    def test_namespace_tells_encoders_apart(self):
+        """Should give encoders differing in normalization, dtype or backend their own namespace."""
+        def encoder(model_kwargs, normalize=True):
+            embeddings = MagicMock(spec=HuggingFaceEmbeddings)
+            embeddings.model_kwargs = model_kwargs
+            embeddings.encode_kwargs = {"normalize_embeddings": normalize}
+            return embeddings
+
+        namespaces = {
+            embedding_cache_namespace(encoder({"device": "cpu"}), "model"),
+            embedding_cache_namespace(encoder({"device": "cpu"}, normalize=False), "model"),
+            embedding_cache_namespace(encoder({"device": "cuda", "model_kwargs": {"torch_dtype": torch.bfloat16}}), "model"),
+            embedding_cache_namespace(encoder({"device": "cpu", "backend": "onnx"}), "model"),
+        }
+        
+        assert len(namespaces) == 4
+        assert embedding_cache_namespace(encoder({"device": "cpu"}), "model") == "model.torch.float32.normalized"
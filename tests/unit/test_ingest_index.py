@@ -0,0 +1,67 @@
+"""Tests for the persistent ingest index."""
+import pytest
+
+from src.utils.ingest_index import IngestIndex
+
+
+@pytest.fixture
+def ingest_index(tmp_path):
+    """Ingest index in a temporary database."""
+    index = IngestIndex(str(tmp_path / "index" / "ingest.sqlite"))
+    yield index
+    index.close()
+
+
+class TestIngestIndex:
+    """Tests for IngestIndex."""
+
+    def test_returns_recorded_ids(self, ingest_index):
+        """Should return only the IDs recorded for the collection."""
+        ingest_index.add("session_a", ["h1", "h2"])
+
+        assert ingest_index.contains("session_a", ["h1", "h3"]) == {"h1"}
+        assert ingest_index.contains("session_b", ["h1"]) == set()
+
+    def test_looks_up_more_ids_than_sqlite_parameters(self, ingest_index):
+        """Should split large lookups into several queries."""
+        ids = [f"h{i}" for i in range(2000)]
+        ingest_index.add("session_a", ids)
+
+        assert ingest_index.contains("session_a", ids) == set(ids)
+
+    def test_ignores_duplicate_ids(self, ingest_index):
+        """Should not fail when an ID is recorded twice."""
+        ingest_index.add("session_a", ["h1"])
+        ingest_index.add("session_a", ["h1", "h1"])
+
+        assert ingest_index.contains("session_a", ["h1"]) == {"h1"}
+
+    def test_discards_ids(self, ingest_index):
+        """Should drop only the given IDs of the collection."""
+        ingest_index.add("session_a", ["h1", "h2"])
+
+        ingest_index.discard("session_a", ["h1"])
+
+        assert ingest_index.contains("session_a", ["h1", "h2"]) == {"h2"}
+
+    def test_forgets_collection(self, ingest_index):
+        """Should drop the IDs of one collection only."""
+        ingest_index.add("session_a", ["h1"])
+        ingest_index.add("session_b", ["h1"])
+
+        ingest_index.forget("session_a")
+
+        assert ingest_index.contains("session_a", ["h1"]) == set()
+        assert ingest_index.contains("session_b", ["h1"]) == {"h1"}
+
+    def test_is_shared_between_connections(self, tmp_path):
+        """Should see rows written by another connection to the same file."""
+        path = str(tmp_path / "ingest.sqlite")
+        writer, reader = IngestIndex(path), IngestIndex(path)
+        try:
+            writer.add("session_a", ["h1"])
+
+            assert reader.contains("session_a", ["h1"]) == {"h1"}
+        finally:
+            writer.close()
+            reader.close()
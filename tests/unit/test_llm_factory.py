@@ -0,0 +1,31 @@
+"""Tests for get_llm."""
+import pytest
+from unittest.mock import patch
+
+from src.models import llm_factory
+from src.models.llm_factory import get_llm
+
+
+class TestGetLLM:
+    """Tests for LLM creation."""
+
+    def test_groq_retries_rate_limited_requests(self):
+        """Should configure the Groq client with the retry count and timeout."""
+        with patch.object(llm_factory, "LLM_MAX_RETRIES", 5), patch.object(llm_factory, "LLM_TIMEOUT", 30.0):
+            llm = get_llm("groq", "llama-3.1-8b-instant", api_key="gsk_test")
+
+        assert llm.max_retries == 5
+        assert llm.request_timeout == 30.0
+
+    def test_gemini_retries_rate_limited_requests(self):
+        """Should configure the Gemini client with the retry count and timeout."""
+        with patch.object(llm_factory, "LLM_MAX_RETRIES", 5), patch.object(llm_factory, "LLM_TIMEOUT", 30.0):
+            llm = get_llm("gemini", "gemini-2.0-flash", api_key="AIza_test")
+
+        assert llm.max_retries == 5
+        assert llm.timeout == 30.0
+
+    def test_unknown_provider_raises(self):
+        """Should raise ValueError for an unknown provider."""
+        with pytest.raises(ValueError, match="Unknown provider"):
+            get_llm("unknown", "model")
@@ -0,0 +1,54 @@
+"""Tests for logging configuration."""
+import logging
+import re
+from logging.handlers import QueueHandler
+
+import pytest
+
+from src.utils.logging_config import generate_log_filename, setup_logging, stop_logging
+
+
+@pytest.fixture(autouse=True)
+def restore_root_logger():
+    """Restore the root logger handlers changed by setup_logging."""
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers[:], root_logger.level
+    yield
+    stop_logging()
+    root_logger.handlers, root_logger.level = handlers, level
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = True
+
+
+class TestSetupLogging:
+    """Tests for setup_logging."""
+
+    def test_writes_through_queue(self, tmp_path):
+        """Should only enqueue records on the logger and write them on the listener thread."""
+        log_file = tmp_path / "app.log"
+        setup_logging(log_file=str(log_file))
+        
+        logging.getLogger("test").info("Hello from the queue")
+        stop_logging()
+        
+        assert [type(handler) for handler in logging.getLogger().handlers] == [QueueHandler]
+        assert "Hello from the queue" in log_file.read_text(encoding="utf-8")
+
+    def test_skips_thread_info_unless_formatted(self):
+        """Should only collect thread and process info when the format uses it."""
+        setup_logging()
+        assert not logging.logThreads and not logging.logProcesses
+        
+        setup_logging(format_string="%(threadName)s %(message)s")
+        assert logging.logThreads
+
+
+class TestGenerateLogFilename:
+    """Tests for generate_log_filename."""
+
+    def test_formats_user_session_and_timestamp(self):
+        """Should name the file {user_id}_{session_id}_{dd-mm-yyyy-hh-mm}.log."""
+        assert re.fullmatch(r"user123_sess456_\d{2}-\d{2}-\d{4}-\d{2}-\d{2}\.log", generate_log_filename("user123", "sess456"))
+
+    def test_generates_short_session_id(self):
+        """Should use an 8-character hex session ID when none is given."""
+        assert re.fullmatch(r"user123_[0-9a-f]{8}_.+\.log", generate_log_filename("user123"))
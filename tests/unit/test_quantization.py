@@ -0,0 +1,35 @@
+"""Tests for int8 embedding quantization."""
+import numpy as np
+
+from src.utils.quantization import quantize_int8, dequantize_int8
+
+
+class TestQuantizeInt8:
+    """Tests for quantize_int8 / dequantize_int8."""
+
+    def test_returns_int8_and_per_vector_scales(self):
+        """Should return int8 vectors and one scale per vector."""
+        vectors = np.random.default_rng(0).normal(size=(3, 16)).astype(np.float32)
+        quantized, scales = quantize_int8(vectors)
+        
+        assert quantized.dtype == np.int8
+        assert quantized.shape == (3, 16)
+        assert scales.shape == (3,)
+        assert np.abs(quantized).max() == 127
+
+    def test_round_trip_preserves_cosine_similarity(self):
+        """Should keep cosine similarity of normalized vectors within 1e-2."""
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(8, 384)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        
+        restored = dequantize_int8(*quantize_int8(vectors))
+        
+        assert np.allclose(restored @ vectors[0], vectors @ vectors[0], atol=1e-2)
+
+    def test_handles_zero_vector(self):
+        """Should quantize a zero vector without dividing by zero."""
+        quantized, scales = quantize_int8(np.zeros(4))
+        
+        assert not np.any(quantized)
+        assert np.isfinite(scales).all()
@@ -0,0 +1,38 @@
+"""Tests for the RAG chain."""
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from src.chains.rag_chain import create_rag_chain, format_context
+
+
+class TestFormatContext:
+    """Tests for format_context function."""
+
+    def test_keeps_rank_order_by_default(self):
+        """Should join contents in the given order."""
+        assert format_context(["b", "a"]) == "b\n\na"
+
+    def test_stable_order_ignores_rank(self):
+        """Should produce the same context for the same documents in any order."""
+        assert format_context(["b", "a"], stable_order=True) == format_context(["a", "b"], stable_order=True)
+
+
+class TestCreateRagChain:
+    """Tests for create_rag_chain function."""
+
+    def test_system_prompt_precedes_context(self):
+        """Should send the system prompt as its own message before the context and question."""
+        chain = create_rag_chain(FakeListChatModel(responses=["ok"]), system_prompt="Instructions")
+        prompt = chain.first
+        
+        messages = prompt.invoke({"context": "Doc", "question": "Why?"}).to_messages()
+        
+        assert messages[0].type == "system"
+        assert messages[0].content == "Instructions"
+        assert messages[1].content.index("Doc") < messages[1].content.index("Why?")
+
+    def test_answers_from_given_context(self):
+        """Should return the LLM answer as a string."""
+        chain = create_rag_chain(FakeListChatModel(responses=["ok"]))
+        
+        assert chain.invoke({"context": "Doc", "question": "Why?"}) == "ok"
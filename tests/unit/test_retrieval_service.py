@@ -0,0 +1,228 @@
+"""Tests for RetrievalService."""
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from langchain_chroma.vectorstores import maximal_marginal_relevance
+from langchain_core.documents import Document
+
+from src.services.retrieval_service import RetrievalService, _mmr_numpy, _mmr_select
+
+
+def _query_result(documents):
+    """Build the Chroma query() result returning the given documents."""
+    return {
+        "ids": [[doc.id for doc in documents]],
+        "documents": [[doc.page_content for doc in documents]],
+        "metadatas": [[doc.metadata for doc in documents]],
+    }
+
+
+class TestMMRNumpy:
+    """Tests for the vectorized MMR selection."""
+
+    def test_matches_langchain_selection(self):
+        """Should select the same candidates as langchain-chroma's MMR."""
+        rng = np.random.default_rng(0)
+        candidates = rng.normal(size=(20, 8)).astype(np.float32)
+        query = rng.normal(size=8).astype(np.float32)
+        
+        selected = _mmr_numpy(query, candidates, k=5, lambda_mult=0.5)
+        
+        assert selected == maximal_marginal_relevance(query, list(candidates), lambda_mult=0.5, k=5)
+
+    def test_prefers_diverse_candidates(self):
+        """Should skip a near-duplicate of an already selected candidate."""
+        candidates = np.array([[1.0, 0.0], [0.99, 0.01], [0.6, 0.8]])
+        
+        assert _mmr_numpy([1.0, 0.0], candidates, k=2, lambda_mult=0.3) == [0, 2]
+
+    def test_uses_simsimd_when_installed(self):
+        """Should compute similarities with simsimd.cdist when it is available."""
+        rng = np.random.default_rng(1)
+        candidates = rng.normal(size=(10, 8)).astype(np.float32)
+        query = rng.normal(size=8).astype(np.float32)
+        fake_simsimd = MagicMock()
+        fake_simsimd.cdist.side_effect = lambda a, b, metric: a @ b.T
+        
+        with patch("src.services.retrieval_service.simsimd", fake_simsimd):
+            selected = _mmr_numpy(query, candidates, k=4)
+        
+        assert fake_simsimd.cdist.call_count == 2
+        assert selected == _mmr_numpy(query, candidates, k=4)
+
+    def test_compiled_selection_matches_vectorized(self):
+        """Should select the same candidates with the numba kernel as with the numpy loop."""
+        rng = np.random.default_rng(2)
+        candidates = rng.normal(size=(30, 8)).astype(np.float32)
+        query = rng.normal(size=8).astype(np.float32)
+        
+        with patch("src.services.retrieval_service._mmr_select_jit", None):
+            expected = _mmr_numpy(query, candidates, k=6, lambda_mult=0.4)
+        # Run the kernel uncompiled, so the test does not depend on numba being installed
+        with patch("src.services.retrieval_service._mmr_select_jit", _mmr_select):
+            assert _mmr_numpy(query, candidates, k=6, lambda_mult=0.4) == expected
+
+    def test_handles_fewer_candidates_than_k(self):
+        """Should return every candidate when there are fewer than k."""
+        assert _mmr_numpy([1.0, 0.0], np.array([[1.0, 0.0]]), k=4) == [0]
+        assert _mmr_numpy([1.0, 0.0], np.empty((0, 2)), k=4) == []
+
+
+class TestRetrieve:
+    """Tests for the retrieve method."""
+
+    def test_mmr_uses_single_query(self):
+        """Should fetch candidates with their embeddings in one query and return documents in selection order."""
+        vectorstore = MagicMock()
+        vectorstore.embeddings.embed_query.return_value = [1.0, 0.2]
+        vectorstore._collection.query.return_value = {
+            "ids": [["a", "b", "c"]],
+            "documents": [["Doc A", "Doc B", "Doc C"]],
+            "metadatas": [[{"page": 1}, {"page": 2}, None]],
+            "embeddings": [np.array([[0.6, 0.8], [1.0, 0.0], [0.99, 0.01]])],
+        }
+        
+        docs = RetrievalService(vectorstore).retrieve("question", strategy="mmr", k=2)
+        
+        vectorstore._collection.query.assert_called_once()
+        vectorstore.as_retriever.assert_not_called()
+        assert [doc.page_content for doc in docs] == ["Doc C", "Doc A"]
+        assert docs[0].metadata == {}
+
+    def test_similarity_queries_collection_directly(self):
+        """Should run one Chroma query with the query embedding instead of building a retriever."""
+        vectorstore = MagicMock()
+        vectorstore.embeddings.embed_query.return_value = [1.0, 0.0]
+        documents = [Document(id="a", page_content="Doc A", metadata={"page": 1})]
+        vectorstore._collection.query.return_value = _query_result(documents)
+        
+        docs = RetrievalService(vectorstore).retrieve("question", k=3)
+        
+        vectorstore._collection.query.assert_called_once_with(
+            query_embeddings=[[1.0, 0.0]],
+            n_results=3,
+            include=["documents", "metadatas"]
+        )
+        vectorstore.embeddings.embed_query.assert_called_once()
+        vectorstore.as_retriever.assert_not_called()
+        assert docs == documents
+
+    def test_mmr_falls_back_to_langchain(self):
+        """Should use the langchain MMR retriever when numpy MMR is disabled."""
+        vectorstore = MagicMock()
+        vectorstore.embeddings.embed_query.return_value = [1.0, 0.0]
+        
+        RetrievalService(vectorstore, use_numpy_mmr=False).retrieve("question", strategy="mmr", k=2)
+        
+        vectorstore.as_retriever.assert_called_once_with(search_type="mmr", search_kwargs={"k": 2, "fetch_k": 4})
+
+    def test_unknown_strategy_raises(self):
+        """Should reject unknown strategies."""
+        with pytest.raises(ValueError):
+            RetrievalService(MagicMock()).retrieve("question", strategy="unknown")
+
+
+class TestRerank:
+    """Tests for cross-encoder reranking."""
+
+    def test_reranks_extra_candidates(self):
+        """Should fetch k * rerank_fetch_factor candidates and keep the k best by cross-encoder score."""
+        vectorstore = MagicMock()
+        vectorstore.embeddings.embed_query.return_value = [1.0, 0.0]
+        candidates = [Document(id=str(i), page_content=f"Doc {i}", metadata={}) for i in range(6)]
+        vectorstore._collection.query.return_value = _query_result(candidates)
+        cross_encoder = MagicMock()
+        cross_encoder.rank.return_value = [{"corpus_id": 4, "score": 0.9}, {"corpus_id": 1, "score": 0.5}]
+        
+        with patch("src.services.retrieval_service.get_cross_encoder", return_value=cross_encoder):
+            docs = RetrievalService(vectorstore, rerank_fetch_factor=3).retrieve("question", k=2, rerank=True)
+        
+        assert vectorstore._collection.query.call_args.kwargs["n_results"] == 6
+        cross_encoder.rank.assert_called_once_with("question", [doc.page_content for doc in candidates], top_k=2)
+        assert docs == [candidates[4], candidates[1]]
+
+    def test_rerank_without_candidates(self):
+        """Should not load the cross-encoder when nothing was retrieved."""
+        with patch("src.services.retrieval_service.get_cross_encoder") as mock_get:
+            assert RetrievalService(MagicMock()).rerank("question", []) == []
+            mock_get.assert_not_called()
+
+
+class TestQueryCache:
+    """Tests for the semantic cache of retrieved documents."""
+
+    def _vectorstore(self, embeddings):
+        vectorstore = MagicMock()
+        vectorstore.embeddings.embed_query.side_effect = lambda query: embeddings[query]
+        vectorstore._collection.query.return_value = _query_result([Document(id="a", page_content="Doc A", metadata={})])
+        return vectorstore
+
+    def test_repeated_query_skips_search(self):
+        """Should serve a repeated query from the cache without embedding or searching."""
+        vectorstore = self._vectorstore({"What is RAG?": [1.0, 0.0]})
+        service = RetrievalService(vectorstore)
+        
+        first = service.retrieve("What is RAG?")
+        second = service.retrieve("  what is rag? ")
+        
+        assert first == second
+        vectorstore._collection.query.assert_called_once()
+        vectorstore.embeddings.embed_query.assert_called_once()
+
+    def test_similar_query_hits_cache(self):
+        """Should reuse the results of a query whose embedding is above the similarity threshold."""
+        vectorstore = self._vectorstore({"What is RAG?": [1.0, 0.0], "Define RAG": [0.995, 0.0998]})
+        service = RetrievalService(vectorstore, cache_similarity=0.99)
+        
+        service.retrieve("What is RAG?")
+        docs = service.retrieve("Define RAG")
+        
+        assert [doc.page_content for doc in docs] == ["Doc A"]
+        vectorstore._collection.query.assert_called_once()
+
+    def test_dissimilar_query_and_other_settings_miss(self):
+        """Should search again for a different query or different retrieval settings."""
+        vectorstore = self._vectorstore({"What is RAG?": [1.0, 0.0], "Who wrote it?": [0.0, 1.0]})
+        service = RetrievalService(vectorstore)
+        
+        service.retrieve("What is RAG?")
+        service.retrieve("Who wrote it?")
+        service.retrieve("What is RAG?", k=2)
+        
+        assert vectorstore._collection.query.call_count == 3
+
+    def test_clear_cache(self):
+        """Should search again after the cache is cleared."""
+        vectorstore = self._vectorstore({"What is RAG?": [1.0, 0.0]})
+        service = RetrievalService(vectorstore)
+        
+        service.retrieve("What is RAG?")
+        service.clear_cache()
+        service.retrieve("What is RAG?")
+        
+        assert vectorstore._collection.query.call_count == 2
+
+    def test_disabled_cache(self):
+        """Should search for every call when cache_size is 0."""
+        vectorstore = self._vectorstore({"What is RAG?": [1.0, 0.0]})
+        service = RetrievalService(vectorstore, cache_size=0)
+        
+        service.retrieve("What is RAG?")
+        service.retrieve("What is RAG?")
+        
+        assert len(service.cache) == 0
+        assert vectorstore._collection.query.call_count == 2
+
+    def test_searches_again_after_ttl(self):
+        """Should search again once the cached results are older than cache_ttl."""
+        vectorstore = self._vectorstore({"What is RAG?": [1.0, 0.0]})
+        service = RetrievalService(vectorstore, cache_ttl=60)
+        
+        with patch("src.utils.cache.time.monotonic", return_value=100.0):
+            service.retrieve("What is RAG?")
+        with patch("src.utils.cache.time.monotonic", return_value=159.0):
+            service.retrieve("What is RAG?")
+        with patch("src.utils.cache.time.monotonic", return_value=160.0):
+            service.retrieve("What is RAG?")
+        
+        assert vectorstore._collection.query.call_count == 2
@@ -1,9 +1,14 @@
 """Tests for VectorStoreService."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pytest
 from unittest.mock import patch, MagicMock
 from langchain_core.documents import Document
 
 from src.services.vectorstore_service import VectorStoreService
+from src.utils.ingest_index import IngestIndex
 
 
 class TestVectorStoreServiceInit:
@@ -22,12 +27,49 @@ class TestVectorStoreServiceInit:
     def test_lazy_loads_embeddings(self, mock_embeddings):
         """Embeddings should not be loaded until accessed."""
         service = VectorStoreService()
-        assert service._embeddings is None
+        assert "embeddings" not in service.__dict__
+        
+        embeddings = service.embeddings
+        assert service.__dict__["embeddings"] is embeddings
+
+    def test_uses_injected_embeddings(self):
+        """Should use preloaded embeddings instead of loading a model."""
+        preloaded = MagicMock()
+        with patch("src.services.vectorstore_service.get_embeddings") as mock_get:
+            service = VectorStoreService(embeddings=preloaded)
+            assert service.embeddings is preloaded
+            mock_get.assert_not_called()
+
+    def test_wraps_embeddings_with_document_cache(self, tmp_path):
+        """Should serve document embeddings through the persistent cache when configured."""
+        preloaded = MagicMock()
+        preloaded.embed_documents.side_effect = lambda texts: [[1.0] for _ in texts]
+        service = VectorStoreService(embeddings=preloaded, embedding_cache_dir=str(tmp_path))
+        
+        service.embeddings.embed_documents(["chunk"])
+        service.embeddings.embed_documents(["chunk"])
+        
+        preloaded.embed_documents.assert_called_once()
 
     def test_lazy_loads_vectorstore(self, mock_embeddings):
         """Vectorstore should not be loaded until accessed."""
         service = VectorStoreService()
-        assert service._vectorstore is None
+        assert "vectorstore" not in service.__dict__
+        assert not service.exists()
+
+
+class TestPreload:
+    """Tests for preload method."""
+
+    def test_preload_materializes_both(self, mock_embeddings):
+        """Should load the embeddings and the vector store without further access."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            service = VectorStoreService()
+            service.preload()
+            
+            assert "embeddings" in service.__dict__
+            assert service.__dict__["vectorstore"] is mock_chroma.return_value
+            assert service.exists()
 
 
 class TestExists:
@@ -43,6 +85,15 @@ class TestExists:
             vectorstore_service.create_empty_vectorstore()
             assert vectorstore_service.exists() is True
 
+    def test_returns_false_after_close(self, mock_chroma, vectorstore_service):
+        """Should return False once the vectorstore is released, and True again when it is reloaded."""
+        vectorstore_service.create_empty_vectorstore()
+        vectorstore_service.close()
+        assert vectorstore_service.exists() is False
+        
+        _ = vectorstore_service.vectorstore
+        assert vectorstore_service.exists() is True
+
 
 class TestCreateEmptyVectorstore:
     """Tests for create_empty_vectorstore method."""
@@ -60,19 +111,619 @@ class TestCreateEmptyVectorstore:
             call_kwargs = mock_chroma.call_args[1]
             assert call_kwargs["collection_name"] == "test_collection"
 
+    def test_uses_inner_product_distance(self, vectorstore_service):
+        """Should create the collection with inner product distance by default."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            vectorstore_service.create_empty_vectorstore()
+            call_kwargs = mock_chroma.call_args[1]
+            assert call_kwargs["collection_configuration"] == {"hnsw": {"space": "ip"}}
+
+    def test_in_process_collection_is_not_persisted(self, vectorstore_service):
+        """Should keep an in-process collection in memory, without a persist directory."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            vectorstore_service.create_empty_vectorstore()
+            call_kwargs = mock_chroma.call_args[1]
+            assert "persist_directory" not in call_kwargs
+            assert "client" not in call_kwargs
+
+
+class TestSharedChromaServer:
+    """Tests for the shared Chroma server configuration."""
+
+    def test_in_process_client_by_default(self, vectorstore_service):
+        """Should not pass a client when no server is configured."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            vectorstore_service.create_empty_vectorstore()
+            assert "client" not in mock_chroma.call_args[1]
+
+    def test_uses_http_client_when_host_set(self, mock_embeddings):
+        """Should connect to the shared server when chroma_host is set."""
+        service = VectorStoreService(collection_name="shared", chroma_host="chroma", chroma_port=9000)
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma, \
+                patch("src.services.vectorstore_service.chromadb.HttpClient") as mock_client:
+            service.create_empty_vectorstore()
+            
+            mock_client.assert_called_once_with(host="chroma", port=9000)
+            assert mock_chroma.call_args[1]["client"] is mock_client.return_value
+
+
+def _upserted(mock_vs):
+    """Return the chunk texts of each upsert into the mocked collection."""
+    return [c.kwargs["documents"] for c in mock_vs._collection.upsert.call_args_list]
+
 
 class TestAddDocuments:
     """Tests for add_documents method."""
 
-    def test_adds_documents_to_vectorstore(self, vectorstore_service, sample_documents):
-        """Should add documents to the vectorstore."""
+    def _mock_vectorstore(self, mock_chroma, existing_ids=()):
+        mock_vs = mock_chroma.return_value
+        mock_vs.get.side_effect = lambda ids, include: {"ids": [i for i in ids if i in existing_ids]}
+        return mock_vs
+
+    def test_adds_documents_to_vectorstore(self, mock_chroma, vectorstore_service, sample_documents):
+        """Should add documents to the vectorstore under their content hashes."""
+        mock_vs = self._mock_vectorstore(mock_chroma)
+        
+        vectorstore_service.create_empty_vectorstore()
+        result = vectorstore_service.add_documents(sample_documents)
+        
+        expected_ids = [VectorStoreService.chunk_id(doc.page_content) for doc in sample_documents]
+        mock_vs._collection.upsert.assert_called_once()
+        assert sorted(mock_vs._collection.upsert.call_args.kwargs["ids"]) == sorted(expected_ids)
+        assert result == expected_ids
+
+    def test_batches_chunks_of_similar_length(self, mock_chroma, vectorstore_service):
+        """Should group chunks by length, longest first, and return IDs in input order."""
+        documents = [Document(page_content="x" * n, metadata={}) for n in (1, 30, 2, 20)]
+        
+        mock_vs = self._mock_vectorstore(mock_chroma)
+        
+        vectorstore_service.batch_size = 2
+        vectorstore_service.create_empty_vectorstore()
+        result = vectorstore_service.add_documents(documents)
+        
+        batches = [[len(text) for text in texts] for texts in _upserted(mock_vs)]
+        assert batches == [[30, 20], [2, 1]]
+        assert result == [VectorStoreService.chunk_id(doc.page_content) for doc in documents]
+
+    def test_adds_documents_in_batches(self, mock_chroma, vectorstore_service):
+        """Should insert large uploads in batches of batch_size."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={}) for i in range(5)]
+        
+        mock_vs = self._mock_vectorstore(mock_chroma)
+        
+        vectorstore_service.batch_size = 2
+        vectorstore_service.create_empty_vectorstore()
+        result = vectorstore_service.add_documents(documents)
+        
+        assert [len(texts) for texts in _upserted(mock_vs)] == [2, 2, 1]
+        assert len(result) == 5
+
+    def test_batches_large_document_lists(self, mock_chroma, vectorstore_service, mock_embeddings):
+        """Should write a large upload in batch_size upserts and return every ID."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={}) for i in range(2500)]
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+        
+        mock_vs = self._mock_vectorstore(mock_chroma)
+        
+        vectorstore_service.batch_size = 500
+        vectorstore_service.create_empty_vectorstore()
+        result = vectorstore_service.add_documents(documents)
+        
+        assert mock_vs._collection.upsert.call_count == 5
+        assert [len(texts) for texts in _upserted(mock_vs)] == [500] * 5
+        assert result == [VectorStoreService.chunk_id(doc.page_content) for doc in documents]
+
+    def test_skips_duplicate_chunks(self, mock_chroma, vectorstore_service, sample_document):
+        """Should embed identical chunks within an upload only once."""
+        mock_vs = self._mock_vectorstore(mock_chroma)
+        
+        vectorstore_service.create_empty_vectorstore()
+        result = vectorstore_service.add_documents([sample_document, sample_document])
+        
+        assert len(result) == 1
+        assert _upserted(mock_vs) == [[sample_document.page_content]]
+
+    def test_skips_chunks_already_indexed(self, mock_chroma, vectorstore_service, sample_documents):
+        """Should not re-embed chunks already stored in the collection."""
+        indexed_id = VectorStoreService.chunk_id(sample_documents[0].page_content)
+        
+        mock_vs = self._mock_vectorstore(mock_chroma, existing_ids={indexed_id})
+        
+        vectorstore_service.create_empty_vectorstore()
+        result = vectorstore_service.add_documents(sample_documents)
+        
+        assert indexed_id not in result
+        assert _upserted(mock_vs) == [[sample_documents[1].page_content]]
+
+    def test_skips_add_when_everything_is_indexed(self, mock_chroma, vectorstore_service, sample_document):
+        """Should not call the vectorstore when all chunks are already indexed."""
+        mock_vs = self._mock_vectorstore(
+            mock_chroma, existing_ids={VectorStoreService.chunk_id(sample_document.page_content)}
+        )
+        
+        vectorstore_service.create_empty_vectorstore()
+        result = vectorstore_service.add_documents([sample_document])
+        
+        assert result == []
+        mock_vs._collection.upsert.assert_not_called()
+
+    def test_writes_embeddings_as_float32_array(self, mock_chroma, vectorstore_service, sample_documents, mock_embeddings):
+        """Should pass the embeddings to Chroma as a 2-D float32 array."""
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.25, 0.5]] * len(texts)
+        
+        mock_vs = mock_chroma.return_value
+        
+        vectorstore_service.create_empty_vectorstore()
+        vectorstore_service.add_documents(sample_documents)
+        
+        embeddings = mock_vs._collection.upsert.call_args.kwargs["embeddings"]
+        assert embeddings.dtype == np.float32
+        assert embeddings.shape == (2, 2)
+
+    def test_hashes_each_chunk_once(self, mock_chroma, vectorstore_service, sample_documents):
+        """Should compute the content hashes once per call, in a single batch."""
+        with patch.object(VectorStoreService, "chunk_ids", side_effect=VectorStoreService.chunk_ids) as chunk_ids:
+            vectorstore_service.create_empty_vectorstore()
+            vectorstore_service.add_documents(sample_documents)
+            
+            chunk_ids.assert_called_once()
+
+
+class TestMetadataFields:
+    """Tests for restricting the stored metadata."""
+
+    def test_keeps_only_declared_fields(self, mock_chroma, vectorstore_service):
+        """Should store only the metadata_fields keys of each chunk."""
+        documents = [
+            Document(page_content="Chunk 0", metadata={"source": "a.pdf", "page": 0, "producer": "x", "total_pages": 9}),
+            Document(page_content="Chunk 1", metadata={"producer": "x"}),
+        ]
+        
+        vectorstore_service.metadata_fields = ("source", "page")
+        vectorstore_service.add_documents(documents)
+        
+        metadatas = mock_chroma.return_value._collection.upsert.call_args.kwargs["metadatas"]
+        assert sorted(metadatas, key=str) == sorted([{"source": "a.pdf", "page": 0}, None], key=str)
+
+    def test_stores_all_metadata_by_default(self, mock_chroma, vectorstore_service):
+        """Should store the metadata unchanged when no fields are declared."""
+        metadata = {"source": "a.pdf", "producer": "x"}
+        
+        vectorstore_service.add_documents([Document(page_content="Chunk 0", metadata=metadata)])
+        
+        assert mock_chroma.return_value._collection.upsert.call_args.kwargs["metadatas"] == [metadata]
+
+
+class TestIndexedIdCache:
+    """Tests for remembering chunks already in the collection."""
+
+    def test_skips_duplicate_content_on_second_call(self, vectorstore_service, sample_documents):
+        """Should skip re-uploaded chunks without looking them up in the collection."""
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.create_empty_vectorstore()
+            vectorstore_service.add_documents(sample_documents)
+            result = vectorstore_service.add_documents(sample_documents)
+            
+            assert result == []
+            assert mock_vs._collection.upsert.call_count == 1
+            assert mock_vs.get.call_count == 1
+
+    def test_forgets_ids_when_collection_is_recreated(self, vectorstore_service, sample_documents):
+        """Should index the chunks again into a new empty collection."""
         with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
             mock_vs = MagicMock()
-            mock_vs.add_documents.return_value = ["id1", "id2"]
+            mock_vs.get.return_value = {"ids": []}
             mock_chroma.return_value = mock_vs
             
+            vectorstore_service.create_empty_vectorstore()
+            vectorstore_service.add_documents(sample_documents)
             vectorstore_service.create_empty_vectorstore()
             result = vectorstore_service.add_documents(sample_documents)
             
-            mock_vs.add_documents.assert_called_once_with(sample_documents)
-            assert result == ["id1", "id2"]
+            assert len(result) == 2
+            assert mock_vs._collection.upsert.call_count == 2
+
+    def test_evicts_least_recently_used_ids(self, vectorstore_service):
+        """Should remember at most indexed_cache_size IDs."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={}) for i in range(3)]
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.indexed_cache_size = 2
+            vectorstore_service.create_empty_vectorstore()
+            vectorstore_service.add_documents(documents)
+            
+            assert len(vectorstore_service._indexed_ids) == 2
+
+
+class TestIngestIndex:
+    """Tests for the persistent index of ingested chunks."""
+
+    @pytest.fixture
+    def shared_service(self, mock_chroma, mock_embeddings, tmp_path):
+        """Service on a (mocked) shared Chroma server with an ingest index."""
+        with patch("src.services.vectorstore_service.chromadb.HttpClient"):
+            service = VectorStoreService(
+                collection_name="shared", chroma_host="chroma", ingest_index_path=str(tmp_path / "ingest.sqlite")
+            )
+            yield service
+            service.close()
+
+    def test_records_written_chunks(self, shared_service, sample_documents):
+        """Should record the chunks written to the collection for other processes."""
+        ids = shared_service.add_documents(sample_documents)
+        
+        other = IngestIndex(shared_service.ingest_index_path)
+        assert other.contains("shared", ids) == set(ids)
+        other.close()
+
+    def test_verifies_recorded_chunks(self, mock_chroma, shared_service, sample_documents):
+        """Should index recorded chunks the collection does not have, and drop their stale rows."""
+        ids = VectorStoreService.chunk_ids(doc.page_content for doc in sample_documents)
+        _ = shared_service.vectorstore
+        shared_service.ingest_index.add("shared", ids)
+        
+        result = shared_service.add_documents(sample_documents)
+        
+        assert result == ids
+        mock_chroma.return_value._collection.upsert.assert_called_once()
+
+    def test_reindexes_after_rebuild(self, mock_chroma, shared_service, sample_documents):
+        """Should index re-uploaded chunks again after the collection is recreated."""
+        shared_service.add_documents(sample_documents)
+        shared_service.create_empty_vectorstore()
+        result = shared_service.add_documents(sample_documents)
+        
+        assert len(result) == 2
+        assert mock_chroma.return_value._collection.upsert.call_count == 2
+
+    def test_ignored_for_in_process_collections(self, mock_embeddings, tmp_path):
+        """Should not open an index for collections that die with the process."""
+        service = VectorStoreService(ingest_index_path=str(tmp_path / "ingest.sqlite"))
+        
+        assert service.ingest_index is None
+
+
+class TestAAddDocuments:
+    """Tests for aadd_documents method."""
+
+    async def test_indexes_batches_concurrently(self, vectorstore_service, mock_embeddings):
+        """Should write one upsert per batch, at most `concurrency` at a time, and return IDs in input order."""
+        documents = [Document(page_content=f"Chunk {i:02d}", metadata={}) for i in range(10)]
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def upsert(**kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            mock_vs._collection.upsert.side_effect = upsert
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.batch_size = 3
+            vectorstore_service.create_empty_vectorstore()
+            result = await vectorstore_service.aadd_documents(documents, concurrency=2)
+            
+            assert mock_vs._collection.upsert.call_count == 4
+            assert max(peak) <= 2
+            assert result == [VectorStoreService.chunk_id(doc.page_content) for doc in documents]
+
+    async def test_skips_chunks_already_indexed(self, vectorstore_service, sample_documents):
+        """Should skip duplicates and chunks already in the collection, like add_documents."""
+        indexed_id = VectorStoreService.chunk_id(sample_documents[0].page_content)
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.side_effect = lambda ids, include: {"ids": [i for i in ids if i == indexed_id]}
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.create_empty_vectorstore()
+            result = await vectorstore_service.aadd_documents(sample_documents + sample_documents)
+            
+            assert result == [VectorStoreService.chunk_id(sample_documents[1].page_content)]
+            assert _upserted(mock_vs) == [[sample_documents[1].page_content]]
+
+    async def test_hashes_and_embeds_off_the_event_loop(self, mock_chroma, vectorstore_service, sample_documents, mock_embeddings):
+        """Should run hashing and embedding in worker threads, not in the event loop thread."""
+        threads = []
+        original_chunk_ids = VectorStoreService.chunk_ids
+
+        def chunk_ids(contents):
+            threads.append(threading.get_ident())
+            return original_chunk_ids(contents)
+
+        def embed_documents(texts):
+            threads.append(threading.get_ident())
+            return [[0.1]] * len(texts)
+
+        mock_embeddings.embed_documents.side_effect = embed_documents
+        
+        with patch.object(VectorStoreService, "chunk_ids", side_effect=chunk_ids):
+            await vectorstore_service.aadd_documents(sample_documents)
+        
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
+
+    async def test_creates_vectorstore_once(self, vectorstore_service, mock_embeddings):
+        """Should create a missing vector store once, not once per concurrent batch."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={}) for i in range(8)]
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+
+        def create_chroma(**kwargs):
+            time.sleep(0.01)
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            return mock_vs
+        
+        with patch("src.services.vectorstore_service.Chroma", side_effect=create_chroma) as mock_chroma:
+            vectorstore_service.batch_size = 2
+            await vectorstore_service.aadd_documents(documents, concurrency=4)
+            
+            mock_chroma.assert_called_once()
+
+
+class TestChunkIds:
+    """Tests for chunk ID hashing."""
+
+    def test_batch_ids_match_single_ids(self):
+        """Should return the same IDs as chunk_id(), in order."""
+        contents = ["alpha", "beta", "alpha", ""]
+        
+        assert VectorStoreService.chunk_ids(contents) == [VectorStoreService.chunk_id(c) for c in contents]
+
+
+class TestAddDocumentsFast:
+    """Tests for add_documents_fast method."""
+
+    def test_fast_path_forwards_columnar_arrays(self, vectorstore_service):
+        """Should upsert the columns as float32 in batches, without building Document objects."""
+        texts = [f"Chunk {i}" for i in range(5)]
+        metadatas = [{"source": "a.pdf"}] * 4 + [{}]
+        embeddings = np.random.rand(5, 3)
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma, \
+             patch.object(Document, "__init__", side_effect=AssertionError("Document built")):
+            mock_vs = MagicMock()
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.batch_size = 3
+            ids = vectorstore_service.add_documents_fast(texts, metadatas, embeddings)
+            
+            calls = mock_vs._collection.upsert.call_args_list
+            assert [len(call.kwargs["ids"]) for call in calls] == [3, 2]
+            assert all(call.kwargs["embeddings"].dtype == np.float32 for call in calls)
+            assert calls[1].kwargs["documents"] == texts[3:]
+            assert calls[1].kwargs["metadatas"] == [{"source": "a.pdf"}, None]
+            assert ids == [VectorStoreService.chunk_id(text) for text in texts]
+            mock_vs.get.assert_not_called()
+
+    def test_drops_duplicate_rows(self, vectorstore_service):
+        """Should write each distinct chunk once, with the embedding of its first row."""
+        embeddings = np.array([[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_chroma.return_value = mock_vs
+            
+            ids = vectorstore_service.add_documents_fast(["a", "b", "a"], [None] * 3, embeddings)
+            
+            kwargs = mock_vs._collection.upsert.call_args.kwargs
+            assert len(ids) == 2
+            assert kwargs["documents"] == ["a", "b"]
+            np.testing.assert_array_equal(kwargs["embeddings"], embeddings[:2])
+
+    def test_rejects_mismatched_columns(self, vectorstore_service):
+        """Should raise ValueError when the columns have different lengths."""
+        with pytest.raises(ValueError):
+            vectorstore_service.add_documents_fast(["a", "b"], [None], np.zeros((2, 3)))
+
+
+class TestParallelAdd:
+    """Tests for parallel_add class method."""
+
+    def test_shards_documents_across_workers(self, mock_chroma, mock_embeddings):
+        """Should index every chunk once, split across one service per worker."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={}) for i in range(1000)]
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+        
+        # Threads stand in for processes, so the mocks are shared with the workers
+        with patch("src.services.vectorstore_service.ProcessPoolExecutor", ThreadPoolExecutor), \
+             patch("src.services.vectorstore_service.chromadb.HttpClient"):
+            ids = VectorStoreService.parallel_add(
+                documents + documents[:10], n_workers=4,
+                collection_name="corpus", chroma_host="chroma", batch_size=100
+            )
+        
+        assert mock_chroma.call_count == 4
+        upserted = [i for c in mock_chroma.return_value._collection.upsert.call_args_list for i in c.kwargs["ids"]]
+        assert sorted(upserted) == sorted(VectorStoreService.chunk_ids(doc.page_content for doc in documents))
+        assert ids == [VectorStoreService.chunk_id(doc.page_content) for doc in documents]
+
+    def test_requires_shared_server(self, sample_documents):
+        """Should refuse in-process collections, which workers cannot share."""
+        with pytest.raises(ValueError):
+            VectorStoreService.parallel_add(sample_documents, collection_name="corpus")
+
+
+class TestAddTexts:
+    """Tests for add_texts method."""
+
+    def test_add_texts_bypasses_document_wrapping(self, mock_chroma, vectorstore_service, mock_embeddings):
+        """Should embed and upsert raw texts without building Document objects or calling LangChain's add methods."""
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+        texts = ["Chunk 0", "Chunk 1", "Chunk 0"]
+        
+        with patch.object(Document, "__init__", side_effect=AssertionError("Document built")):
+            ids = vectorstore_service.add_texts(texts, [{"page": 0}, {}, {"page": 2}])
+        
+        mock_vs = mock_chroma.return_value
+        mock_embeddings.embed_documents.assert_called_once_with(["Chunk 0", "Chunk 1"])
+        kwargs = mock_vs._collection.upsert.call_args.kwargs
+        assert kwargs["documents"] == ["Chunk 0", "Chunk 1"]
+        assert kwargs["metadatas"] == [{"page": 0}, None]
+        assert ids == VectorStoreService.chunk_ids(texts[:2])
+        mock_vs.add_texts.assert_not_called()
+        mock_vs.add_documents.assert_not_called()
+
+    def test_skips_texts_already_indexed(self, mock_chroma, vectorstore_service, mock_embeddings):
+        """Should not embed texts whose chunks are already in the collection."""
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+        indexed_id = VectorStoreService.chunk_id("Chunk 0")
+        mock_chroma.return_value.get.side_effect = lambda ids, include: {"ids": [i for i in ids if i == indexed_id]}
+        
+        ids = vectorstore_service.add_texts(["Chunk 0", "Chunk 1"])
+        
+        assert ids == [VectorStoreService.chunk_id("Chunk 1")]
+        mock_embeddings.embed_documents.assert_called_once_with(["Chunk 1"])
+
+    def test_rejects_mismatched_metadatas(self, vectorstore_service):
+        """Should raise ValueError when metadatas and texts differ in length."""
+        with pytest.raises(ValueError):
+            vectorstore_service.add_texts(["a", "b"], [None])
+
+
+class TestCreateFromDocuments:
+    """Tests for create_from_documents method."""
+
+    def test_creates_collection_and_adds_in_batches(self, vectorstore_service):
+        """Should create an empty collection and add documents batch by batch."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={}) for i in range(3)]
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.batch_size = 2
+            result = vectorstore_service.create_from_documents(documents)
+            
+            assert result is mock_vs
+            assert [len(texts) for texts in _upserted(mock_vs)] == [2, 1]
+
+    def test_streams_documents_and_skips_empty(self, vectorstore_service, mock_embeddings):
+        """Should consume an iterable one batch at a time and skip documents with empty content."""
+        consumed = []
+        mock_embeddings.embed_documents.side_effect = lambda texts: consumed.append("embed") or [[0.1]] * len(texts)
+
+        def documents():
+            for content in ["Chunk 0", "  ", "Chunk 1", "Chunk 2"]:
+                consumed.append(content)
+                yield Document(page_content=content, metadata={})
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.create_from_documents(documents(), batch_size=2)
+            
+            assert consumed == ["Chunk 0", "  ", "embed", "Chunk 1", "Chunk 2", "embed"]
+            assert _upserted(mock_vs) == [["Chunk 0"], ["Chunk 1", "Chunk 2"]]
+
+
+class TestAddDocumentsStreaming:
+    """Tests for add_documents_streaming method."""
+
+    def test_pulls_documents_batch_by_batch(self, mock_chroma, vectorstore_service, mock_embeddings):
+        """Should write batch_size upserts without consuming the whole iterable up front."""
+        consumed = 0
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+
+        def documents():
+            nonlocal consumed
+            for i in range(10_000):
+                consumed += 1
+                yield Document(page_content=f"Chunk {i}", metadata={})
+        
+        stream = vectorstore_service.add_documents_streaming(documents(), batch_size=100)
+        first = next(stream)
+        
+        assert first == VectorStoreService.chunk_id("Chunk 0")
+        assert consumed <= 300
+        
+        assert len([first, *stream]) == 10_000
+        assert mock_chroma.return_value._collection.upsert.call_count == 100
+
+    def test_skips_chunks_repeated_across_batches(self, mock_chroma, vectorstore_service, mock_embeddings):
+        """Should embed and write a chunk repeated in later batches only once."""
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1]] * len(texts)
+        documents = [Document(page_content=f"Chunk {i % 3}", metadata={}) for i in range(9)]
+        
+        result = list(vectorstore_service.add_documents_streaming(documents, batch_size=2))
+        
+        assert sorted(result) == sorted(VectorStoreService.chunk_id(f"Chunk {i}") for i in range(3))
+        embedded = [text for call in mock_embeddings.embed_documents.call_args_list for text in call.args[0]]
+        assert sorted(embedded) == ["Chunk 0", "Chunk 1", "Chunk 2"]
+
+
+class TestIngestPipeline:
+    """Tests for overlapping embedding with Chroma writes."""
+
+    def test_writes_while_next_batch_is_embedded(self, vectorstore_service, mock_embeddings):
+        """Should write a batch in the background while the next batch is embedded."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={}) for i in range(4)]
+        embedded = []
+        second_batch_embedded = threading.Event()
+        overlapped = []
+
+        def embed_documents(texts):
+            embedded.append(texts)
+            if len(embedded) == 2:
+                second_batch_embedded.set()
+            return [[0.1]] * len(texts)
+
+        mock_embeddings.embed_documents.side_effect = embed_documents
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            mock_vs._collection.upsert.side_effect = lambda **kwargs: overlapped.append(second_batch_embedded.wait(timeout=5))
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.batch_size = 2
+            vectorstore_service.create_empty_vectorstore()
+            result = vectorstore_service.add_documents(documents)
+            
+            assert overlapped == [True, True]
+            assert len(result) == 4
+
+    def test_splits_batch_when_embedding_runs_out_of_memory(self, vectorstore_service, mock_embeddings):
+        """Should retry a batch in halves when the encoder raises a RuntimeError."""
+        documents = [Document(page_content=f"Chunk {i}", metadata={"page": i}) for i in range(4)]
+
+        def embed_documents(texts):
+            if len(texts) > 2:
+                raise RuntimeError("CUDA out of memory")
+            return [[float(text[-1])] for text in texts]
+
+        mock_embeddings.embed_documents.side_effect = embed_documents
+        
+        with patch("src.services.vectorstore_service.Chroma") as mock_chroma:
+            mock_vs = MagicMock()
+            mock_vs.get.return_value = {"ids": []}
+            mock_chroma.return_value = mock_vs
+            
+            vectorstore_service.create_empty_vectorstore()
+            vectorstore_service.add_documents(documents)
+            
+            upsert = mock_vs._collection.upsert.call_args.kwargs
+            assert [len(c.args[0]) for c in mock_embeddings.embed_documents.call_args_list] == [4, 2, 2]
+            assert upsert["embeddings"].tolist() == [[float(text[-1])] for text in upsert["documents"]]
+            assert upsert["metadatas"] == [{"page": int(text[-1])} for text in upsert["documents"]]